@@ -0,0 +1,319 @@
+# -*- coding: UTF-8 -*-
+"""
+LoRA Manager CLI
+Headless batch jobs (index, hash, Civitai lookup, preview backfill, JSON
+conversion, thumbnail fixing) against config.json or explicit library roots,
+for running from cron without a browser
+
+Usage examples:
+    python lora_cli.py index
+    python lora_cli.py scan --jobs 2 --delay 0.5 --create-dummy
+    python lora_cli.py convert --root /mnt/models/loras --json
+
+Exit codes: 0 = success, 1 = one or more items failed, 2 = usage/config error
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+# Add scripts directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+import civitai_handler
+import json_converter
+import log_setup
+from model_index import DEFAULT_SCAN_CONCURRENCY, library_roots, scan_library
+
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.json")
+
+EXIT_OK = 0
+EXIT_FAILURES = 1
+EXIT_USAGE = 2
+
+# Parallelism per command when --jobs is not given; Civitai lookups default
+# to one request at a time to stay within the API rate limits
+DEFAULT_JOBS = {
+    'hash': os.cpu_count() or 1,
+    'scan': 1,
+    'previews': 1,
+    'convert': os.cpu_count() or 1,
+    'fix-thumbnails': 4
+}
+
+# Item statuses that count as failures for the exit code
+FAILED_STATUSES = ('error',)
+
+logger = logging.getLogger('cli')
+
+
+def load_config(config_file):
+    """Read config.json without creating it; returns {} if missing"""
+    if not os.path.exists(config_file):
+        return {}
+    with open(config_file, 'r') as f:
+        return json.load(f)
+
+
+class Progress:
+    """Thread-safe per-item progress lines on stderr plus status counts"""
+
+    def __init__(self, label, total, enabled=True):
+        self.label = label
+        self.total = total
+        self.enabled = enabled
+        self.done = 0
+        self.counts = Counter()
+        self._lock = threading.Lock()
+
+    def update(self, status, path, message=''):
+        with self._lock:
+            self.done += 1
+            self.counts[status] += 1
+            if self.enabled:
+                detail = f" - {message}" if message else ''
+                sys.stderr.write(f"[{self.label} {self.done}/{self.total}] {status}: {path}{detail}\n")
+                sys.stderr.flush()
+
+
+def run_items(label, items, func, jobs, quiet):
+    """
+    Apply func to every item on a thread pool, reporting progress
+
+    Args:
+        label: Command name for progress lines
+        items: List of model dicts from civitai_handler.scan_models_directory
+        func: Callable(item) returning a result dict with at least
+            {'status', 'message'}
+        jobs: Number of worker threads
+        quiet: Suppress progress lines if True
+
+    Returns:
+        (results, counts)
+    """
+    progress = Progress(label, len(items), not quiet)
+
+    def run(item):
+        try:
+            result = func(item)
+        except Exception as e:
+            logger.error("Error processing %s: %s", item['path'], e)
+            result = {'status': 'error', 'message': str(e)}
+        result['path'] = item['path']
+        progress.update(result['status'], item['path'], result.get('message', ''))
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        results = list(executor.map(run, items))
+    return results, progress.counts
+
+
+def list_models(roots):
+    """All model files under roots, with sidecar flags"""
+    models = []
+    for root in roots:
+        models.extend(civitai_handler.scan_models_directory(root.path))
+    return models
+
+
+def command_index(args, roots):
+    """Scan every root and report model counts (optionally writing the listing)"""
+    results = []
+    listing = []
+    counts = Counter()
+    for root in roots:
+        start = time.time()
+        if not os.path.isdir(root.path):
+            results.append({'path': root.path, 'root': root.id, 'status': 'error', 'message': 'Directory not found'})
+            counts['error'] += 1
+            continue
+        models = scan_library(root, args.jobs or args.config_data.get('scanConcurrency', DEFAULT_SCAN_CONCURRENCY))
+        listing.extend(record.to_dict() for record in models)
+        results.append({
+            'path': root.path,
+            'root': root.id,
+            'status': 'indexed',
+            'models': len(models),
+            'seconds': round(time.time() - start, 3)
+        })
+        counts['indexed'] += 1
+        counts['models'] += len(models)
+        if not args.quiet:
+            sys.stderr.write(f"[index] {root.id}: {len(models)} models in {time.time() - start:.2f}s\n")
+    return (listing if args.output else results), counts
+
+
+def command_hash(args, roots):
+    """Compute SHA256 hashes of every model file"""
+    def hash_model(model):
+        file_hash = civitai_handler.generate_sha256(model['path'], chunk_size=1024 * 1024)
+        if not file_hash:
+            return {'status': 'error', 'message': 'Failed to generate SHA256 hash'}
+        return {'status': 'hashed', 'sha256': file_hash}
+
+    return run_items('hash', list_models(roots), hash_model, args.jobs or DEFAULT_JOBS['hash'], args.quiet)
+
+
+def command_scan(args, roots):
+    """Look models up on Civitai by hash and save their .civitai.info"""
+    models = [m for m in list_models(roots) if args.all or not m['has_info']]
+
+    def lookup_model(model):
+        file_hash = civitai_handler.generate_sha256(model['path'], chunk_size=1024 * 1024)
+        if not file_hash:
+            return {'status': 'error', 'message': 'Failed to generate SHA256 hash'}
+        model_info = civitai_handler.fetch_model_info_by_hash(file_hash)
+        if args.delay > 0:
+            time.sleep(args.delay)
+        if model_info is None:
+            return {'status': 'error', 'message': 'Failed to connect to Civitai API'}
+        if not model_info:
+            # Empty dict means model not found on Civitai
+            if args.create_dummy and civitai_handler.create_dummy_info_file(model['path']):
+                return {'status': 'not_found', 'message': 'Created dummy info file'}
+            return {'status': 'not_found', 'message': 'Model not found on Civitai'}
+        if not civitai_handler.save_civitai_info(model['path'], model_info):
+            return {'status': 'error', 'message': 'Failed to save civitai info file'}
+        return {'status': 'saved', 'message': model_info.get('model', {}).get('name', '')}
+
+    return run_items('scan', models, lookup_model, args.jobs or DEFAULT_JOBS['scan'], args.quiet)
+
+
+def command_previews(args, roots):
+    """Download missing preview images from .civitai.info image lists"""
+    models = [m for m in list_models(roots) if m['has_info'] and not m['has_preview']]
+
+    def download_preview(model):
+        success = civitai_handler.download_preview_image(model['path'], args.max_size, not args.include_nsfw)
+        if args.delay > 0:
+            time.sleep(args.delay)
+        if success:
+            return {'status': 'downloaded', 'message': ''}
+        return {'status': 'skipped', 'message': 'No suitable preview image'}
+
+    return run_items('previews', models, download_preview, args.jobs or DEFAULT_JOBS['previews'], args.quiet)
+
+
+def command_convert(args, roots):
+    """Incrementally convert .civitai.info files to .json"""
+    results = []
+    counts = Counter()
+    for root in roots:
+        def report(done, total, result, root=root):
+            if not args.quiet:
+                sys.stderr.write(f"[convert {root.id} {done}/{total}] {result['status']}: {result['path']}\n")
+            if result['status'] == 'error':
+                results.append({'path': result['path'], 'status': 'error', 'message': result['error']})
+
+        summary = json_converter.process_civitai_info_files(
+            root.path, use_api=args.use_api, jobs=args.jobs or DEFAULT_JOBS['convert'],
+            force=args.force, progress=report)
+        for status, key in (('written', 'written'), ('unchanged', 'unchanged'), ('skipped', 'skipped'),
+                            ('error', 'errors'), ('apiCalls', 'apiCalls')):
+            if summary[key]:
+                counts[status] += summary[key]
+    return results, counts
+
+
+def command_fix_thumbnails(args, roots):
+    """Rename adjacent images to <model>.preview.png"""
+    models = [m for m in list_models(roots) if not m['has_preview']]
+
+    def fix_thumbnail(model):
+        status, message = civitai_handler.fix_thumbnail_name(model['path'])
+        return {'status': status, 'message': message}
+
+    return run_items('fix-thumbnails', models, fix_thumbnail, args.jobs or DEFAULT_JOBS['fix-thumbnails'], args.quiet)
+
+
+COMMANDS = {
+    'index': command_index,
+    'hash': command_hash,
+    'scan': command_scan,
+    'previews': command_previews,
+    'convert': command_convert,
+    'fix-thumbnails': command_fix_thumbnails
+}
+
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--config', default=CONFIG_FILE, help="Path to config.json (default: next to manager.py)")
+    common.add_argument('--root', action='append', default=[], metavar='PATH',
+                        help="Library root to process instead of modelsDirectory (repeatable)")
+    common.add_argument('--jobs', type=int, default=None, metavar='N', help="Parallel workers")
+    common.add_argument('--json', action='store_true', help="Print the summary as JSON on stdout")
+    common.add_argument('--output', metavar='FILE', help="Write per-item results (index: the model listing) to FILE")
+    common.add_argument('--quiet', action='store_true', help="No per-item progress lines")
+    common.add_argument('--log-level', default='WARNING', help="Log level for stderr logging (default WARNING)")
+
+    parser = argparse.ArgumentParser(description="LoRA Manager batch jobs")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('index', parents=[common], help="Scan the library roots and report model counts")
+    subparsers.add_parser('hash', parents=[common], help="Compute SHA256 of every model file")
+
+    scan = subparsers.add_parser('scan', parents=[common], help="Fetch .civitai.info from Civitai by hash")
+    scan.add_argument('--all', action='store_true', help="Also re-fetch models that already have info")
+    scan.add_argument('--create-dummy', action='store_true', help="Write an empty info file for models not on Civitai")
+    scan.add_argument('--delay', type=float, default=0.5, help="Seconds to wait after each API request (default 0.5)")
+
+    previews = subparsers.add_parser('previews', parents=[common], help="Download missing preview images")
+    previews.add_argument('--max-size', action='store_true', help="Download full size images")
+    previews.add_argument('--include-nsfw', action='store_true', help="Allow NSFW images as previews")
+    previews.add_argument('--delay', type=float, default=0.5, help="Seconds to wait after each download (default 0.5)")
+
+    convert = subparsers.add_parser('convert', parents=[common], help="Convert .civitai.info files to .json")
+    convert.add_argument('--use-api', action='store_true', help="Fetch missing creators from the Civitai API")
+    convert.add_argument('--force', action='store_true', help="Reconvert files even if their JSON is up to date")
+
+    subparsers.add_parser('fix-thumbnails', parents=[common], help="Rename adjacent images to .preview.png")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    log_setup.setup_logging(args.log_level, log_file=None)
+
+    try:
+        args.config_data = load_config(args.config)
+    except (OSError, ValueError) as e:
+        sys.stderr.write(f"Could not read config {args.config}: {e}\n")
+        return EXIT_USAGE
+    roots = library_roots(args.root or args.config_data.get('modelsDirectory', ''))
+    if not roots:
+        sys.stderr.write("No library roots: set modelsDirectory in config.json or pass --root\n")
+        return EXIT_USAGE
+
+    start = time.time()
+    results, counts = COMMANDS[args.command](args, roots)
+    failed = [r for r in results if r.get('status') in FAILED_STATUSES]
+    exit_code = EXIT_FAILURES if failed or counts.get('error') else EXIT_OK
+
+    summary = {
+        'command': args.command,
+        'roots': [{'id': root.id, 'path': root.path} for root in roots],
+        'counts': dict(counts),
+        'failed': failed,
+        'seconds': round(time.time() - start, 3),
+        'exitCode': exit_code
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        counts_text = ', '.join(f"{count} {status}" for status, count in sorted(counts.items())) or 'nothing to do'
+        print(f"{args.command}: {counts_text} in {summary['seconds']}s")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
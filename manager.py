@@ -1,87 +1,214 @@
 import http.server
+import io
 import socketserver
 import json
 import os
 import urllib.parse
+import html
 import shutil
 import webbrowser
 import time
 import sys
+import logging
 from pathlib import Path
 
 # Add scripts directory to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
 import civitai_handler
-
-# Import the JSON converter module (has hyphens in name)
-import importlib.util
-spec = importlib.util.spec_from_file_location("json_converter", 
-    os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts", "zCivitai-2-JSONv4.py"))
-json_converter = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(json_converter)
+import duplicates
+import facet_index
+import file_utils
+import json_codec
+import json_converter
+import log_setup
+import model_listing
+import model_metadata
+import model_moves
+import preview_bundle
+import request_profiler
+import search_index
+from multipart import MultipartParser, MultipartError
+from settings_service import SettingsService
+from model_index import ModelIndex, ROOT_URL_PREFIX, DEFAULT_SCAN_CONCURRENCY, library_roots, find_root, root_for_path, scan_library
 
 PORT = 8080
 CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.json")
+# SHA256 of model files hashed by the duplicate finder, reused while a file is unchanged
+HASH_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "hash_cache.json")
+
+# HTTP/1.1 keep-alive: idle connections are closed after KEEP_ALIVE_TIMEOUT seconds,
+# and every connection after MAX_REQUESTS_PER_CONNECTION requests
+KEEP_ALIVE_TIMEOUT = 15
+MAX_REQUESTS_PER_CONNECTION = 1000
+
+# Largest accepted preview image, plus room for the multipart framing around it
+MAX_PREVIEW_UPLOAD_SIZE = 50 * 1024 * 1024
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Largest accepted PATCH /model/<id> body (changed fields only)
+MAX_PATCH_SIZE = 1024 * 1024
+
+logger = logging.getLogger('manager')
+access_logger = logging.getLogger('manager.access')
+
+# Settings and model index are shared by all requests
+settings_service = SettingsService(CONFIG_FILE)
+
+
+def scan_root(root, progress=None):
+    """Scan one library root with the configured directory concurrency."""
+    return scan_library(root, settings_service.get_setting('scanConcurrency', DEFAULT_SCAN_CONCURRENCY), progress)
+
+model_index = ModelIndex(scan_root)
 
-def load_initial_settings():
-    try:
-        with open(CONFIG_FILE, 'r') as file:
-            return json.load(file)
-    except FileNotFoundError:
-        # Create default config file if it doesn't exist
-        default_settings = {
-            "modelsDirectory": "",
-            "theme": "dark",
-            "defaultView": "grid",
-            "defaultSort": "name-asc",
-            "hideNSFW": False,
-            "visibleColumns": {
-                "thumbnail": True,
-                "filename": True,
-                "civitaiName": True,
-                "baseModel": True,
-                "category": True,
-                "path": True,
-                "size": True,
-                "date": True,
-                "url": True,
-                "nsfw": True,
-                "positiveWords": True,
-                "negativeWords": True,
-                "authorsWords": True,
-                "description": True
-            }
-        }
-        with open(CONFIG_FILE, 'w') as file:
-            json.dump(default_settings, file, indent=2)
-        return default_settings
-    except json.JSONDecodeError:
-        print(f"Error: Invalid JSON format in {CONFIG_FILE}. Using default settings.")
-        return {"modelsDirectory": ""}
-
-# Load settings globally
-settings = load_initial_settings()
-lora_path = settings.get('modelsDirectory', '')
-print(f"Loaded settings A: {settings}")
-print("Lora path = " + lora_path)
+# Preview file contents shared by /preview-bundle responses
+preview_cache = preview_bundle.PreviewCache()
+# Model versions of recently served listings, for /load-loras deltas
+listing_history = model_listing.ListingHistory()
+# Progress of recent /batch-move runs, for /batch-move-status
+move_jobs = model_moves.MoveJobs()
+# Latest duplicate report, for /duplicates
+hash_cache = duplicates.HashCache(HASH_CACHE_FILE)
+duplicate_finder = duplicates.DuplicateFinder(hash_cache)
+
+
+def on_settings_changed(old_settings, new_settings):
+    """Keep dependent state in step with config.json."""
+    if old_settings.get('modelsDirectory') != new_settings.get('modelsDirectory'):
+        logger.info("Models directory changed to %s; rebuilding index", new_settings.get('modelsDirectory', ''))
+        model_index.rebuild_async(library_roots(new_settings.get('modelsDirectory', '')))
+    if old_settings.get('logLevel') != new_settings.get('logLevel'):
+        logging.getLogger().setLevel(str(new_settings.get('logLevel') or 'INFO').upper())
+
+settings_service.subscribe(on_settings_changed)
+
+
+class BufferedResponse(io.BytesIO):
+    """Response body held back until its length is known; socket_wfile is the connection's stream."""
+
+    def __init__(self, socket_wfile):
+        super().__init__()
+        self.socket_wfile = socket_wfile
 
 
 class LoraManagerHandler(http.server.SimpleHTTPRequestHandler):
+    # Persistent connections: a page load reuses a few sockets instead of one per request.
+    # Every response carries a Content-Length (see end_headers), which HTTP/1.1 keep-alive needs.
+    protocol_version = 'HTTP/1.1'
+    # Idle keep-alive connections are closed after this many seconds
+    timeout = KEEP_ALIVE_TIMEOUT
+    # Headers and body go out as separate writes; don't let Nagle hold back the second one
+    disable_nagle_algorithm = True
+
     def __init__(self, *args, **kwargs):
+        self.requests_handled = 0
+        self.response_status = None
+        self.response_has_length = False
+        self.response_body = None
         web_app_directory = os.path.dirname(os.path.abspath(__file__))
-        self.lora_data_cache = None  # Initialize cache variable before calling super()
         super().__init__(*args, directory=web_app_directory, **kwargs)
-        
+
+    def handle_one_request(self):
+        self.requests_handled += 1
+        self.response_status = None
+        self.response_has_length = False
+        try:
+            super().handle_one_request()
+            self.send_buffered_response()
+        finally:
+            if self.response_body is not None:
+                # Handler failed mid-response: drop the partial body and the connection
+                self.wfile = self.response_body.socket_wfile
+                self.response_body = None
+                self.close_connection = True
+
+    def send_response_only(self, code, message=None):
+        self.response_status = code
+        super().send_response_only(code, message)
+
+    def send_header(self, keyword, value):
+        if keyword.lower() in ('content-length', 'transfer-encoding'):
+            self.response_has_length = True
+        super().send_header(keyword, value)
+
     def end_headers(self):
         # Add CORS headers to allow JavaScript modules to load properly
         self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, PATCH, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, If-Match')
+        if self.requests_handled >= MAX_REQUESTS_PER_CONNECTION:
+            self.send_header('Connection', 'close')
+
+        if self.response_has_length or self.command == 'HEAD' or self.response_status in (204, 304) \
+                or (self.response_status or 200) < 200:
+            super().end_headers()
+            return
+        # Routes write their body straight to wfile without a length; collect it and
+        # send the headers with a Content-Length once the handler has finished
+        self.response_body = BufferedResponse(self.wfile)
+        self.wfile = self.response_body
+
+    def send_buffered_response(self):
+        """Send the headers and body collected by end_headers() for a route that wrote no Content-Length."""
+        if self.response_body is None:
+            return
+        body = self.response_body.getvalue()
+        self.wfile = self.response_body.socket_wfile
+        self.response_body = None
+        self.send_header('Content-Length', str(len(body)))
         super().end_headers()
+        self.wfile.write(body)
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        # Per-request access lines are debug-only to keep the console out of the hot path
+        if access_logger.isEnabledFor(logging.DEBUG):
+            access_logger.debug("%s - %s", self.address_string(), format % args)
+
+    def log_error(self, format, *args):
+        if format.startswith("Request timed out"):
+            # An idle keep-alive connection reaching KEEP_ALIVE_TIMEOUT, not an error
+            logger.debug("%s - closing idle connection", self.address_string())
+            return
+        logger.warning("%s - %s", self.address_string(), format % args)
+
+    def should_profile(self):
+        """Profile when enabled in config, or on ?__profile=1 from localhost."""
+        parsed_url = urllib.parse.urlparse(self.path)
+        if '__profile=1' in parsed_url.query.split('&'):
+            return self.is_local_client()
+        profiled = settings_service.get_setting('profileRequests', False)
+        if isinstance(profiled, list):
+            return parsed_url.path in profiled
+        return bool(profiled) and not parsed_url.path.startswith('/debug/')
+
+    def is_local_client(self):
+        return self.client_address[0] in ('127.0.0.1', '::1', 'localhost')
+
+    def run_profiled(self, handler):
+        label = f"{self.command} {urllib.parse.urlparse(self.path).path}"
+        return request_profiler.profile_call(
+            handler, label,
+            mode=settings_service.get_setting('profileMode', 'cprofile'),
+            directory=settings_service.get_setting('profilesDirectory') or request_profiler.DEFAULT_PROFILES_DIRECTORY)
 
     def do_GET(self):
-        print("do_GET called")
-        global lora_path
+        if self.should_profile():
+            return self.run_profiled(self.handle_get)
+        return self.handle_get()
+
+    def do_POST(self):
+        if self.should_profile():
+            return self.run_profiled(self.handle_post)
+        return self.handle_post()
+
+    def do_PATCH(self):
+        if self.should_profile():
+            return self.run_profiled(self.handle_patch)
+        return self.handle_patch()
+
+    def handle_get(self):
+        roots = self.configured_roots()
         parsed_url = urllib.parse.urlparse(self.path)
         query_params = urllib.parse.parse_qs(parsed_url.query)
 
@@ -108,105 +235,289 @@ class LoraManagerHandler(http.server.SimpleHTTPRequestHandler):
         # Check if the request is for a model file (like preview images) vs a web app file
         # Web app files should be served from the web app directory, model files from the models directory
         if parsed_url.path.startswith('/') and not parsed_url.path.startswith('/load-') and not parsed_url.path.startswith('/edit-') and parsed_url.path != '/' and not os.path.exists(os.path.join(os.path.dirname(os.path.abspath(__file__)), parsed_url.path.lstrip('/'))):
-            # Try to serve the file from the models directory
-            if lora_path:
-                # URL decode the path to handle spaces and special characters
-                decoded_path = urllib.parse.unquote(parsed_url.path.lstrip('/'))
-                file_path = os.path.join(lora_path, decoded_path)
-                
-                #print(f"Looking for file in models directory: {file_path}")
+            # Try to serve the file from the models directories
+            # URL decode the path to handle spaces and special characters
+            file_path = self.model_file_path(urllib.parse.unquote(parsed_url.path), roots)
+            if file_path:
+                logger.debug("Serving file from models directory: %s", file_path)
+                self.send_response(200)
                 
-                if os.path.exists(file_path) and os.path.isfile(file_path):
-                    print(f"Serving file from models directory: {file_path}")
-                    self.send_response(200)
-                    
-                    # Set content type based on file extension
-                    if file_path.endswith('.png'):
-                        self.send_header('Content-type', 'image/png')
-                    elif file_path.endswith('.jpg') or file_path.endswith('.jpeg'):
-                        self.send_header('Content-type', 'image/jpeg')
-                    else:
-                        self.send_header('Content-type', 'application/octet-stream')
-                    
+                # Set content type based on file extension
+                if file_path.endswith('.png'):
+                    self.send_header('Content-type', 'image/png')
+                elif file_path.endswith('.jpg') or file_path.endswith('.jpeg'):
+                    self.send_header('Content-type', 'image/jpeg')
+                else:
+                    self.send_header('Content-type', 'application/octet-stream')
+
+                with open(file_path, 'rb') as file:
+                    # Streamed, so the length comes from the file rather than a buffered body
+                    self.send_header('Content-Length', str(os.fstat(file.fileno()).st_size))
                     self.end_headers()
-                    with open(file_path, 'rb') as file:
-                        shutil.copyfileobj(file, self.wfile)
-                    return
+                    shutil.copyfileobj(file, self.wfile)
+                return
 
-        # Use global lora_path
         if parsed_url.path == '/load-loras':
-            print("Lora path = " + lora_path)
-            if not lora_path:
-                self.send_error(400, "Missing 'path' parameter")
+            if not roots:
+                self.send_error(400, "No models directory set. Please configure the models directory in Settings.")
+                return
+            if not any(os.path.isdir(root.path) for root in roots):
+                self.send_error(400, f"Invalid models directory: {', '.join(root.path for root in roots)}")
                 return
-            print("loading path: " + lora_path)  # Debug print
+            logger.debug("Loading paths: %s", roots)
 
             # Check if we need to refresh the cache
             refresh = query_params.get('refresh', ['false'])[0].lower() == 'true'
-            
-            # Use cached data if available and no refresh requested
-            if self.lora_data_cache is None or refresh:
-                print("Building lora data cache...")
-                self.lora_data_cache = self.get_lora_data(lora_path)
-                print(f"Cache built with {len(self.lora_data_cache)} items")
+            listings = model_index.listings(roots, refresh)
+            etag = model_listing.listing_etag(listings)
+
+            # no-cache: the client keeps the listing and revalidates it on every visit
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Cache-Control', 'no-cache')
+                self.end_headers()
+                return
+
+            # delta=true: an object with only the changes since the client's listing when possible
+            listing_history.remember(etag, listings)
+            if query_params.get('delta', ['false'])[0].lower() == 'true':
+                base = self.headers.get('If-None-Match')
+                delta = listing_history.delta(base, listings) if base else None
+                if delta is not None:
+                    changed, removed = delta
+                    lora_data = {
+                        'etag': etag,
+                        'base': base,
+                        'changed': changed,
+                        'removed': removed
+                    }
+                else:
+                    lora_data = {'etag': etag, 'models': [entry for listing in listings for entry in listing.entries()]}
             else:
-                print(f"Using cached data with {len(self.lora_data_cache)} items")
+                lora_data = [entry for listing in listings for entry in listing.entries()]
 
             self.send_response(200)
             self.send_header('Content-type', 'application/json')
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
             self.end_headers()
-            self.wfile.write(json.dumps(self.lora_data_cache).encode())
+            self.wfile.write(json_codec.dumps(lora_data))
         
+        elif parsed_url.path == '/index-status':
+            # Readiness: per-root scan state and progress, answered while a scan runs
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json_codec.dumps(model_index.status(roots)))
+
+        elif parsed_url.path == '/batch-move-status':
+            # Progress of a running (or recent) /batch-move, by the job id its client sent
+            progress = move_jobs.get(query_params.get('job', [''])[0])
+            if progress is None:
+                self.send_error(404, "Unknown job")
+                return
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.send_header('Cache-Control', 'no-store')
+            self.end_headers()
+            self.wfile.write(json_codec.dumps(progress.to_dict()))
+
+        elif parsed_url.path == '/duplicates':
+            # Groups of identical model files; the search runs in the background, so poll until state is "done"
+            if not roots:
+                self.send_error(400, "Models directory not set")
+                return
+            refresh = query_params.get('refresh', ['false'])[0].lower() == 'true'
+            key = model_listing.listing_etag(model_index.listings(roots))
+            report = duplicate_finder.report(key, model_index.records(roots), refresh)
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.send_header('Cache-Control', 'no-store')
+            self.end_headers()
+            self.wfile.write(json_codec.dumps(report))
+
+        elif parsed_url.path == '/search':
+            # Ranked, paginated search using the search-parser.js grammar
+            query = query_params.get('q', [''])[0]
+            sort = query_params.get('sort', ['relevance'])[0]
+            if sort not in search_index.SORT_OPTIONS:
+                sort = 'relevance'
+            try:
+                offset = max(0, int(query_params.get('offset', ['0'])[0]))
+                limit = max(0, int(query_params.get('limit', [str(search_index.DEFAULT_SEARCH_LIMIT)])[0]))
+            except ValueError:
+                self.send_error(400, "Invalid offset or limit")
+                return
+            include = None
+            if query_params.get('hideNSFW', ['false'])[0].lower() == 'true':
+                include = lambda record: not facet_index.is_nsfw(record)
+
+            start = time.perf_counter()
+            total, records = search_index.search(model_index.search_indexes(roots), query, sort, offset, limit, include)
+            logger.debug("Search %r: %d results in %.1f ms", query, total, (time.perf_counter() - start) * 1000)
+
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json_codec.dumps({
+                'query': query,
+                'sort': sort,
+                'total': total,
+                'offset': offset,
+                'limit': limit,
+                'results': [record.to_dict() for record in records]
+            }))
+
+        elif parsed_url.path == '/facets':
+            # Filter dropdown values with counts, optionally also within a query's results
+            query = query_params.get('q', [''])[0]
+            names = query_params.get('facets', [','.join(facet_index.FACETS)])[0].split(',')
+            names = [name for name in names if name in facet_index.FACETS]
+            try:
+                limit = int(query_params['limit'][0]) if 'limit' in query_params else None
+            except ValueError:
+                self.send_error(400, "Invalid limit")
+                return
+            hide_nsfw = query_params.get('hideNSFW', ['false'])[0].lower() == 'true'
+
+            start = time.perf_counter()
+            facet_indexes = model_index.facet_indexes(roots)
+            matches = search_index.match(model_index.search_indexes(roots), query) if query.strip() else None
+            facets = facet_index.facet_counts(facet_indexes, names, matches, hide_nsfw, limit)
+            logger.debug("Facets %r computed in %.1f ms", query, (time.perf_counter() - start) * 1000)
+
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json_codec.dumps({'query': query, 'facets': facets}))
+
+        elif parsed_url.path == '/civitai-info':
+            # Full civitai.info document for one model (the listing only carries a summary)
+            record = model_index.find(roots, query_params.get('id', [''])[0])
+            if not record:
+                self.send_error(404, "Model not found")
+                return
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json_codec.dumps(record.civitai_info()))
+
         elif parsed_url.path == '/load-settings':
-            settings = self.load_settings()
+            settings = settings_service.get()
             self.send_response(200)
             self.send_header('Content-type', 'application/json')
             self.end_headers()
-            self.wfile.write(json.dumps(settings).encode())
+            self.wfile.write(json_codec.dumps(settings))
             
         elif parsed_url.path == '/get-folders':
-            # Get list of all subdirectories in models directory
-            loraPath = self.load_settings().get('modelsDirectory', "")
-            if not loraPath or not os.path.exists(loraPath):
+            # Get list of all subdirectories in the models directories (optionally one root)
+            root_id = query_params.get('root', [''])[0]
+            if root_id:
+                roots = [root for root in roots if root.id == root_id]
+            roots = [root for root in roots if os.path.exists(root.path)]
+            if not roots:
                 self.send_error(400, "Models directory not set or does not exist")
                 return
             
+            # With several roots, folder names are prefixed with the root id
+            all_roots = self.configured_roots()
+            multi_root = len(all_roots) > 1
+            trees = dict(zip(all_roots, model_index.folder_trees(all_roots)))
             folders = []
-            # Add root option
-            folders.append({'path': '', 'name': 'Root'})
-            
-            # Walk through directory and collect all subdirectories
-            for root, dirs, files in os.walk(loraPath):
-                for dir_name in dirs:
-                    full_path = os.path.join(root, dir_name)
-                    # Get relative path from lora_path
-                    relative_path = os.path.relpath(full_path, loraPath)
+            for library_root in roots:
+                prefix = f"{library_root.id}/" if multi_root else ''
+
+                # Add root option, then every subdirectory from the index
+                folders.append({'path': '', 'name': f"{library_root.id} (Root)" if multi_root else 'Root', 'root': library_root.id})
+                for relative_path in trees[library_root].paths():
                     folders.append({
-                        'path': relative_path.replace("\\", "/"),
-                        'name': relative_path.replace("\\", "/")
+                        'path': relative_path,
+                        'name': prefix + relative_path,
+                        'root': library_root.id
                     })
             
             self.send_response(200)
             self.send_header('Content-type', 'application/json')
             self.end_headers()
-            self.wfile.write(json.dumps({'folders': folders}).encode())
+            self.wfile.write(json_codec.dumps({'folders': folders}))
             
+        elif parsed_url.path == '/folders':
+            # Folder tree with per-subtree model counts, sizes and dates, expanded on demand
+            root_id = query_params.get('root', [''])[0]
+            path = query_params.get('path', [''])[0]
+            try:
+                depth = max(0, int(query_params.get('depth', ['1'])[0]))
+            except ValueError:
+                self.send_error(400, "Invalid depth")
+                return
+
+            if root_id:
+                library_root = find_root(roots, root_id)
+                if not library_root:
+                    self.send_error(404, f"Unknown library root: {root_id}")
+                    return
+                tree = dict(zip(roots, model_index.folder_trees(roots)))[library_root]
+                folder = tree.subtree(path, depth)
+                if folder is None:
+                    self.send_error(404, f"Folder not found: {path}")
+                    return
+                response = dict(folder, root=library_root.id)
+            else:
+                # Without a root: the library roots themselves
+                response = {'roots': [
+                    dict(tree.subtree('', depth), root=library_root.id, name=library_root.id)
+                    for library_root, tree in zip(roots, model_index.folder_trees(roots))
+                ]}
+
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json_codec.dumps(response))
+
+        elif parsed_url.path == '/preview-bundle':
+            # Several preview images in one response (see preview_bundle.PreviewBundle); u = preview URL, repeated
+            members = []
+            for url in query_params.get('u', [])[:preview_bundle.MAX_BUNDLE_MEMBERS]:
+                file_path = self.model_file_path(url, roots)
+                if file_path:
+                    members.append((url, file_path))
+            bundle = preview_bundle.PreviewBundle(members)
+
+            # no-cache: always revalidate, so a replaced preview shows up on the next load
+            if self.headers.get('If-None-Match') == bundle.etag:
+                self.send_response(304)
+                self.send_header('ETag', bundle.etag)
+                self.send_header('Cache-Control', 'no-cache')
+                self.end_headers()
+                return
+
+            body = bundle.body(preview_cache)
+            self.send_response(200)
+            self.send_header('Content-type', 'application/octet-stream')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('ETag', bundle.etag)
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            self.wfile.write(body)
+
         elif parsed_url.path == '/edit-json':
             name = query_params.get('name', [''])[0]
             if not name:
                 self.send_error(400, "Missing 'name' parameter")
                 return
-            file_path = self.find_file_path(self.load_settings().get('modelsDirectory', ""), name + ".json")
+            model_id = query_params.get('id', [''])[0]
+            file_path = self.find_model_sidecar(self.configured_roots(), model_id, name, ".json")
             if not file_path:
                 self.send_error(404, "JSON File not found")
                 return
 
             try:
-                with open(file_path, 'r') as file:
-                    json_data = json.load(file)
-            except json.JSONDecodeError:
+                json_data = json_codec.read_json(file_path)
+            except ValueError:
                 self.send_error(500, "Invalid JSON format")
                 return
+            save_query = urllib.parse.urlencode({'name': name, 'id': model_id})
 
             html_content = f"""
             <!DOCTYPE html>
@@ -230,7 +541,7 @@ class LoraManagerHandler(http.server.SimpleHTTPRequestHandler):
               <script>
               function saveJson(){{
                 let jsonString = document.getElementById('json-editor').value;
-                fetch('/save-json?name={name}', {{
+                fetch('/save-json?{save_query}', {{
                   method: 'POST',
                   headers: {{
                     'Content-Type': 'application/json'
@@ -256,31 +567,92 @@ class LoraManagerHandler(http.server.SimpleHTTPRequestHandler):
             self.end_headers()
             self.wfile.write(html_content.encode())
 
+        elif parsed_url.path == '/debug/profiles':
+            if not self.is_local_client():
+                self.send_error(403, "Profiles are only available from localhost")
+                return
+            self.send_profiles_page()
+
         else:
           super().do_GET()
 
-    def do_POST(self):
+    def send_profiles_page(self):
+        """List recent request profiles with their top cumulative functions."""
+        directory = settings_service.get_setting('profilesDirectory') or request_profiler.DEFAULT_PROFILES_DIRECTORY
+        sections = []
+        for capture in request_profiler.list_captures(directory)[:20]:
+            try:
+                rows = request_profiler.top_functions(capture['path'])
+            except Exception as e:
+                sections.append(f"<h3>{html.escape(capture['name'])}</h3><p>Unreadable: {html.escape(str(e))}</p>")
+                continue
+            sampled = capture['name'].endswith(request_profiler.COLLAPSED_EXTENSION)
+            value_format = '{}' if sampled else '{:.4f}'
+            table_rows = ''.join(
+                "<tr><td>{}</td><td>{}</td><td>{}</td><td>{}</td></tr>".format(
+                    '' if row['calls'] is None else row['calls'],
+                    value_format.format(row['total']),
+                    value_format.format(row['cumulative']),
+                    html.escape(row['function']))
+                for row in rows
+            )
+            unit = 'samples' if sampled else 'seconds'
+            sections.append(f"""
+              <h3>{html.escape(capture['name'])}</h3>
+              <table>
+                <tr><th>calls</th><th>own ({unit})</th><th>cumulative ({unit})</th><th>function</th></tr>
+                {table_rows}
+              </table>
+            """)
+
+        html_content = f"""
+            <!DOCTYPE html>
+            <html>
+            <head>
+                <title>Request Profiles</title>
+                <style>
+                  body{{
+                    font-family:monospace;
+                  }}
+                  td, th{{
+                    padding: 2px 8px;
+                    text-align: left;
+                  }}
+                </style>
+            </head>
+            <body>
+              <h2>Request Profiles</h2>
+              <p>Directory: {html.escape(directory)}</p>
+              {''.join(sections) or '<p>No captures yet. Add ?__profile=1 to a request to record one.</p>'}
+            </body>
+            </html>
+            """
+
+        self.send_response(200)
+        self.send_header('Content-type', 'text/html')
+        self.end_headers()
+        self.wfile.write(html_content.encode())
+
+    def handle_post(self):
         parsed_url = urllib.parse.urlparse(self.path)
         content_length = int(self.headers['Content-Length'])
         
-        # For file uploads, don't read post_data - let cgi.FieldStorage handle it
+        # Uploads are streamed from rfile by the multipart parser
         if parsed_url.path == '/upload-preview':
-            # Skip reading post_data for multipart uploads
             post_data = None
         else:
             post_data = self.rfile.read(content_length)
 
         if parsed_url.path == '/save-settings':
-            data = json.loads(post_data)
-            self.save_settings(data)
-            # Invalidate cache if models directory changed
-            if 'modelsDirectory' in data and self.lora_data_cache is not None:
-                self.lora_data_cache = None
-                print("Cache invalidated due to settings change")
+            data = json_codec.loads(post_data)
+            # Subscribers rebuild the index if the models directory changed
+            if not settings_service.save(data):
+                self.send_error(500, "Error saving settings")
+                return
             self.send_response(200)
             self.send_header('Content-type', 'application/json')
             self.end_headers()
-            self.wfile.write(json.dumps({'status': 'success'}).encode())
+            self.wfile.write(json_codec.dumps({'status': 'success'}))
 
         elif parsed_url.path == '/save-json':
             query_params = urllib.parse.parse_qs(parsed_url.query)
@@ -289,15 +661,15 @@ class LoraManagerHandler(http.server.SimpleHTTPRequestHandler):
                 self.send_error(400, "Missing 'name' parameter")
                 return
             
-            loraPath = self.load_settings().get('modelsDirectory', "")
-            file_path = self.find_file_path(loraPath, name + ".json")
+            # The id picks the right model when several roots hold the same name
+            file_path = self.find_model_sidecar(self.configured_roots(), query_params.get('id', [''])[0], name, ".json")
             if not file_path:
                 self.send_error(404, "JSON File not found")
                 return
 
             try:
-                json_data = json.loads(post_data)
-            except json.JSONDecodeError:
+                json_data = json_codec.loads(post_data)
+            except ValueError:
                 self.send_error(400, "Invalid JSON format")
                 return
 
@@ -306,8 +678,7 @@ class LoraManagerHandler(http.server.SimpleHTTPRequestHandler):
                     json.dump(json_data, file, indent=4)
                 
                 # Invalidate cache after JSON edit
-                self.lora_data_cache = None
-                print("Cache invalidated due to JSON edit")
+                self.invalidate_for_path(file_path, 'JSON edit')
             except Exception as e:
                 self.send_error(500, f"Error saving JSON: {e}")
                 return
@@ -315,7 +686,7 @@ class LoraManagerHandler(http.server.SimpleHTTPRequestHandler):
             self.send_response(200)
             self.send_header('Content-type', 'application/json')
             self.end_headers()
-            self.wfile.write(json.dumps({'status': 'success'}).encode())
+            self.wfile.write(json_codec.dumps({'status': 'success'}))
             
         elif parsed_url.path == '/save-civitai':
             query_params = urllib.parse.parse_qs(parsed_url.query)
@@ -324,21 +695,21 @@ class LoraManagerHandler(http.server.SimpleHTTPRequestHandler):
                 self.send_error(400, "Missing 'name' parameter")
                 return
             
-            loraPath = self.load_settings().get('modelsDirectory', "")
-            file_path = self.find_file_path(loraPath, name + ".civitai.info")
+            file_path = self.find_model_sidecar(self.configured_roots(), query_params.get('id', [''])[0], name, ".civitai.info")
             if not file_path:
                 self.send_error(404, "Civitai Info File not found")
                 return
 
             try:
-                json_data = json.loads(post_data)
-            except json.JSONDecodeError:
+                json_data = json_codec.loads(post_data)
+            except ValueError:
                 self.send_error(400, "Invalid JSON format")
                 return
 
             try:
                 with open(file_path, 'w') as file:
                     json.dump(json_data, file, indent=4)
+                self.invalidate_for_path(file_path, 'civitai info edit')
             except Exception as e:
                 self.send_error(500, f"Error saving Civitai Info: {e}")
                 return
@@ -346,29 +717,29 @@ class LoraManagerHandler(http.server.SimpleHTTPRequestHandler):
             self.send_response(200)
             self.send_header('Content-type', 'application/json')
             self.end_headers()
-            self.wfile.write(json.dumps({'status': 'success'}).encode())
+            self.wfile.write(json_codec.dumps({'status': 'success'}))
 
         elif parsed_url.path == '/save-model':
-            data = json.loads(post_data)
+            data = json_codec.loads(post_data)
             model_name = data.get('name')
             if not model_name:
                 self.send_error(400, "Missing 'name' parameter")
                 return
                 
-            loraPath = self.load_settings().get('modelsDirectory', "")
-            json_path = self.find_file_path(loraPath, model_name + ".json")
+            roots = self.configured_roots()
+            json_path = self.find_model_sidecar(roots, data.get('id'), model_name, ".json")
             
             # If JSON doesn't exist, create it in the same directory as the model file
             if not json_path:
                 # Find the model file to determine where to create the JSON
-                model_path = self.find_file_path(loraPath, model_name + ".safetensors")
-                if not model_path:
+                model_dir, model_name = self.find_model_dir(roots, data.get('id'), model_name)
+                if not model_dir:
                     self.send_error(404, "Model file not found")
                     return
                 
                 # Create JSON path in the same directory as the model
-                json_path = os.path.splitext(model_path)[0] + ".json"
-                print(f"Creating new JSON file at: {json_path}")
+                json_path = os.path.join(model_dir, model_name + ".json")
+                logger.info("Creating new JSON file at: %s", json_path)
                 
             try:
                 # Update the JSON file with the model's json data
@@ -376,35 +747,141 @@ class LoraManagerHandler(http.server.SimpleHTTPRequestHandler):
                     json.dump(data.get('json', {}), file, indent=4)
                     
                 # Invalidate cache after model edit
-                self.lora_data_cache = None
-                print("Cache invalidated due to model edit")
+                self.invalidate_for_path(json_path, 'model edit')
                 
                 self.send_response(200)
                 self.send_header('Content-type', 'application/json')
                 self.end_headers()
-                self.wfile.write(json.dumps({'status': 'success'}).encode())
+                self.wfile.write(json_codec.dumps({'status': 'success'}))
                 return
             except Exception as e:
                 self.send_error(500, f"Error saving model: {e}")
                 return
-                
+
+        elif parsed_url.path == '/batch-update':
+            # One operation on many sidecars: {"ids": [...]} or {"query": "..."}, plus
+            # {"operation": {...}} (see model_metadata.batch_operation) and optional {"versions": {id: version}}
+            try:
+                data = json_codec.loads(post_data)
+                operation = model_metadata.batch_operation(data.get('operation'))
+            except (ValueError, AttributeError) as e:
+                self.send_error(400, f"Invalid batch update: {e}")
+                return
+            roots = self.configured_roots()
+            if isinstance(data.get('ids'), list):
+                model_ids = [model_id for model_id in data['ids'] if isinstance(model_id, str)]
+            elif isinstance(data.get('query'), str) and data['query'].strip():
+                include = (lambda record: not facet_index.is_nsfw(record)) if data.get('hideNSFW') else None
+                model_ids = model_metadata.matching_model_ids(model_index, roots, data['query'], include)
+            else:
+                self.send_error(400, "Expected a list of ids or a search query")
+                return
+            versions = data.get('versions') if isinstance(data.get('versions'), dict) else None
+
+            start = time.perf_counter()
+            results = model_metadata.batch_update_json(model_index, roots, model_ids, operation, versions)
+            counts = {status: 0 for status in ('updated', 'unchanged', 'conflict', 'not_found', 'error')}
+            for result in results:
+                counts[result['status']] += 1
+            logger.info("Batch update of %d models in %.2fs: %s", len(results), time.perf_counter() - start,
+                        ', '.join(f"{count} {status}" for status, count in counts.items() if count))
+
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json_codec.dumps({'total': len(results), **counts, 'results': results}))
+
+        elif parsed_url.path == '/batch-move':
+            # Move/rename many models: {"moves": [{"id", "targetFolder", "targetRoot", "newName"}]}, or
+            # {"ids": [...]} / {"query": "..."} with a shared "targetFolder"/"targetRoot" and/or
+            # "rename": {"pattern", "replacement"}; "job" names the run for /batch-move-status
+            try:
+                data = json_codec.loads(post_data)
+                rename = model_moves.rename_pattern(data['rename']) if data.get('rename') is not None else None
+            except (ValueError, AttributeError) as e:
+                self.send_error(400, f"Invalid batch move: {e}")
+                return
+            roots = self.configured_roots()
+            if isinstance(data.get('moves'), list):
+                moves = [move for move in data['moves'] if isinstance(move, dict)]
+            else:
+                if isinstance(data.get('ids'), list):
+                    model_ids = [model_id for model_id in data['ids'] if isinstance(model_id, str)]
+                elif isinstance(data.get('query'), str) and data['query'].strip():
+                    include = (lambda record: not facet_index.is_nsfw(record)) if data.get('hideNSFW') else None
+                    model_ids = model_metadata.matching_model_ids(model_index, roots, data['query'], include)
+                else:
+                    self.send_error(400, "Expected moves, a list of ids or a search query")
+                    return
+                shared = {key: data[key] for key in ('targetFolder', 'targetRoot') if key in data}
+                if not shared and rename is None:
+                    self.send_error(400, "Expected a targetFolder, targetRoot or rename")
+                    return
+                moves = [{'id': model_id, **shared} for model_id in model_ids]
+
+            start = time.perf_counter()
+            progress = move_jobs.start(data.get('job'))
+            results = model_moves.batch_move(model_index, roots, moves, rename, progress)
+            counts = {status: 0 for status in ('moved', 'unchanged', 'conflict', 'invalid', 'not_found', 'error')}
+            for result in results:
+                counts[result['status']] += 1
+            logger.info("Batch move of %d models in %.2fs (%d bytes copied): %s", len(results), time.perf_counter() - start,
+                        progress.copied, ', '.join(f"{count} {status}" for status, count in counts.items() if count))
+
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json_codec.dumps({'total': len(results), **counts, 'results': results}))
+
+        elif parsed_url.path == '/duplicates/resolve':
+            # {"action": "delete"|"hardlink"|"quarantine", "merges": [{"keep": id, "remove": [ids]}]}
+            try:
+                data = json_codec.loads(post_data)
+                action = data.get('action')
+                merges = [merge for merge in data.get('merges', []) if isinstance(merge, dict)]
+                if action not in duplicates.RESOLVE_ACTIONS:
+                    raise ValueError(f"action must be one of {', '.join(duplicates.RESOLVE_ACTIONS)}")
+            except (ValueError, AttributeError, TypeError) as e:
+                self.send_error(400, f"Invalid duplicate merge: {e}")
+                return
+
+            start = time.perf_counter()
+            results, freed = duplicates.resolve_duplicates(model_index, self.configured_roots(), hash_cache, merges, action,
+                                                           settings_service.get_setting('quarantineDirectory', ''))
+            counts = {}
+            for result in results:
+                counts[result['status']] = counts.get(result['status'], 0) + 1
+            logger.info("Duplicate merge (%s) in %.2fs: %d bytes freed, %s", action, time.perf_counter() - start, freed,
+                        ', '.join(f"{count} {status}" for status, count in counts.items()) or 'nothing to do')
+
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json_codec.dumps({'action': action, 'freed': freed, 'counts': counts, 'results': results}))
+
         elif parsed_url.path == '/rename-lora':
-            data = json.loads(post_data)
+            data = json_codec.loads(post_data)
             old_name = data.get('oldName')
             new_name = data.get('newName')
             if not old_name or not new_name:
                 self.send_error(400, "Missing 'oldName' or 'newName' parameter")
                 return
             
-            loraPath = self.load_settings().get('modelsDirectory', "")
-            
-            
+            # Look for the files in the model's own folder, found by id (name as a fallback);
+            # search every root only if the model file is missing
+            roots = self.configured_roots()
+            model_dir, _ = self.find_model_dir(roots, data.get('id'), old_name)
+            model_root = root_for_path(roots, model_dir) if model_dir else None
+            if model_dir:
+                find_old_file = lambda filename: self.find_in_directory(model_dir, filename)
+            else:
+                find_old_file = lambda filename: self.find_model_file(filename, roots)
             
             # Find the original files with case-insensitive search
-            old_model_path = self.find_file_path(loraPath, old_name + ".safetensors")
-            old_preview_path = self.find_file_path(loraPath, old_name + ".preview.png")
-            old_json_path = self.find_file_path(loraPath, old_name + ".json")
-            old_civitai_path = self.find_file_path(loraPath, old_name + ".civitai.info")
+            old_model_path = find_old_file(old_name + ".safetensors")
+            old_preview_path = find_old_file(old_name + ".preview.png")
+            old_json_path = find_old_file(old_name + ".json")
+            old_civitai_path = find_old_file(old_name + ".civitai.info")
             
             # Find extra preview files (preview2, preview3, preview4)
             old_preview_paths = []
@@ -412,7 +889,7 @@ class LoraManagerHandler(http.server.SimpleHTTPRequestHandler):
                 old_preview_paths.append((old_preview_path, ".preview.png"))
             
             for i in range(2, 5):  # Check preview2, preview3, preview4
-                extra_preview = self.find_file_path(loraPath, f"{old_name}.preview{i}.png")
+                extra_preview = find_old_file(f"{old_name}.preview{i}.png")
                 if extra_preview:
                     old_preview_paths.append((extra_preview, f".preview{i}.png"))
             
@@ -433,64 +910,80 @@ class LoraManagerHandler(http.server.SimpleHTTPRequestHandler):
                 if old_model_path and os.path.exists(old_model_path):
                     os.rename(old_model_path, new_model_path)
                 else:
-                    print(f"Warning: Could not find model file to rename: {old_name}.safetensors")
+                    logger.warning("Could not find model file to rename: %s.safetensors", old_name)
                 
                 # Rename all preview files found
                 for old_path, extension in old_preview_paths:
                     if os.path.exists(old_path):
                         new_preview_path = os.path.join(os.path.dirname(old_path), new_name + extension)
                         os.rename(old_path, new_preview_path)
-                        print(f"Renamed preview: {old_path} -> {new_preview_path}")
+                        logger.info("Renamed preview: %s -> %s", old_path, new_preview_path)
                 
                 if not old_preview_paths:
-                    print(f"Warning: Could not find any preview files to rename for: {old_name}")
+                    logger.warning("Could not find any preview files to rename for: %s", old_name)
                 
                 if old_json_path and os.path.exists(old_json_path):
                     os.rename(old_json_path, new_json_path)
                 else:
-                    print(f"Warning: Could not find JSON file to rename: {old_name}.json")
+                    logger.warning("Could not find JSON file to rename: %s.json", old_name)
                 
                 if old_civitai_path and os.path.exists(old_civitai_path):
                     os.rename(old_civitai_path, new_civitai_path)
 
+                model_index.invalidate(model_root.id if model_root else None, 'rename')
+
             except Exception as e:
                 self.send_error(500, f"Error renaming Lora: {e}")
                 return
             
+            response = {'status': 'success'}
+            if model_root:
+                # The model's new id, so the client can keep following it
+                relative_dir = os.path.relpath(model_dir, model_root.path).replace(os.sep, '/')
+                response['id'] = f"{model_root.id}/{relative_dir + '/' if relative_dir != '.' else ''}{new_name}"
             self.send_response(200)
             self.send_header('Content-type', 'application/json')
             self.end_headers()
-            self.wfile.write(json.dumps({'status': 'success'}).encode())
+            self.wfile.write(json_codec.dumps(response))
             
         elif parsed_url.path == '/move-model':
             # Move a model and all its associated files to a new folder
-            data = json.loads(post_data)
+            data = json_codec.loads(post_data)
             model_name = data.get('modelName')
             target_folder = data.get('targetFolder', '')  # Empty string means root
+            target_root_id = data.get('targetRoot', '')  # Empty string means the model's current root
             
             if not model_name:
                 self.send_error(400, "Missing 'modelName' parameter")
                 return
             
-            loraPath = self.load_settings().get('modelsDirectory', "")
-            if not loraPath:
+            roots = self.configured_roots()
+            if not roots:
                 self.send_error(400, "Models directory not set")
                 return
             
-            # Find all associated files for this model
-            model_file = self.find_file_path(loraPath, model_name + ".safetensors")
-            if not model_file:
+            # Find the model by id (name as a fallback)
+            current_dir, model_name = self.find_model_dir(roots, data.get('modelId'), model_name)
+            if not current_dir:
                 self.send_error(404, "Model file not found")
                 return
             
-            # Get the current directory of the model
-            current_dir = os.path.dirname(model_file)
+            # Get the root of the model
+            source_root = root_for_path(roots, current_dir)
+            target_root = find_root(roots, target_root_id) if target_root_id else source_root
+            if not target_root:
+                self.send_error(400, f"Unknown target root: {target_root_id}")
+                return
+            loraPath = target_root.path
             
             # Determine target directory
             if target_folder:
                 target_dir = os.path.join(loraPath, target_folder)
             else:
                 target_dir = loraPath
+            if not root_for_path([target_root], target_dir):
+                self.send_error(400, "Target folder is outside the models directory")
+                return
             
             # Create target directory if it doesn't exist
             if not os.path.exists(target_dir):
@@ -513,7 +1006,7 @@ class LoraManagerHandler(http.server.SimpleHTTPRequestHandler):
             ]
             
             for ext in extensions:
-                file_path = self.find_file_path(loraPath, model_name + ext)
+                file_path = self.find_in_directory(current_dir, model_name + ext)
                 if file_path and os.path.exists(file_path):
                     files_to_move.append(file_path)
             
@@ -528,21 +1021,23 @@ class LoraManagerHandler(http.server.SimpleHTTPRequestHandler):
                         self.send_error(409, f"File already exists in target directory: {filename}")
                         return
                     
+                    # Same-device moves are renames; moves across roots fall back to copy + delete
                     shutil.move(file_path, new_path)
-                    print(f"Moved: {file_path} -> {new_path}")
+                    logger.info("Moved: %s -> %s", file_path, new_path)
                 
-                # Invalidate cache after successful move
-                self.lora_data_cache = None
-                print("Cache invalidated due to model move")
+                # Invalidate the affected shards after successful move
+                model_index.invalidate(source_root.id, 'model move')
+                if target_root != source_root:
+                    model_index.invalidate(target_root.id, 'model move')
                 
                 self.send_response(200)
                 self.send_header('Content-type', 'application/json')
                 self.end_headers()
-                self.wfile.write(json.dumps({
+                self.wfile.write(json_codec.dumps({
                     'status': 'success',
                     'message': f'Moved {len(files_to_move)} file(s) successfully',
                     'filesMoved': len(files_to_move)
-                }).encode())
+                }))
                 
             except Exception as e:
                 self.send_error(500, f"Error moving files: {e}")
@@ -551,24 +1046,26 @@ class LoraManagerHandler(http.server.SimpleHTTPRequestHandler):
         elif parsed_url.path == '/civitai/scan-models':
             # Scan models directory and return list with status
             try:
-                loraPath = self.load_settings().get('modelsDirectory', "")
-                if not loraPath:
+                roots = self.configured_roots()
+                if not roots:
                     self.send_error(400, "Models directory not set")
                     return
                 
-                models = civitai_handler.scan_models_directory(loraPath)
+                models = []
+                for root in roots:
+                    models.extend(civitai_handler.scan_models_directory(root.path))
                 
                 self.send_response(200)
                 self.send_header('Content-type', 'application/json')
                 self.end_headers()
-                self.wfile.write(json.dumps({'status': 'success', 'models': models}).encode())
+                self.wfile.write(json_codec.dumps({'status': 'success', 'models': models}))
             except Exception as e:
                 self.send_error(500, f"Error scanning models: {e}")
                 
         elif parsed_url.path == '/civitai/get-model-info':
             # Generate hash and fetch model info from Civitai
             try:
-                data = json.loads(post_data)
+                data = json_codec.loads(post_data)
                 model_path = data.get('modelPath')
                 
                 if not model_path:
@@ -576,31 +1073,31 @@ class LoraManagerHandler(http.server.SimpleHTTPRequestHandler):
                     return
                 
                 # Generate SHA256 hash
-                print(f"Generating SHA256 for: {model_path}")
+                logger.info("Generating SHA256 for: %s", model_path)
                 file_hash = civitai_handler.generate_sha256(model_path)
                 
                 if not file_hash:
                     self.send_response(200)
                     self.send_header('Content-type', 'application/json')
                     self.end_headers()
-                    self.wfile.write(json.dumps({
+                    self.wfile.write(json_codec.dumps({
                         'status': 'error',
                         'message': 'Failed to generate SHA256 hash'
-                    }).encode())
+                    }))
                     return
                 
                 # Fetch model info from Civitai
-                print(f"Fetching model info for hash: {file_hash}")
+                logger.info("Fetching model info for hash: %s", file_hash)
                 model_info = civitai_handler.fetch_model_info_by_hash(file_hash)
                 
                 if model_info is None:
                     self.send_response(200)
                     self.send_header('Content-type', 'application/json')
                     self.end_headers()
-                    self.wfile.write(json.dumps({
+                    self.wfile.write(json_codec.dumps({
                         'status': 'error',
                         'message': 'Failed to connect to Civitai API'
-                    }).encode())
+                    }))
                     return
                 
                 if not model_info:
@@ -608,10 +1105,10 @@ class LoraManagerHandler(http.server.SimpleHTTPRequestHandler):
                     self.send_response(200)
                     self.send_header('Content-type', 'application/json')
                     self.end_headers()
-                    self.wfile.write(json.dumps({
+                    self.wfile.write(json_codec.dumps({
                         'status': 'not_found',
                         'message': 'Model not found on Civitai'
-                    }).encode())
+                    }))
                     return
                 
                 # Save civitai info file
@@ -621,29 +1118,29 @@ class LoraManagerHandler(http.server.SimpleHTTPRequestHandler):
                     self.send_response(200)
                     self.send_header('Content-type', 'application/json')
                     self.end_headers()
-                    self.wfile.write(json.dumps({
+                    self.wfile.write(json_codec.dumps({
                         'status': 'error',
                         'message': 'Failed to save civitai info file'
-                    }).encode())
+                    }))
                     return
                 
                 self.send_response(200)
                 self.send_header('Content-type', 'application/json')
                 self.end_headers()
-                self.wfile.write(json.dumps({
+                self.wfile.write(json_codec.dumps({
                     'status': 'success',
                     'message': 'Model info saved successfully',
                     'modelInfo': model_info
-                }).encode())
+                }))
                 
             except Exception as e:
-                print(f"Error in get-model-info: {e}")
+                logger.error("Error in get-model-info: %s", e)
                 self.send_error(500, f"Error: {e}")
                 
         elif parsed_url.path == '/civitai/download-preview':
             # Download preview image for a model
             try:
-                data = json.loads(post_data)
+                data = json_codec.loads(post_data)
                 model_path = data.get('modelPath')
                 max_size = data.get('maxSize', False)
                 skip_nsfw = data.get('skipNsfw', True)
@@ -652,25 +1149,25 @@ class LoraManagerHandler(http.server.SimpleHTTPRequestHandler):
                     self.send_error(400, "Missing modelPath parameter")
                     return
                 
-                print(f"Downloading preview for: {model_path}")
+                logger.info("Downloading preview for: %s", model_path)
                 success = civitai_handler.download_preview_image(model_path, max_size, skip_nsfw)
                 
                 self.send_response(200)
                 self.send_header('Content-type', 'application/json')
                 self.end_headers()
-                self.wfile.write(json.dumps({
+                self.wfile.write(json_codec.dumps({
                     'status': 'success' if success else 'skipped',
                     'message': 'Preview downloaded' if success else 'Preview skipped or already exists'
-                }).encode())
+                }))
                 
             except Exception as e:
-                print(f"Error in download-preview: {e}")
+                logger.error("Error in download-preview: %s", e)
                 self.send_error(500, f"Error: {e}")
                 
         elif parsed_url.path == '/civitai/convert-to-json':
             # Convert civitai.info to JSON format
             try:
-                data = json.loads(post_data)
+                data = json_codec.loads(post_data)
                 model_path = data.get('modelPath')
                 use_api = data.get('useApi', True)
                 
@@ -686,225 +1183,192 @@ class LoraManagerHandler(http.server.SimpleHTTPRequestHandler):
                     self.send_response(200)
                     self.send_header('Content-type', 'application/json')
                     self.end_headers()
-                    self.wfile.write(json.dumps({
+                    self.wfile.write(json_codec.dumps({
                         'status': 'error',
                         'message': 'No .civitai.info file found'
-                    }).encode())
+                    }))
                     return
                 
-                # Check for existing JSON to preserve creator info
-                json_path = f"{base_path}.json"
-                existing_creator = ''
-                if os.path.exists(json_path):
-                    try:
-                        with open(json_path, 'r', encoding='utf-8') as f:
-                            existing_json = json.load(f)
-                            existing_creator = existing_json.get('creator', '')
-                    except:
-                        pass
-                
-                # Convert using the imported module
-                print(f"Converting to JSON: {info_path}")
-                
-                # Track if API call will be made
-                # API call only happens if: use_api is True AND existing_creator is empty
-                api_call_made = use_api and not existing_creator
-                
-                mapped_data = json_converter.parse_civitai_info_file(info_path, use_api, existing_creator)
-                
-                # Preserve existing data for certain fields (same logic as in zCivitai-2-JSONv4.py)
-                if os.path.exists(json_path):
-                    try:
-                        with open(json_path, 'r', encoding='utf-8') as f:
-                            existing_data = json.load(f)
-                            
-                            print(f"DEBUG: Existing data loaded: {existing_data}")
-                            
-                            # Fields to preserve if already populated
-                            fields_to_preserve = [
-                                'activation text', 'sd version', 'preferred weight',
-                                'negative text', 'civitai text', 
-                                'nsfw', 'url', 'base model', 'example prompt',
-                                'category', 'subcategory', 'tags', 'creator',
-                                'name', 'model version', 'high low'  # New fields to preserve
-                            ]
-                            for field in fields_to_preserve:
-                                # If field exists in existing data and has a value, keep the existing value
-                                # Otherwise, use the new value from civitai.info
-                                # Check explicitly for None and empty string to handle 0 and other falsy values correctly
-                                if field in existing_data and existing_data[field] is not None and existing_data[field] != '':
-                                    print(f"DEBUG: Preserving field '{field}': '{existing_data[field]}'")
-                                    # Existing field has data, preserve it
-                                    mapped_data[field] = existing_data[field]
-                                else:
-                                    print(f"DEBUG: Not preserving field '{field}' (empty or missing)")
-                    except Exception as e:
-                        print(f"Error reading existing JSON for field preservation: {e}")
-                
-                json_converter.write_json_file(info_path, mapped_data)
+                # Convert using the imported module; existing creator and
+                # user-populated fields are preserved, unchanged files are not rewritten
+                logger.info("Converting to JSON: %s", info_path)
+                result = json_converter.convert_info_file(info_path, use_api)
+                if result['status'] == 'error':
+                    raise RuntimeError(result['error'])
+                api_call_made = result['apiCallMade']
                 
                 # Invalidate cache
-                self.lora_data_cache = None
+                self.invalidate_for_path(info_path, 'JSON conversion')
                 
                 self.send_response(200)
                 self.send_header('Content-type', 'application/json')
                 self.end_headers()
-                self.wfile.write(json.dumps({
+                self.wfile.write(json_codec.dumps({
                     'status': 'success',
                     'message': 'Converted to JSON successfully',
                     'apiCallMade': api_call_made
-                }).encode())
+                }))
                 
             except Exception as e:
-                print(f"Error in convert-to-json: {e}")
+                logger.error("Error in convert-to-json: %s", e)
                 self.send_error(500, f"Error: {e}")
                 
         elif parsed_url.path == '/civitai/fix-thumbnail':
             # Fix thumbnail name to .preview.png format
             try:
-                data = json.loads(post_data)
+                data = json_codec.loads(post_data)
                 model_path = data.get('modelPath')
                 
                 if not model_path:
                     self.send_error(400, "Missing modelPath parameter")
                     return
                 
-                print(f"Fixing thumbnail for: {model_path}")
+                logger.info("Fixing thumbnail for: %s", model_path)
                 status, message = civitai_handler.fix_thumbnail_name(model_path)
                 
                 self.send_response(200)
                 self.send_header('Content-type', 'application/json')
                 self.end_headers()
-                self.wfile.write(json.dumps({
+                self.wfile.write(json_codec.dumps({
                     'status': status,
                     'message': message
-                }).encode())
+                }))
                 
             except Exception as e:
-                print(f"Error in fix-thumbnail: {e}")
+                logger.error("Error in fix-thumbnail: %s", e)
                 self.send_error(500, f"Error: {e}")
                 
         elif parsed_url.path == '/civitai/create-dummy-info':
             # Create an empty .civitai.info file for models not found on Civitai
             try:
-                data = json.loads(post_data)
+                data = json_codec.loads(post_data)
                 model_path = data.get('modelPath')
                 
                 if not model_path:
                     self.send_error(400, "Missing modelPath parameter")
                     return
                 
-                print(f"Creating dummy info file for: {model_path}")
+                logger.info("Creating dummy info file for: %s", model_path)
                 success = civitai_handler.create_dummy_info_file(model_path)
                 
                 if success:
                     # Invalidate cache
-                    self.lora_data_cache = None
+                    self.invalidate_for_path(model_path, 'dummy info file')
                     
                     self.send_response(200)
                     self.send_header('Content-type', 'application/json')
                     self.end_headers()
-                    self.wfile.write(json.dumps({
+                    self.wfile.write(json_codec.dumps({
                         'status': 'success',
                         'message': 'Dummy info file created successfully'
-                    }).encode())
+                    }))
                 else:
                     self.send_response(200)
                     self.send_header('Content-type', 'application/json')
                     self.end_headers()
-                    self.wfile.write(json.dumps({
+                    self.wfile.write(json_codec.dumps({
                         'status': 'error',
                         'message': 'Failed to create dummy info file'
-                    }).encode())
+                    }))
                 
             except Exception as e:
-                print(f"Error in create-dummy-info: {e}")
+                logger.error("Error in create-dummy-info: %s", e)
                 self.send_error(500, f"Error: {e}")
                 
         elif parsed_url.path == '/upload-preview':
-            # Upload a preview image for a model
+            # Upload a preview image for a model, streamed to a temp file in the model's folder
+            temp_path = None
             try:
-                import cgi
-                from io import BytesIO
-                
-                # Parse multipart form data using cgi module
-                form = cgi.FieldStorage(
-                    fp=self.rfile,
-                    headers=self.headers,
-                    environ={
-                        'REQUEST_METHOD': 'POST',
-                        'CONTENT_TYPE': self.headers['Content-Type'],
-                    }
-                )
-                
-                # Get model name and image file
-                model_name = form.getvalue('modelName')
-                image_file = form['imageFile']
-                
-                if not model_name or not image_file.file:
+                if content_length > MAX_PREVIEW_UPLOAD_SIZE + MULTIPART_OVERHEAD:
+                    self.close_connection = True
+                    self.send_error(413, f"Image file is larger than {MAX_PREVIEW_UPLOAD_SIZE // (1024 * 1024)} MB")
+                    return
+
+                roots = self.configured_roots()
+                if not roots:
+                    self.close_connection = True
+                    self.send_error(400, "Models directory not set")
+                    return
+
+                # The client sends modelId/modelName before imageFile, so the
+                # target folder is known before the image data arrives
+                model_id = model_name = model_dir = None
+                for part in MultipartParser(self.rfile, self.headers['Content-Type'], content_length):
+                    if part.name == 'modelId':
+                        model_id = part.read_text().strip()
+                    elif part.name == 'modelName':
+                        model_name = part.read_text().strip()
+                    elif part.name == 'imageFile' and temp_path is None:
+                        if not model_id and not model_name:
+                            self.close_connection = True
+                            self.send_error(400, "Missing modelName or imageFile")
+                            return
+                        model_dir, model_name = self.find_model_dir(roots, model_id, model_name)
+                        if not model_dir:
+                            self.close_connection = True
+                            self.send_error(404, "Model not found")
+                            return
+                        temp_path, image_size = file_utils.stream_to_temp_file(
+                            model_dir, part.chunks(), MAX_PREVIEW_UPLOAD_SIZE, suffix='.upload')
+
+                if temp_path is None:
                     self.send_error(400, "Missing modelName or imageFile")
                     return
-                
-                # Read image data
-                image_data = image_file.file.read()
-                
-                if not image_data:
+                if not image_size:
                     self.send_error(400, "Empty image file")
                     return
-                
-                loraPath = self.load_settings().get('modelsDirectory', "")
-                if not loraPath:
-                    self.send_error(400, "Models directory not set")
-                    return
-                
-                # Find the model file to get its directory
-                model_file = self.find_file_path(loraPath, model_name + ".safetensors")
-                if not model_file:
-                    self.send_error(404, "Model not found")
+                if not file_utils.sniff_image_type(temp_path):
+                    self.send_error(400, "Not a PNG or JPEG image")
                     return
-                
-                model_dir = os.path.dirname(model_file)
-                
-                # Determine next preview number
+
+                # Next free preview slot: name.preview.png, then name.preview2.png, ...
                 preview_num = ""
                 if os.path.exists(os.path.join(model_dir, f"{model_name}.preview.png")):
-                    # preview.png exists, find next number
                     n = 2
                     while os.path.exists(os.path.join(model_dir, f"{model_name}.preview{n}.png")):
                         n += 1
                     preview_num = str(n)
-                
-                # Save the image file
+
                 preview_filename = f"{model_name}.preview{preview_num}.png"
                 preview_path = os.path.join(model_dir, preview_filename)
-                
-                with open(preview_path, 'wb') as f:
-                    f.write(image_data)
-                
-                print(f"Saved preview image: {preview_path}")
-                
+                os.replace(temp_path, preview_path)
+                temp_path = None
+
+                logger.info("Saved preview image: %s (%d bytes)", preview_path, image_size)
+
                 # Invalidate cache
-                self.lora_data_cache = None
-                
+                self.invalidate_for_path(preview_path, 'preview upload')
+
                 self.send_response(200)
                 self.send_header('Content-type', 'application/json')
                 self.end_headers()
-                self.wfile.write(json.dumps({
+                self.wfile.write(json_codec.dumps({
                     'status': 'success',
                     'message': f'Preview image saved as {preview_filename}',
                     'filename': preview_filename
-                }).encode())
-                
+                }))
+
+            except file_utils.FileTooLargeError:
+                self.close_connection = True
+                self.send_error(413, f"Image file is larger than {MAX_PREVIEW_UPLOAD_SIZE // (1024 * 1024)} MB")
+            except MultipartError as e:
+                self.close_connection = True
+                self.send_error(400, f"Invalid upload: {e}")
             except Exception as e:
-                print(f"Error in upload-preview: {e}")
-                import traceback
-                traceback.print_exc()
+                self.close_connection = True
+                logger.exception("Error in upload-preview: %s", e)
                 self.send_error(500, f"Error: {e}")
+            finally:
+                if temp_path is not None:
+                    try:
+                        os.remove(temp_path)
+                    except OSError:
+                        pass
 
         elif parsed_url.path == '/delete-thumbnail':
             # Delete a specific thumbnail and renumber remaining ones
             try:
-                data = json.loads(post_data)
+                data = json_codec.loads(post_data)
                 model_name = data.get('modelName')
                 thumbnail_index = data.get('thumbnailIndex')  # 1-based index (1, 2, 3, 4)
                 
@@ -912,26 +1376,27 @@ class LoraManagerHandler(http.server.SimpleHTTPRequestHandler):
                     self.send_error(400, "Missing modelName or thumbnailIndex")
                     return
                 
-                loraPath = self.load_settings().get('modelsDirectory', "")
-                if not loraPath:
+                roots = self.configured_roots()
+                if not roots:
                     self.send_error(400, "Models directory not set")
                     return
                 
                 # Determine the filename for the thumbnail to delete
                 if thumbnail_index == 1:
-                    thumb_filename = f"{model_name}.preview.png"
+                    thumb_suffix = ".preview.png"
                 else:
-                    thumb_filename = f"{model_name}.preview{thumbnail_index}.png"
+                    thumb_suffix = f".preview{thumbnail_index}.png"
+                thumb_filename = model_name + thumb_suffix
                 
                 # Find and delete the file
-                thumb_path = self.find_file_path(loraPath, thumb_filename)
+                thumb_path = self.find_model_sidecar(roots, data.get('modelId'), model_name, thumb_suffix)
                 if not thumb_path or not os.path.exists(thumb_path):
                     self.send_error(404, f"Thumbnail not found: {thumb_filename}")
                     return
                 
                 # Delete the thumbnail
                 os.remove(thumb_path)
-                print(f"Deleted thumbnail: {thumb_path}")
+                logger.info("Deleted thumbnail: %s", thumb_path)
                 
                 # Renumber remaining thumbnails to fill the gap
                 base_dir = os.path.dirname(thumb_path)
@@ -959,7 +1424,7 @@ class LoraManagerHandler(http.server.SimpleHTTPRequestHandler):
                     temp_path = os.path.join(base_dir, temp_name)
                     os.rename(file_path, temp_path)
                     temp_renames.append((temp_path, idx))
-                    print(f"Temp rename: {file_path} -> {temp_path}")
+                    logger.debug("Temp rename: %s -> %s", file_path, temp_path)
                 
                 # Rename from temp names to final names
                 for temp_path, final_idx in temp_renames:
@@ -970,29 +1435,27 @@ class LoraManagerHandler(http.server.SimpleHTTPRequestHandler):
                     
                     final_path = os.path.join(base_dir, final_name)
                     os.rename(temp_path, final_path)
-                    print(f"Final rename: {temp_path} -> {final_path}")
+                    logger.debug("Final rename: %s -> %s", temp_path, final_path)
                 
                 # Invalidate cache
-                self.lora_data_cache = None
+                self.invalidate_for_path(base_dir, 'thumbnail change')
                 
                 self.send_response(200)
                 self.send_header('Content-type', 'application/json')
                 self.end_headers()
-                self.wfile.write(json.dumps({
+                self.wfile.write(json_codec.dumps({
                     'status': 'success',
                     'message': 'Thumbnail deleted and remaining thumbnails renumbered'
-                }).encode())
+                }))
                 
             except Exception as e:
-                print(f"Error in delete-thumbnail: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.exception("Error in delete-thumbnail: %s", e)
                 self.send_error(500, f"Error: {e}")
 
         elif parsed_url.path == '/reorder-thumbnails':
             # Reorder thumbnails (primarily for setting a new default)
             try:
-                data = json.loads(post_data)
+                data = json_codec.loads(post_data)
                 model_name = data.get('modelName')
                 new_order = data.get('newOrder')  # e.g., [2, 1, 3, 4] means preview2 becomes preview
                 
@@ -1000,19 +1463,17 @@ class LoraManagerHandler(http.server.SimpleHTTPRequestHandler):
                     self.send_error(400, "Missing modelName or newOrder")
                     return
                 
-                loraPath = self.load_settings().get('modelsDirectory', "")
-                if not loraPath:
+                roots = self.configured_roots()
+                if not roots:
                     self.send_error(400, "Models directory not set")
                     return
                 
-                # Find the model file to get the directory
-                model_file = self.find_file_path(loraPath, f"{model_name}.safetensors")
-                if not model_file:
+                # Find the model's directory by id (name as a fallback)
+                base_dir, model_name = self.find_model_dir(roots, data.get('modelId'), model_name)
+                if not base_dir:
                     self.send_error(404, "Model file not found")
                     return
                 
-                base_dir = os.path.dirname(model_file)
-                
                 # Step 1: Collect existing files and rename to temp names
                 existing_files = []
                 for orig_idx in new_order:
@@ -1027,7 +1488,7 @@ class LoraManagerHandler(http.server.SimpleHTTPRequestHandler):
                         temp_path = os.path.join(base_dir, temp_name)
                         os.rename(file_path, temp_path)
                         existing_files.append((orig_idx, temp_path))
-                        print(f"Temp rename: {file_path} -> {temp_path}")
+                        logger.debug("Temp rename: %s -> %s", file_path, temp_path)
                 
                 # Step 2: Rename temp files to final positions
                 for new_idx, (orig_idx, temp_path) in enumerate(existing_files, 1):
@@ -1038,23 +1499,21 @@ class LoraManagerHandler(http.server.SimpleHTTPRequestHandler):
                     
                     final_path = os.path.join(base_dir, final_name)
                     os.rename(temp_path, final_path)
-                    print(f"Final rename: {temp_path} -> {final_path}")
+                    logger.debug("Final rename: %s -> %s", temp_path, final_path)
                 
                 # Invalidate cache
-                self.lora_data_cache = None
+                self.invalidate_for_path(base_dir, 'thumbnail change')
                 
                 self.send_response(200)
                 self.send_header('Content-type', 'application/json')
                 self.end_headers()
-                self.wfile.write(json.dumps({
+                self.wfile.write(json_codec.dumps({
                     'status': 'success',
                     'message': 'Thumbnails reordered successfully'
-                }).encode())
+                }))
                 
             except Exception as e:
-                print(f"Error in reorder-thumbnails: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.exception("Error in reorder-thumbnails: %s", e)
                 self.send_error(500, f"Error: {e}")
 
 
@@ -1062,148 +1521,143 @@ class LoraManagerHandler(http.server.SimpleHTTPRequestHandler):
             self.send_error(404, "Not found")
             return
 
+    def handle_patch(self):
+        parsed_url = urllib.parse.urlparse(self.path)
+        if not parsed_url.path.startswith('/model/'):
+            self.send_error(404, "Not found")
+            return
 
-    def refresh_lora_data_cache(self, lora_path):
-        """Refresh the cached model data."""
-        self.lora_data_cache = self.get_lora_data(lora_path)
-
-    def get_lora_data(self, lora_path):
-        lora_data = []
-        if not lora_path:
-            self.send_error(400, "No models directory set. Please configure the models directory in Settings.")
-            return []
-        if not os.path.exists(lora_path) or not os.path.isdir(lora_path):
-            self.send_error(400, f"Invalid models directory: {lora_path}")
-            return []
-        for root, dirs, files in os.walk(lora_path):
-            for file in files:
-                if file.endswith(".safetensors"):
-                    model_name = file.replace(".safetensors", "")
-                    preview_path = os.path.join(root, f"{model_name}.preview.png")
-                    json_path = os.path.join(root, f"{model_name}.json")
-                    civitai_path = os.path.join(root, f"{model_name}.civitai.info")
-                    
-                    relative_preview_path = os.path.relpath(preview_path, lora_path).replace("\\", "/")
-                    
-                    # Detect multiple preview images (preview.png, preview2.png, preview3.png, preview4.png)
-                    preview_images = []
-                    if os.path.exists(preview_path):
-                        preview_images.append("/" + relative_preview_path)
-                    
-                    # Check for additional preview images
-                    for i in range(2, 5):  # Check preview2, preview3, preview4
-                        extra_preview_path = os.path.join(root, f"{model_name}.preview{i}.png")
-                        if os.path.exists(extra_preview_path):
-                            relative_extra_preview = os.path.relpath(extra_preview_path, lora_path).replace("\\", "/")
-                            preview_images.append("/" + relative_extra_preview)
-                    
-                    # Determine the main preview URL (first available or placeholder)
-                    main_preview_url = preview_images[0] if preview_images else "/assets/placeholder.png"
-                    
-                    # Initialize base model as unknown
-                    base_model = "Unknown"
-                    
-                    # Try to get base model from JSON file if it exists
-                    if os.path.exists(json_path):
-                        try:
-                            with open(json_path, "r") as json_file:
-                                json_data = json.load(json_file)
-                                # Check for both 'baseModel' and 'base model' in the JSON file
-                                if "baseModel" in json_data:
-                                    base_model = json_data["baseModel"]
-                                elif "base model" in json_data:
-                                    base_model = json_data["base model"]
-                        except Exception as e:
-                            print(f"Error reading base model from JSON: {json_path} - {e}")
-                    
-                    # If not found in JSON, try civitai.info
-                    if base_model == "Unknown" and os.path.exists(civitai_path):
-                        try:
-                            with open(civitai_path, "r") as civitai_file:
-                                civitai_data = json.load(civitai_file)
-                                # Check for both 'baseModel' and 'base model' in the civitai.info file
-                                if "baseModel" in civitai_data:
-                                    base_model = civitai_data["baseModel"]
-                                elif "base model" in civitai_data:
-                                    base_model = civitai_data["base model"]
-                        except Exception as e:
-                            print(f"Error reading base model from civitai.info: {civitai_path} - {e}")
-                    
-                    # Find all associated files with the same base name
-                    associated_files = []
-                    for associated_file in files:
-                        if associated_file.startswith(model_name + "."):
-                            associated_files.append(associated_file)
-                    
-                    model_info = {
-                        "id": model_name,
-                        "name": model_name,
-                        "filename": file,
-                        "path": os.path.join(root, file),
-                        "previewUrl": main_preview_url,
-                        "previewImages": preview_images,  # New field for multiple previews
-                        "size": os.path.getsize(os.path.join(root, file)),
-                        "dateModified": os.path.getmtime(os.path.join(root, file)),
-                        "category": os.path.basename(root),  # Default to folder name, will be overridden by JSON if available
-                        "baseModel": base_model,
-                        "associatedFiles": associated_files
-                    }
-                    
-                    print(f"Preview URL: {model_info['previewUrl']}")
-
-                    if os.path.exists(json_path):
-                        try:
-                            with open(json_path, "r") as json_file:
-                                json_data = json.load(json_file)
-                                model_info["json"] = json_data
-                                
-                                # Use category from JSON if it exists
-                                if "category" in json_data:
-                                    model_info["category"] = json_data["category"]
-                        except Exception as e:
-                            print(f"Error reading JSON: {json_path} - {e}")
-                            model_info["json"] = {}
-                    else:
-                        model_info["json"] = {}
-                    if os.path.exists(civitai_path):
-                        try:
-                            with open(civitai_path, "r") as civitai_file:
-                                civitai_data = json.load(civitai_file)
-                                model_info["civitaiInfo"] = civitai_data
-                                
-                                # Extract URL from civitai.info and add it as modelUrl
-                                if "url" in civitai_data:
-                                    model_info["civitaiInfo"]["modelUrl"] = civitai_data["url"]
-                        except Exception as e:
-                            print(f"Error reading civitaiInfo: {civitai_path} - {e}")
-                            model_info["civitaiInfo"] = {}
-                    else:
-                        model_info["civitaiInfo"] = {}
-                    
-                    lora_data.append(model_info)
-        return lora_data
+        # PATCH /model/<id>: {"json": {field: value or null to remove}}, If-Match: "<listing version>"
+        model_id = urllib.parse.unquote(parsed_url.path[len('/model/'):])
+        content_length = int(self.headers.get('Content-Length', 0))
+        if content_length > MAX_PATCH_SIZE:
+            self.close_connection = True
+            self.send_error(413, "Request too large")
+            return
+        try:
+            changes = json_codec.loads(self.rfile.read(content_length)).get('json')
+        except (ValueError, AttributeError):
+            changes = None
+        if not isinstance(changes, dict) or not changes:
+            self.send_error(400, "Expected {\"json\": {field: value}} with at least one field")
+            return
+        expected_version = self.headers.get('If-Match', '').strip('"') or None
 
-    def load_settings(self):
         try:
-            with open(CONFIG_FILE, 'r') as file:
-                settings = json.load(file)
-                print(f"Loaded settings B: {settings}")  # Debug print
-                return settings
-        except FileNotFoundError:
-            # Create default config file if it doesn't exist
-            default_settings = {"modelsDirectory": ""}
-            self.save_settings(default_settings)
-            return default_settings
-        except json.JSONDecodeError:
-            print(f"Error: Invalid JSON format in {CONFIG_FILE}. Using default settings.")
-            return {"modelsDirectory": ""}
-
-    def save_settings(self, data):
+            record = model_metadata.update_model_json(model_index, self.configured_roots(), model_id, changes, expected_version)
+        except model_metadata.ModelNotFoundError:
+            self.send_error(404, "Model not found")
+            return
+        except model_metadata.VersionConflictError as e:
+            # The client re-reads the model (its current version is in the body) before retrying
+            body = json_codec.dumps({'error': 'Model was changed elsewhere', 'id': model_id, 'version': e.current_version})
+            self.send_response(412)
+            self.send_header('Content-type', 'application/json')
+            self.send_header('ETag', f'"{e.current_version}"')
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        except ValueError as e:
+            self.send_error(409, f"Cannot merge into sidecar: {e}")
+            return
+        except OSError as e:
+            self.send_error(500, f"Error saving model: {e}")
+            return
+
+        version = model_listing.record_version(record)
+        self.send_response(200)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('ETag', f'"{version}"')
+        self.end_headers()
+        self.wfile.write(json_codec.dumps({'id': record.id, 'version': version}))
+
+    def configured_roots(self):
+        """Library roots from the current modelsDirectory setting."""
+        return library_roots(settings_service.get_setting('modelsDirectory', ''))
+
+    def model_file_path(self, url_path, roots):
+        """
+        Map a decoded model-file URL path (/roots/<root id>/<relative path>, or
+        a path relative to any root) to an existing file inside a library root
+
+        Returns:
+            Absolute file path, or None
+        """
+        decoded_path = url_path.lstrip('/')
+        if url_path.startswith(ROOT_URL_PREFIX):
+            # /roots/<root id>/<relative path> addresses one specific root
+            root_id, _, relative_path = decoded_path[len(ROOT_URL_PREFIX) - 1:].partition('/')
+            root = find_root(roots, root_id)
+            candidates = [os.path.join(root.path, relative_path)] if root else []
+        else:
+            candidates = [os.path.join(root.path, decoded_path) for root in roots]
+
+        for file_path in candidates:
+            if root_for_path(roots, file_path) and os.path.isfile(file_path):
+                return file_path
+        return None
+
+    def find_model_dir(self, roots, model_id=None, model_name=None):
+        """
+        Locate a model's folder from the index, walking the roots only as a fallback
+
+        Returns:
+            Tuple (directory, model name), or (None, model_name) if not found
+        """
+        record = model_index.find(roots, model_id) if model_id else None
+        if record is None and model_name:
+            record = next((record for record in model_index.records(roots) if record.name == model_name), None)
+        if record is not None and os.path.isfile(record.path):
+            return record.directory, record.name
+        if model_name:
+            model_file = self.find_model_file(model_name + ".safetensors", roots)
+            if model_file:
+                return os.path.dirname(model_file), model_name
+        return None, model_name
+
+    def find_model_sidecar(self, roots, model_id, model_name, suffix):
+        """
+        Locate one of a model's files (suffix e.g. ".json") in the model's own folder
+
+        The model is found by id, so a same-named model in another root or
+        folder is never picked; without an id the name is used. If the model
+        file itself is missing, every root is searched for the name.
+
+        Returns:
+            File path, or None
+        """
+        model_dir, model_name = self.find_model_dir(roots, model_id, model_name)
+        if model_dir:
+            return self.find_in_directory(model_dir, model_name + suffix)
+        return self.find_model_file(model_name + suffix, roots) if model_name else None
+
+    def find_in_directory(self, directory, filename):
+        """Case-insensitive lookup of filename in one folder (not its subfolders); returns the path or None"""
+        file_path = os.path.join(directory, filename)
+        if os.path.isfile(file_path):
+            return file_path
+        filename_lower = filename.lower()
         try:
-            with open(CONFIG_FILE, 'w') as file:
-                json.dump(data, file, indent=2)
-        except Exception as e:
-            print(f"Error saving settings to {CONFIG_FILE}: {e}")
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.lower() == filename_lower and entry.is_file():
+                        return entry.path
+        except OSError:
+            pass
+        return None
+
+    def find_model_file(self, filename, roots=None):
+        """Search each library root in order; returns the first match or None."""
+        for root in roots if roots is not None else self.configured_roots():
+            file_path = self.find_file_path(root.path, filename)
+            if file_path:
+                return file_path
+        return None
+
+    def invalidate_for_path(self, file_path, reason=''):
+        """Invalidate the index shard of the root containing file_path."""
+        root = root_for_path(self.configured_roots(), file_path)
+        model_index.invalidate(root.id if root else None, reason)
 
     def find_file_path(self, directory, filename):
         # Make the search case-insensitive for file extensions
@@ -1228,7 +1682,28 @@ class LoraManagerHandler(http.server.SimpleHTTPRequestHandler):
         return None
 
 
-with socketserver.TCPServer(("", PORT), LoraManagerHandler) as httpd:
-    print(f"Serving at port: {PORT}")
-    # webbrowser.open(f"http://localhost:{PORT}")
-    httpd.serve_forever()
+class LoraManagerServer(socketserver.ThreadingTCPServer):
+    """One thread per connection, so a long scan or Civitai call does not block the UI"""
+    daemon_threads = True
+    # Idle keep-alive connections are closed server-side, leaving TIME_WAIT sockets on the port;
+    # allow a restart to bind anyway (as http.server.HTTPServer does)
+    allow_reuse_address = True
+
+
+def main():
+    settings = settings_service.get()
+    log_setup.setup_logging(settings.get('logLevel', 'INFO'), settings.get('logFile') or log_setup.DEFAULT_LOG_FILE)
+    logger.info("Lora path = %s", settings.get('modelsDirectory', ''))
+
+    with LoraManagerServer(("", PORT), LoraManagerHandler) as httpd:
+        logger.info("Serving at port: %s", PORT)
+        # Build the index while the first page loads; /index-status reports progress
+        roots = library_roots(settings.get('modelsDirectory', ''))
+        if roots:
+            model_index.build_async(roots)
+        # webbrowser.open(f"http://localhost:{PORT}")
+        httpd.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
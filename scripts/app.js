@@ -1,16 +1,22 @@
 // script.js (Browser Version with Python Server)
 
 // Import modules
-import appSettings, { Settings } from './settings.js';
+import appSettings, { Settings, formatModelsDirectory, parseModelsDirectory } from './settings.js';
 import { displayGridView } from './grid-view.js';
 import { displayTableView } from './table-view.js';
 import { displayGroupedGridView } from './grid-group-view.js';
-import { filterModelsByQuery } from './search-parser.js';
+import { searchModels, cachedSearchResult, updateSearchModel } from './model-search.js';
 import { initializeImageDropZone, handleImageDrop } from './drop-zone-functions.js';
 import { showLoadingOverlay, hideLoadingOverlay } from './ui-utils.js';
 import * as ModelOps from './model-operations.js';
 import * as CivitaiAPI from './civitai-api.js';
 import { initializeCopyButtons } from './clipboard-utils.js';
+import { clearPreviewCache } from './preview-bundles.js';
+import { clearVirtualLists } from './virtual-list.js';
+import { openDuplicatesModal } from './duplicates-view.js';
+
+// Pause in typing before the search runs
+const SEARCH_DEBOUNCE_MS = 150;
 
 // DOM Elements
 const modelsContainer = document.getElementById('models-container');
@@ -26,6 +32,9 @@ const closeModal = document.querySelector('.close-modal');
 const settingsBtn = document.getElementById('settingsButton');
 const civitaiScanBtn = document.getElementById('civitaiScanButton');
 const settingsModal = document.getElementById('settingsModal');
+const bulkEditBtn = document.getElementById('bulk-edit-btn');
+const bulkEditModal = document.getElementById('bulkEditModal');
+const bulkEditOp = document.getElementById('bulk-edit-op');
 const safemodeToggle = document.getElementById('safemodeToggle');
 const modelsDirectoryInput = document.getElementById('modelsDirectoryInput');
 const browseDirectoryBtn = document.getElementById('browse-directory');
@@ -50,12 +59,15 @@ const preferredWeightValue = document.getElementById('preferred-weight-value');
 
 // Application State
 let models = [];
+let displayedModels = []; // Models shown after search and filters (what Bulk Edit applies to)
 export let currentModel = null;
 let currentView = appSettings.getSetting('defaultView');
 let currentSort = appSettings.getSetting('defaultSort');
 let currentGroupBy = 'none'; // Default to no grouping
 let currentModelFilter = 'all'; // Default to show all models
+let baseModelFacets = null; // [{value, count}] from /facets, null if not loaded
 let searchTerm = '';
+let searchDebounceTimer = null;
 let currentJsonType = 'model'; // 'model' or 'civitai'
 let selectedThumbnailIndex = 0; // Currently selected thumbnail (0-based for preview-thumb elements)
 
@@ -80,6 +92,7 @@ if (clearSearchBtn) {
         searchInput.value = '';
         clearSearchBtn.style.display = 'none';
         searchTerm = '';
+        clearTimeout(searchDebounceTimer);
         displayModels();
     });
 }
@@ -161,6 +174,7 @@ document.querySelectorAll('.save-btn').forEach(btn => {
         const value = field.type === 'checkbox' ? field.checked : field.value;
 
         // Update the model object based on field ID
+        const jsonBefore = { ...currentModel.json };
         switch (fieldId) {
             case 'model-author':
                 currentModel.json['civitai name'] = value;
@@ -208,27 +222,14 @@ document.querySelectorAll('.save-btn').forEach(btn => {
         }
 
         try {
-            // Save changes to server
-            const response = await fetch('/save-model', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify(currentModel)
-            });
-
-            if (!response.ok) {
-                throw new Error('Failed to save changes');
-            }
+            // Save only the changed fields to server
+            await ModelOps.patchModel(currentModel, ModelOps.jsonChanges(jsonBefore, currentModel.json));
 
             // Fields remain editable - no need to disable them
 
-            // Refresh the display
-            refreshModels();
-
         } catch (error) {
             console.error('Error saving changes:', error);
-            alert('Failed to save changes. Please try again.');
+            alert(error.message || 'Failed to save changes. Please try again.');
         }
     });
 });
@@ -258,6 +259,23 @@ saveSettingsBtn.addEventListener('click', saveSettings);
 // Cancel settings button
 cancelSettingsBtn.addEventListener('click', closeSettingsModal);
 
+// Bulk edit of the models shown
+bulkEditBtn.addEventListener('click', openBulkEditModal);
+bulkEditModal.querySelector('.close-modal').addEventListener('click', closeBulkEditModal);
+bulkEditModal.addEventListener('click', function (event) {
+    if (event.target === bulkEditModal) {
+        closeBulkEditModal();
+    }
+});
+bulkEditOp.addEventListener('change', updateBulkEditInputs);
+document.getElementById('apply-bulk-edit').addEventListener('click', applyBulkEdit);
+document.getElementById('cancel-bulk-edit').addEventListener('click', closeBulkEditModal);
+
+// Duplicate finder; reload the listing after a merge changed the library
+document.getElementById('duplicates-btn').addEventListener('click', function () {
+    openDuplicatesModal(() => loadModelsFromDirectory(settingsManager.getSetting('modelsDirectory')));
+});
+
 // SafeMode toggle event listener
 safemodeToggle.addEventListener('change', async function () {
     const isEnabled = this.checked;
@@ -327,7 +345,7 @@ async function openSettingsModal() {
     initDragAndDrop();
 
     // Models directory
-    modelsDirectoryInput.value = settings.modelsDirectory || '';
+    modelsDirectoryInput.value = formatModelsDirectory(settings.modelsDirectory);
 
     // Theme
     document.getElementById('theme-' + (settings.theme || 'dark')).checked = true;
@@ -373,6 +391,167 @@ function closeSettingsModal() {
     settingsModal.style.display = 'none'; // Hide the modal
 }
 
+function openBulkEditModal() {
+    if (displayedModels.length === 0) {
+        alert('No models shown. Search or filter to choose the models to edit.');
+        return;
+    }
+    document.getElementById('bulk-edit-scope').textContent =
+        `Applies to the ${displayedModels.length} model${displayedModels.length === 1 ? '' : 's'} shown.`;
+    // Folders may have been added since the last bulk move
+    document.getElementById('bulk-edit-folder').innerHTML = '';
+    updateBulkEditInputs();
+    bulkEditModal.style.display = 'block';
+}
+
+function closeBulkEditModal() {
+    bulkEditModal.style.display = 'none';
+}
+
+// Show the inputs of the chosen operation
+function updateBulkEditInputs() {
+    const op = bulkEditOp.value;
+    const replacing = op === 'replace' || op === 'rename';
+    bulkEditModal.querySelector('.bulk-edit-field').style.display = op === 'move' || op === 'rename' ? 'none' : 'block';
+    bulkEditModal.querySelector('.bulk-edit-folder').style.display = op === 'move' ? 'block' : 'none';
+    bulkEditModal.querySelector('.bulk-edit-value').style.display = replacing || op === 'move' ? 'none' : 'block';
+    bulkEditModal.querySelector('.bulk-edit-replace').style.display = replacing ? 'block' : 'none';
+    if (op === 'move') {
+        populateBulkEditFolders();
+    }
+}
+
+// Fill the folder dropdown of the move operation (same folders as the model details' Move)
+async function populateBulkEditFolders() {
+    const folderSelect = document.getElementById('bulk-edit-folder');
+    if (folderSelect.options.length > 0) {
+        return;
+    }
+    try {
+        const response = await fetch('/get-folders');
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        const data = await response.json();
+        (data.folders || []).forEach(folder => {
+            const option = document.createElement('option');
+            option.value = folder.path;
+            option.textContent = folder.name;
+            option.dataset.root = folder.root || '';
+            folderSelect.appendChild(option);
+        });
+    } catch (error) {
+        console.error('Error fetching folders:', error);
+    }
+}
+
+// Read the find/replace inputs, or null (after telling the user) if no pattern was entered
+function bulkEditPattern() {
+    const pattern = document.getElementById('bulk-edit-pattern').value;
+    if (!pattern) {
+        alert('Enter the text or pattern to find.');
+        return null;
+    }
+    return {
+        pattern,
+        replacement: document.getElementById('bulk-edit-replacement').value,
+        ignoreCase: document.getElementById('bulk-edit-ignore-case').checked
+    };
+}
+
+// Send the operation for all models shown, then reload the listing once (only changed models are transferred)
+async function applyBulkEdit() {
+    const op = bulkEditOp.value;
+    let request;
+    if (op === 'move') {
+        const folderOption = document.getElementById('bulk-edit-folder').selectedOptions[0];
+        if (!folderOption) {
+            alert('Choose the folder to move to.');
+            return;
+        }
+        request = { targetFolder: folderOption.value, targetRoot: folderOption.dataset.root || undefined };
+    } else if (op === 'rename') {
+        const rename = bulkEditPattern();
+        if (!rename) {
+            return;
+        }
+        request = { rename };
+    } else {
+        const operation = { op, field: document.getElementById('bulk-edit-field').value };
+        if (op === 'replace') {
+            const replace = bulkEditPattern();
+            if (!replace) {
+                return;
+            }
+            Object.assign(operation, replace);
+        } else {
+            const value = document.getElementById('bulk-edit-value').value.trim();
+            if (!value && op !== 'set') {
+                alert('Enter the values to add or remove.');
+                return;
+            }
+            // Setting an empty value removes the field
+            operation.value = value || null;
+        }
+        request = operation;
+    }
+
+    const targets = displayedModels;
+    if (!confirm(`Apply to ${targets.length} model${targets.length === 1 ? '' : 's'}?`)) {
+        return;
+    }
+
+    const scope = document.getElementById('bulk-edit-scope');
+    const applyButton = document.getElementById('apply-bulk-edit');
+    applyButton.disabled = true;
+    showLoadingOverlay();
+    try {
+        let report;
+        let summary;
+        if (op === 'move' || op === 'rename') {
+            // Copies to another drive can take a while: show how far they are
+            report = await ModelOps.batchMoveModels(targets, request, progress => {
+                const megabytes = bytes => (bytes / 1048576).toFixed(0);
+                scope.textContent = `Moving... ${progress.done} of ${progress.models} models` +
+                    (progress.bytes ? `, ${megabytes(progress.copied)} of ${megabytes(progress.bytes)} MB copied` : '');
+            });
+            summary = [`${report.moved} moved`, `${report.unchanged} unchanged`];
+            if (report.conflict) {
+                summary.push(`${report.conflict} skipped (a file with the new name exists)`);
+            }
+            if (report.invalid) {
+                summary.push(`${report.invalid} invalid`);
+            }
+        } else {
+            report = await ModelOps.batchUpdateModels(targets, request);
+            summary = [`${report.updated} updated`, `${report.unchanged} unchanged`];
+            if (report.conflict) {
+                summary.push(`${report.conflict} skipped (changed elsewhere; refresh and retry)`);
+            }
+        }
+        closeBulkEditModal();
+        await loadModelsFromDirectory(settingsManager.getSetting('modelsDirectory'));
+
+        if (report.not_found) {
+            summary.push(`${report.not_found} not found`);
+        }
+        const failed = report.results.filter(result => result.status === 'error' || result.status === 'invalid');
+        if (failed.length) {
+            console.error('Bulk edit failures:', failed);
+        }
+        if (report.error) {
+            summary.push(`${report.error} failed (first: ${failed[0].id}: ${failed[0].error})`);
+        }
+        alert(`Bulk edit: ${summary.join(', ')}.`);
+    } catch (error) {
+        console.error('Error applying bulk edit:', error);
+        alert(error.message || 'Failed to apply bulk edit. Please try again.');
+    } finally {
+        applyButton.disabled = false;
+        hideLoadingOverlay();
+    }
+}
+
 // Initialize drag and drop for column ordering
 function initDragAndDrop() {
     const columnList = document.getElementById('sortable-columns');
@@ -534,6 +713,7 @@ function setupStaticFieldEdit(fieldName) {
 
         try {
             // Update the model object based on field
+            const jsonBefore = { ...currentModel.json };
             if (fieldName === 'url') {
                 currentModel.json['url'] = newValue;
             } else if (fieldName === 'author') {
@@ -549,18 +729,8 @@ function setupStaticFieldEdit(fieldName) {
                 currentModel.json['model version'] = newValue;
             }
 
-            // Save to server
-            const response = await fetch('/save-model', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify(currentModel)
-            });
-
-            if (!response.ok) {
-                throw new Error('Failed to save changes');
-            }
+            // Save only the changed fields to server
+            await ModelOps.patchModel(currentModel, ModelOps.jsonChanges(jsonBefore, currentModel.json));
 
             // Update the display
             if (fieldName === 'url') {
@@ -585,6 +755,9 @@ function setupStaticFieldEdit(fieldName) {
             newCancelBtn.style.display = 'none';
 
             // No need to refresh entire model list - we already updated currentModel
+            if (fieldName === 'basemodel') {
+                loadModelFilterFacets();
+            }
 
         } catch (error) {
             console.error('Error saving field:', error);
@@ -746,32 +919,14 @@ function setupGenericFieldEdit(fieldId, fieldType, saveCallback) {
     });
 }
 
-// Helper function to save current model to server
-async function saveModel() {
+// Helper function to save changed sidecar fields of the current model to server
+async function saveModelFields(fields) {
     if (!currentModel) {
         throw new Error('No model selected');
     }
 
-    // Sort the json object keys alphabetically for cleaner JSON files
-    if (currentModel.json) {
-        const sortedJson = {};
-        Object.keys(currentModel.json).sort().forEach(key => {
-            sortedJson[key] = currentModel.json[key];
-        });
-        currentModel.json = sortedJson;
-    }
-
-    const response = await fetch('/save-model', {
-        method: 'POST',
-        headers: {
-            'Content-Type': 'application/json'
-        },
-        body: JSON.stringify(currentModel)
-    });
-
-    if (!response.ok) {
-        throw new Error('Failed to save model');
-    }
+    // Only the changed fields are sent; the server merges them into the .json file
+    await ModelOps.patchModel(currentModel, fields);
 }
 
 // Helper function to update weight indicator position
@@ -811,7 +966,8 @@ async function initApp() {
     // Check if we have a saved directory path and load models
     const savedDirPath = settingsManager.getSetting('modelsDirectory');
     if (savedDirPath) {
-        await loadModelsFromDirectory(savedDirPath);
+        // On page load, show the cached listing at once (see ModelOps.loadModelsFromDirectory)
+        await loadModelsFromDirectory(savedDirPath, { fromCache: true });
     } else {
         // Hide loading overlay if no directory is set
         hideLoadingOverlay();
@@ -835,14 +991,26 @@ async function ensureSettingsInitialized() {
 }
 
 // Load models from the specified directory (wrapper for ModelOps)
-async function loadModelsFromDirectory(dirPath) {
+async function loadModelsFromDirectory(dirPath, { fromCache = false } = {}) {
     try {
-        models = await ModelOps.loadModelsFromDirectory(dirPath, modelsContainer);
+        const onUpdate = fromCache ? showUpdatedModels : undefined;
+        models = await ModelOps.loadModelsFromDirectory(dirPath, modelsContainer, onUpdate);
+        // Previews may have changed on disk since they were cached
+        clearPreviewCache();
         displayModels();
+        // Counts come from the server index, which may still be scanning
+        await loadModelFilterFacets();
     } catch (error) {
         // Error already handled in  ModelOps
     }
 }
+
+// The server had changes to the cached listing shown on page load
+function showUpdatedModels(updatedModels) {
+    models = updatedModels;
+    clearPreviewCache();
+    displayModels();
+}
 // Refresh models (wrapper for ModelOps)
 async function refreshModels() {
     await ModelOps.refreshModels(settingsManager, loadModelsFromDirectory, openSettingsModal);
@@ -850,11 +1018,30 @@ async function refreshModels() {
 
 // Display models based on current view, sort, and search
 function displayModels() {
+    // Search runs in a worker (see model-search.js): display again once it has answered
+    let searchMatches = null;
+    if (searchTerm && models.length > 0) {
+        searchMatches = cachedSearchResult(models, searchTerm);
+        if (!searchMatches) {
+            searchModels(models, searchTerm).then(matches => {
+                if (matches) {
+                    displayModels();
+                }
+            });
+            return;
+        }
+    }
+
+    // Clearing the container shortens the page, so remember where the user was
+    const scrollPosition = window.scrollY;
+
     // Clear the container
+    clearVirtualLists();
     modelsContainer.innerHTML = '';
 
     // If no models, show placeholder message
     if (models.length === 0) {
+        displayedModels = [];
         modelsContainer.innerHTML = `
             <div class="placeholder-message">
                 <p>No models loaded. Set your models directory in Settings to get started.</p>
@@ -875,36 +1062,25 @@ function displayModels() {
     }
 
     // Apply search filter
-    if (searchTerm) {
-        // Check if the search term contains any of our special operators
-        const hasAdvancedSyntax = /["!|<>]/.test(searchTerm);
-
-        if (hasAdvancedSyntax) {
-            // Use advanced search parser
-            filteredModels = filterModelsByQuery(filteredModels, searchTerm);
-        } else {
-            // Use simple search for better performance when no special operators are used
-            const searchLower = searchTerm.toLowerCase();
-            filteredModels = filteredModels.filter(model =>
-                model.name.toLowerCase().includes(searchLower) ||
-                model.filename.toLowerCase().includes(searchLower) ||
-                model.category.toLowerCase().includes(searchLower)
-            );
-        }
+    if (searchMatches) {
+        filteredModels = filteredModels.filter(model => searchMatches.has(model));
     }
 
     // Apply base model filter
     if (currentModelFilter !== 'all') {
         filteredModels = filteredModels.filter(model =>
-            model.baseModel === currentModelFilter
+            (model.baseModel || 'Unknown') === currentModelFilter
         );
     }
 
-    // Populate the model filter dropdown with unique base models
-    populateModelFilter();
+    // Without server counts, rebuild the model filter dropdown from the loaded models
+    if (!baseModelFacets) {
+        populateModelFilter();
+    }
 
     // Sort models
     filteredModels = sortModels(filteredModels, currentSort);
+    displayedModels = filteredModels;
 
     // Display models based on current view using imported modules
     if (currentView === 'grid') {
@@ -917,6 +1093,9 @@ function displayModels() {
     } else {
         displayTableView(filteredModels, modelsContainer, openModelDetails, settingsManager.getAllSettings());
     }
+
+    // The views lay out their virtual lists synchronously, so the page has its full height again
+    window.scrollTo(0, scrollPosition);
 }
 
 // Sort models based on sort option
@@ -1045,7 +1224,9 @@ function sortModelsByColumn(models, column, direction) {
 // Handle search input
 function handleSearch(e) {
     searchTerm = e.target.value.trim();
-    displayModels();
+    // Search once the user pauses typing, not on every keystroke
+    clearTimeout(searchDebounceTimer);
+    searchDebounceTimer = setTimeout(displayModels, SEARCH_DEBOUNCE_MS);
 }
 
 // Handle sort select change
@@ -1067,17 +1248,35 @@ function handleModelFilterChange(e) {
     displayModels();
 }
 
+// Fetch base model counts for the model filter dropdown from the server index
+async function loadModelFilterFacets() {
+    try {
+        const facets = await ModelOps.loadFacets(['baseModel'], settingsManager.getSetting('hideNSFW'));
+        baseModelFacets = facets.baseModel;
+    } catch (error) {
+        console.error('Error loading base model counts:', error);
+        baseModelFacets = null;
+    }
+    if (baseModelFacets) {
+        populateModelFilter();
+    }
+}
+
 // Populate model filter dropdown with unique base models
 function populateModelFilter() {
-    // Extract unique base models from the models array
-    const baseModels = new Set();
-    models.forEach(model => {
-        const baseModel = model.baseModel || 'Unknown';
-        baseModels.add(baseModel);
-    });
+    // Base models with counts from the server, or extracted from the models array
+    const counts = new Map();
+    if (baseModelFacets) {
+        baseModelFacets.forEach(facet => counts.set(facet.value, facet.count));
+    } else {
+        models.forEach(model => {
+            const baseModel = model.baseModel || 'Unknown';
+            counts.set(baseModel, (counts.get(baseModel) || 0) + 1);
+        });
+    }
 
     // Convert to array and sort alphabetically
-    const sortedBaseModels = Array.from(baseModels).sort((a, b) => {
+    const sortedBaseModels = Array.from(counts.keys()).sort((a, b) => {
         // Put "Unknown" at the end
         if (a === 'Unknown') return 1;
         if (b === 'Unknown') return -1;
@@ -1094,7 +1293,7 @@ function populateModelFilter() {
     sortedBaseModels.forEach(baseModel => {
         const option = document.createElement('option');
         option.value = baseModel;
-        option.textContent = baseModel;
+        option.textContent = `${baseModel} (${counts.get(baseModel)})`;
         modelFilterSelect.appendChild(option);
     });
 
@@ -1135,7 +1334,7 @@ function switchView(view, savePreference = true) {
 async function saveSettings() {
     // Get all settings from form
     const newSettings = {
-        modelsDirectory: modelsDirectoryInput.value,
+        modelsDirectory: parseModelsDirectory(modelsDirectoryInput.value),
         theme: document.querySelector('input[name="theme"]:checked').value,
         defaultView: document.querySelector('input[name="defaultView"]:checked').value,
         defaultSort: document.getElementById('default-sort-select').value,
@@ -1298,14 +1497,17 @@ function openModelDetails(model) {
     const pathWithoutFilename = model.path.substring(0, model.path.lastIndexOf('\\'));
 
     // Get the models directory from settings
-    const modelsDir = settingsManager.getSetting('modelsDirectory').replace(/\\/g, '/');
+    const modelsDir = formatModelsDirectory(settingsManager.getSetting('modelsDirectory')).replace(/\\/g, '/');
 
     // Convert path to forward slashes for consistency
     const fullPath = pathWithoutFilename.replace(/\\/g, '/');
 
     // Create relative path by removing the models directory prefix
+    // (the server reports it directly when models span several library roots)
     let relativePath = fullPath;
-    if (modelsDir && fullPath.startsWith(modelsDir)) {
+    if (model.relativeDir !== undefined) {
+        relativePath = model.relativeDir;
+    } else if (modelsDir && fullPath.startsWith(modelsDir)) {
         relativePath = fullPath.substring(modelsDir.length);
         // Remove leading slash if present
         if (relativePath.startsWith('/')) {
@@ -1424,7 +1626,7 @@ function openModelDetails(model) {
     updateWeightIndicator(preferredWeightField);
 
     // Populate file location dropdown
-    populateFileLocationDropdown(relativePath || '');
+    populateFileLocationDropdown(relativePath || '', model.rootId);
 
     // Load JSON data
     switchJsonType(currentJsonType);
@@ -1438,68 +1640,55 @@ function openModelDetails(model) {
     // Initialize generic field edit handlers for all converted fields
     setupGenericFieldEdit('model-category', 'text', async (val) => {
         currentModel.category = val;
-        currentModel.json['category'] = val;
-        await saveModel();
+        await saveModelFields({ 'category': val });
     });
 
     setupGenericFieldEdit('model-subcategory', 'text', async (val) => {
-        currentModel.json['subcategory'] = val;
-        await saveModel();
+        await saveModelFields({ 'subcategory': val });
     });
 
     setupGenericFieldEdit('model-tags', 'text', async (val) => {
-        currentModel.json['tags'] = val;
-        await saveModel();
+        await saveModelFields({ 'tags': val });
     });
 
     setupGenericFieldEdit('model-name', 'text', async (val) => {
-        currentModel.json['name'] = val;
-        await saveModel();
+        await saveModelFields({ 'name': val });
     });
 
     setupGenericFieldEdit('model-version', 'text', async (val) => {
-        currentModel.json['model version'] = val;
-        await saveModel();
+        await saveModelFields({ 'model version': val });
     });
 
     setupGenericFieldEdit('model-positive', 'textarea', async (val) => {
-        currentModel.json['activation text'] = val;
-        await saveModel();
+        await saveModelFields({ 'activation text': val });
     });
 
     setupGenericFieldEdit('model-negative', 'textarea', async (val) => {
-        currentModel.json['negative text'] = val;
-        await saveModel();
+        await saveModelFields({ 'negative text': val });
     });
 
     setupGenericFieldEdit('model-authors', 'textarea', async (val) => {
-        currentModel.json['civitai text'] = val;
-        await saveModel();
+        await saveModelFields({ 'civitai text': val });
     });
 
     setupGenericFieldEdit('model-description', 'textarea', async (val) => {
-        currentModel.json['description'] = val;
-        await saveModel();
+        await saveModelFields({ 'description': val });
     });
 
     setupGenericFieldEdit('model-notes', 'textarea', async (val) => {
-        currentModel.json['notes'] = val;
-        await saveModel();
+        await saveModelFields({ 'notes': val });
     });
 
     setupGenericFieldEdit('model-example-prompt', 'textarea', async (val) => {
-        currentModel.json['example prompt'] = val;
-        await saveModel();
+        await saveModelFields({ 'example prompt': val });
     });
 
     setupGenericFieldEdit('model-example-prompt-2', 'textarea', async (val) => {
-        currentModel.json['example prompt 2'] = val;
-        await saveModel();
+        await saveModelFields({ 'example prompt 2': val });
     });
 
     setupGenericFieldEdit('model-preferred-weight', 'range', async (val) => {
-        currentModel.json['preferred weight'] = val;
-        await saveModel();
+        await saveModelFields({ 'preferred weight': val });
     });
 
     // Initialize High/Low toggle handler
@@ -1542,6 +1731,7 @@ function openModelDetails(model) {
             const value = field.type === 'checkbox' ? field.checked : field.value;
 
             // Update the model object based on field ID
+            const jsonBefore = { ...currentModel.json };
             switch (fieldId) {
                 case 'model-author':
                     currentModel.json['author name'] = value;
@@ -1595,27 +1785,14 @@ function openModelDetails(model) {
             }
 
             try {
-                // Save changes to server
-                const response = await fetch('/save-model', {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json'
-                    },
-                    body: JSON.stringify(currentModel)
-                });
-
-                if (!response.ok) {
-                    throw new Error('Failed to save changes');
-                }
+                // Save only the changed fields to server
+                await ModelOps.patchModel(currentModel, ModelOps.jsonChanges(jsonBefore, currentModel.json));
 
                 // Fields remain editable - no need to disable them
 
-                // Refresh the display
-                refreshModels();
-
             } catch (error) {
                 console.error('Error saving changes:', error);
-                alert('Failed to save changes. Please try again.');
+                alert(error.message || 'Failed to save changes. Please try again.');
             }
         });
     });
@@ -1689,6 +1866,7 @@ function openModelDetails(model) {
                         method: 'POST',
                         headers: { 'Content-Type': 'application/json' },
                         body: JSON.stringify({
+                            modelId: currentModel.id,
                             modelName: currentModel.name,
                             thumbnailIndex: thumbnailNumber
                         })
@@ -1697,7 +1875,7 @@ function openModelDetails(model) {
                     if (!response.ok) throw new Error('Failed to delete thumbnail');
 
                     await refreshModels();
-                    const updatedModel = models.find(m => m.name === currentModel.name);
+                    const updatedModel = models.find(m => m.id === currentModel.id);
                     if (updatedModel) {
                         openModelDetails(updatedModel);
                     }
@@ -1735,6 +1913,7 @@ function openModelDetails(model) {
                         method: 'POST',
                         headers: { 'Content-Type': 'application/json' },
                         body: JSON.stringify({
+                            modelId: currentModel.id,
                             modelName: currentModel.name,
                             newOrder: newOrder
                         })
@@ -1743,7 +1922,7 @@ function openModelDetails(model) {
                     if (!response.ok) throw new Error('Failed to reorder thumbnails');
 
                     await refreshModels();
-                    const updatedModel = models.find(m => m.name === currentModel.name);
+                    const updatedModel = models.find(m => m.id === currentModel.id);
                     if (updatedModel) {
                         openModelDetails(updatedModel);
                     }
@@ -1761,6 +1940,10 @@ function openModelDetails(model) {
 
 function closeModelModal() {
     modelModal.style.display = 'none';
+    // Metadata may have been edited in place
+    if (currentModel) {
+        updateSearchModel(currentModel);
+    }
     currentModel = null;
 }
 
@@ -1889,8 +2072,7 @@ function initHighLowToggle() {
         // Save to JSON
         if (!currentModel) return;
         if (!currentModel.json) currentModel.json = {};
-        currentModel.json['high low'] = newValue;
-        await saveModel();
+        await saveModelFields({ 'high low': newValue });
     });
 }
 
@@ -1916,8 +2098,7 @@ function initNSFWToggle() {
         // Save to JSON
         if (!currentModel) return;
         if (!currentModel.json) currentModel.json = {};
-        currentModel.json['nsfw'] = newValue.toString();
-        await saveModel();
+        await saveModelFields({ 'nsfw': newValue.toString() });
     });
 }
 
@@ -1947,6 +2128,27 @@ function switchJsonType(type) {
         modelJsonBtn.classList.remove('active');
         jsonEditor.value = currentModel && currentModel.civitaiInfo ?
             JSON.stringify(currentModel.civitaiInfo, null, 2) : '{}';
+        loadFullCivitaiInfo(currentModel);
+    }
+}
+
+// The model list only carries a summary of civitai.info; fetch the full document on demand
+async function loadFullCivitaiInfo(model) {
+    if (!model || !model.id || model.civitaiInfoLoaded) return;
+    const summaryText = jsonEditor.value;
+
+    try {
+        const response = await fetch(`/civitai-info?id=${encodeURIComponent(model.id)}`);
+        if (!response.ok) return;
+        model.civitaiInfo = await response.json();
+        model.civitaiInfoLoaded = true;
+
+        // Replace the summary unless the user has switched away or started editing
+        if (currentModel === model && currentJsonType === 'civitai' && jsonEditor.value === summaryText) {
+            jsonEditor.value = JSON.stringify(model.civitaiInfo, null, 2);
+        }
+    } catch (error) {
+        console.error('Error loading civitai info:', error);
     }
 }
 
@@ -1967,6 +2169,7 @@ export async function refreshModelData() {
         // Update models array with fresh data
         if (result && result.updatedModels) {
             models = result.updatedModels;
+            clearPreviewCache();
         }
     } catch (error) {
         alert(error.message || 'Error refreshing model data. Please try again.');
@@ -2195,7 +2398,7 @@ Supported models:
 // ===== File Location Dropdown Functions =====
 
 // Populate file location dropdown with available folders
-async function populateFileLocationDropdown(currentLocation) {
+async function populateFileLocationDropdown(currentLocation, currentRoot) {
     const fileLocationSelect = document.getElementById('model-file-location');
 
     if (!fileLocationSelect) {
@@ -2221,10 +2424,12 @@ async function populateFileLocationDropdown(currentLocation) {
             const option = document.createElement('option');
             option.value = folder.path;
             option.textContent = folder.name;
+            option.dataset.root = folder.root || '';
 
             // Select the current location
-            if (folder.path === currentLocation ||
-                (folder.path === '' && currentLocation === '')) {
+            if ((folder.path === currentLocation ||
+                (folder.path === '' && currentLocation === '')) &&
+                (!currentRoot || !folder.root || folder.root === currentRoot)) {
                 option.selected = true;
             }
 
@@ -2263,31 +2468,37 @@ async function handleMoveModel() {
 
     const fileLocationSelect = document.getElementById('model-file-location');
     const targetFolder = fileLocationSelect.value;
+    const targetRoot = fileLocationSelect.selectedOptions[0]?.dataset.root || '';
 
     // Get current location from model path
     const modelPath = currentModel.path || '';
     const pathWithoutFilename = modelPath.substring(0, modelPath.lastIndexOf('\\'));
-    const modelsDir = settingsManager.getSetting('modelsDirectory').replace(/\\/g, '/');
+    const modelsDir = formatModelsDirectory(settingsManager.getSetting('modelsDirectory')).replace(/\\/g, '/');
     const fullPath = pathWithoutFilename.replace(/\\/g, '/');
 
     let currentFolder = fullPath;
-    if (modelsDir && fullPath.startsWith(modelsDir)) {
+    if (currentModel.relativeDir !== undefined) {
+        currentFolder = currentModel.relativeDir;
+    } else if (modelsDir && fullPath.startsWith(modelsDir)) {
         currentFolder = fullPath.substring(modelsDir.length);
         if (currentFolder.startsWith('/')) {
             currentFolder = currentFolder.substring(1);
         }
     }
+    const currentRoot = currentModel.rootId || '';
 
     // Check if target is different from current location
-    if (targetFolder === currentFolder ||
-        (targetFolder === '' && currentFolder === '')) {
+    if ((targetFolder === currentFolder ||
+        (targetFolder === '' && currentFolder === '')) &&
+        (!targetRoot || targetRoot === currentRoot)) {
         alert('Model is already in the selected location');
         return;
     }
 
     // Get display names for confirmation
-    const currentLocationDisplay = currentFolder || 'Root';
-    const targetLocationDisplay = targetFolder || 'Root';
+    const currentLocationDisplay = fileLocationSelect.selectedOptions.length && currentRoot && targetRoot !== currentRoot
+        ? `${currentRoot}/${currentFolder}` : (currentFolder || 'Root');
+    const targetLocationDisplay = fileLocationSelect.selectedOptions[0]?.textContent || targetFolder || 'Root';
 
     // Confirm with user
     const confirmMessage = `Move "${currentModel.name}" and all associated files?\n\nFrom: ${currentLocationDisplay}\nTo: ${targetLocationDisplay}`;
@@ -2311,8 +2522,10 @@ async function handleMoveModel() {
                 'Content-Type': 'application/json'
             },
             body: JSON.stringify({
+                modelId: currentModel.id,
                 modelName: currentModel.name,
-                targetFolder: targetFolder
+                targetFolder: targetFolder,
+                targetRoot: targetRoot
             })
         });
 
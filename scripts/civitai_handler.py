@@ -7,10 +7,14 @@ Handles all Civitai API interactions, file hashing, and model info management
 import os
 import hashlib
 import json
-import requests
 import re
+import logging
 from pathlib import Path
 
+import json_codec
+
+logger = logging.getLogger(__name__)
+
 # Civitai API endpoints
 CIVITAI_API_URLS = {
     "model_page": "https://civitai.com/models/",
@@ -30,6 +34,12 @@ INFO_EXTENSION = '.civitai.info'
 PREVIEW_EXTENSION = '.preview.png'
 
 
+def _http_get(url, timeout=30):
+    """GET url with the default headers; requests is imported on first use, as it is slow to load"""
+    import requests
+    return requests.get(url, headers=DEFAULT_HEADERS, timeout=timeout)
+
+
 def generate_sha256(file_path, chunk_size=8192):
     """
     Generate SHA256 hash for a file
@@ -48,7 +58,7 @@ def generate_sha256(file_path, chunk_size=8192):
                 sha256_hash.update(chunk)
         return sha256_hash.hexdigest()
     except Exception as e:
-        print(f"Error generating SHA256 for {file_path}: {e}")
+        logger.error("Error generating SHA256 for %s: %s", file_path, e)
         return None
 
 
@@ -64,18 +74,18 @@ def fetch_model_info_by_hash(file_hash):
     """
     try:
         url = f"{CIVITAI_API_URLS['hash']}{file_hash}"
-        response = requests.get(url, headers=DEFAULT_HEADERS, timeout=30)
+        response = _http_get(url)
         
         if response.status_code == 404:
-            print(f"Model not found on Civitai for hash: {file_hash}")
+            logger.info("Model not found on Civitai for hash: %s", file_hash)
             return {}
         elif not response.ok:
-            print(f"Civitai API error {response.status_code}: {response.text}")
+            logger.error("Civitai API error %s: %s", response.status_code, response.text)
             return None
             
         return response.json()
     except Exception as e:
-        print(f"Error fetching model info: {e}")
+        logger.error("Error fetching model info: %s", e)
         return None
 
 
@@ -91,15 +101,15 @@ def fetch_model_info_by_id(model_id):
     """
     try:
         url = f"{CIVITAI_API_URLS['model_id']}{model_id}"
-        response = requests.get(url, headers=DEFAULT_HEADERS, timeout=30)
+        response = _http_get(url)
         
         if not response.ok:
-            print(f"Civitai API error {response.status_code}: {response.text}")
+            logger.error("Civitai API error %s: %s", response.status_code, response.text)
             return None
             
         return response.json()
     except Exception as e:
-        print(f"Error fetching model info by ID: {e}")
+        logger.error("Error fetching model info by ID: %s", e)
         return None
 
 
@@ -121,10 +131,10 @@ def save_civitai_info(model_path, model_info):
         with open(info_path, 'w', encoding='utf-8') as f:
             json.dump(model_info, f, indent=2)
         
-        print(f"Saved model info to: {info_path}")
+        logger.info("Saved model info to: %s", info_path)
         return True
     except Exception as e:
-        print(f"Error saving civitai info: {e}")
+        logger.error("Error saving civitai info: %s", e)
         return False
 
 
@@ -146,10 +156,10 @@ def create_dummy_info_file(model_path):
         with open(info_path, 'w', encoding='utf-8') as f:
             json.dump({}, f, indent=2)
         
-        print(f"Created dummy info file: {info_path}")
+        logger.info("Created dummy info file: %s", info_path)
         return True
     except Exception as e:
-        print(f"Error creating dummy info file: {e}")
+        logger.error("Error creating dummy info file: %s", e)
         return False
 
 
@@ -186,28 +196,27 @@ def download_preview_image(model_path, max_size=False, skip_nsfw=True):
         
         # Check if preview already exists
         if os.path.exists(preview_path):
-            print(f"Preview already exists: {preview_path}")
+            logger.debug("Preview already exists: %s", preview_path)
             return True
         
         # Load civitai info
         if not os.path.exists(info_path):
-            print(f"No civitai info file found: {info_path}")
+            logger.info("No civitai info file found: %s", info_path)
             return False
             
-        with open(info_path, 'r', encoding='utf-8') as f:
-            model_info = json.load(f)
+        model_info = json_codec.read_json(info_path)
         
         # Get images from model info
         images = model_info.get('images', [])
         if not images:
-            print(f"No images found in civitai info")
+            logger.info("No images found in civitai info")
             return False
         
         # Find first suitable image
         for img in images:
             # Skip if NSFW and skip_nsfw is True
             if skip_nsfw and img.get('nsfw') and img.get('nsfw') != 'None':
-                print(f"Skipping NSFW image")
+                logger.debug("Skipping NSFW image")
                 continue
             
             # Skip if not an image type
@@ -224,20 +233,20 @@ def download_preview_image(model_path, max_size=False, skip_nsfw=True):
                 img_url = get_full_size_image_url(img_url, img['width'])
             
             # Download image
-            response = requests.get(img_url, headers=DEFAULT_HEADERS, timeout=30)
+            response = _http_get(img_url)
             if response.ok:
                 with open(preview_path, 'wb') as f:
                     f.write(response.content)
-                print(f"Downloaded preview: {preview_path}")
+                logger.info("Downloaded preview: %s", preview_path)
                 return True
             else:
-                print(f"Failed to download image: {response.status_code}")
+                logger.warning("Failed to download image: %s", response.status_code)
                 
-        print(f"No suitable preview image found")
+        logger.info("No suitable preview image found")
         return False
         
     except Exception as e:
-        print(f"Error downloading preview: {e}")
+        logger.error("Error downloading preview: %s", e)
         return False
 
 
@@ -270,7 +279,7 @@ def scan_models_directory(directory):
                     }
                     models.append(model_data)
     except Exception as e:
-        print(f"Error scanning directory: {e}")
+        logger.error("Error scanning directory: %s", e)
     
     return models
 
@@ -342,6 +351,6 @@ def fix_thumbnail_name(model_path):
         return ('skipped', 'No image file found')
         
     except Exception as e:
-        print(f"Error fixing thumbnail name: {e}")
+        logger.error("Error fixing thumbnail name: %s", e)
         return ('error', str(e))
 
@@ -69,16 +69,18 @@ export async function handleImageDrop(file, currentModel, refreshModelData) {
         return;
     }
 
-    // Check file size (max 10MB)
-    const maxSize = 10 * 1024 * 1024; // 10MB
+    // Check file size (max 50MB, same limit as the server)
+    const maxSize = 50 * 1024 * 1024; // 50MB
     if (file.size > maxSize) {
-        alert('Image file is too large. Maximum size is 10MB');
+        alert('Image file is too large. Maximum size is 50MB');
         return;
     }
 
     try {
         // Create FormData for multipart upload
         const formData = new FormData();
+        // Model fields go first: the server picks the target folder before the image streams in
+        formData.append('modelId', currentModel.id);
         formData.append('modelName', currentModel.name);
         formData.append('imageFile', file);
 
@@ -0,0 +1,156 @@
+// duplicates-view.js - Duplicate model report and merge actions (Duplicates modal)
+
+import * as ModelOps from './model-operations.js';
+
+// Delay between /duplicates polls while the server is hashing (ms)
+const DUPLICATES_POLL_INTERVAL = 1000;
+
+const modal = document.getElementById('duplicatesModal');
+const summary = document.getElementById('duplicates-summary');
+const groupsContainer = document.getElementById('duplicates-groups');
+const actionSelect = document.getElementById('duplicates-action');
+const mergeButton = document.getElementById('merge-duplicates');
+
+let report = null;
+let pollTimer = null;
+let onMerged = null;
+
+function formatMegabytes(bytes) {
+    return `${(bytes / 1048576).toFixed(1)} MB`;
+}
+
+/**
+ * Open the Duplicates modal and load the report
+ * @param {Function} mergedCallback - Called after a merge changed the library (e.g. to reload the listing)
+ */
+export function openDuplicatesModal(mergedCallback) {
+    onMerged = mergedCallback;
+    modal.style.display = 'block';
+    loadReport(false);
+}
+
+export function closeDuplicatesModal() {
+    clearTimeout(pollTimer);
+    modal.style.display = 'none';
+}
+
+// Ask for the report, polling while the server is still hashing
+async function loadReport(refresh) {
+    clearTimeout(pollTimer);
+    mergeButton.disabled = true;
+    try {
+        const data = await ModelOps.loadDuplicates(refresh);
+        if (data.state === 'running') {
+            const progress = data.progress;
+            summary.textContent = progress.toHash
+                ? `Hashing ${progress.hashed} of ${progress.toHash} files (${formatMegabytes(progress.hashedBytes)} of ${formatMegabytes(progress.toHashBytes)})...`
+                : `Comparing ${progress.models} models...`;
+            groupsContainer.innerHTML = '';
+            if (modal.style.display === 'block') {
+                pollTimer = setTimeout(() => loadReport(false), DUPLICATES_POLL_INTERVAL);
+            }
+            return;
+        }
+        report = data;
+        renderReport();
+    } catch (error) {
+        console.error('Error loading duplicates:', error);
+        summary.textContent = error.message || 'Failed to load duplicates.';
+    }
+}
+
+function renderReport() {
+    groupsContainer.innerHTML = '';
+    if (report.groups.length === 0) {
+        summary.textContent = `No duplicates among ${report.progress.models} models.`;
+        return;
+    }
+    summary.textContent = `${report.groups.length} groups of identical files, ${formatMegabytes(report.reclaimable)} reclaimable. ` +
+        'Choose the copy to keep in each group.';
+
+    report.groups.forEach((group, groupIndex) => {
+        const section = document.createElement('div');
+        section.className = 'duplicate-group';
+
+        const header = document.createElement('label');
+        header.className = 'duplicate-group-header';
+        const include = document.createElement('input');
+        include.type = 'checkbox';
+        include.checked = true;
+        include.className = 'duplicate-include';
+        header.append(include, ` ${group.models.length} copies of ${formatMegabytes(group.size)}, ${formatMegabytes(group.reclaimable)} reclaimable`);
+        section.appendChild(header);
+
+        group.models.forEach((model, modelIndex) => {
+            const row = document.createElement('label');
+            row.className = 'duplicate-model';
+            const keep = document.createElement('input');
+            keep.type = 'radio';
+            keep.name = `duplicate-keep-${groupIndex}`;
+            keep.value = model.id;
+            keep.checked = modelIndex === 0;
+            const path = document.createElement('span');
+            path.textContent = model.path + (model.linked ? ' (already linked)' : '');
+            path.title = `SHA256 from ${model.hashSource}`;
+            row.append(keep, path);
+            section.appendChild(row);
+        });
+        groupsContainer.appendChild(section);
+    });
+    mergeButton.disabled = false;
+}
+
+// Merge every included group into its chosen copy
+async function mergeDuplicates() {
+    const merges = [];
+    groupsContainer.querySelectorAll('.duplicate-group').forEach((section, groupIndex) => {
+        if (!section.querySelector('.duplicate-include').checked) {
+            return;
+        }
+        const keep = section.querySelector(`input[name="duplicate-keep-${groupIndex}"]:checked`).value;
+        const remove = report.groups[groupIndex].models
+            .filter(model => model.id !== keep && !model.linked)
+            .map(model => model.id);
+        merges.push({ keep, remove });
+    });
+    if (merges.length === 0) {
+        return;
+    }
+
+    const action = actionSelect.value;
+    const removeCount = merges.reduce((sum, merge) => sum + merge.remove.length, 0);
+    const verb = { delete: 'Delete', hardlink: 'Replace with hardlinks', quarantine: 'Move to quarantine' }[action];
+    if (!confirm(`${verb}: ${removeCount} duplicate model${removeCount === 1 ? '' : 's'}?`)) {
+        return;
+    }
+
+    mergeButton.disabled = true;
+    try {
+        const result = await ModelOps.resolveDuplicates(action, merges);
+        const counts = Object.entries(result.counts).map(([status, count]) => `${count} ${status}`).join(', ');
+        const failed = result.results.filter(item => item.error);
+        if (failed.length) {
+            console.error('Duplicate merge failures:', failed);
+        }
+        alert(`Duplicates: ${counts || 'nothing to do'}. ${formatMegabytes(result.freed)} freed.` +
+            (failed.length ? `\nFirst problem: ${failed[0].id}: ${failed[0].error}` : ''));
+        if (onMerged) {
+            await onMerged();
+        }
+        loadReport(false);
+    } catch (error) {
+        console.error('Error merging duplicates:', error);
+        alert(error.message || 'Failed to merge duplicates.');
+        mergeButton.disabled = false;
+    }
+}
+
+modal.querySelector('.close-modal').addEventListener('click', closeDuplicatesModal);
+modal.addEventListener('click', (event) => {
+    if (event.target === modal) {
+        closeDuplicatesModal();
+    }
+});
+mergeButton.addEventListener('click', mergeDuplicates);
+document.getElementById('rescan-duplicates').addEventListener('click', () => loadReport(true));
+document.getElementById('close-duplicates').addEventListener('click', closeDuplicatesModal);
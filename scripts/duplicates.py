@@ -0,0 +1,451 @@
+# -*- coding: UTF-8 -*-
+"""
+Duplicates Module
+Finds model files with identical contents across the library: models are
+grouped by size, and only same-size files are compared by SHA256, taken
+from a persistent hash cache, from their .civitai.info, or computed.
+Duplicates can then be deleted, hardlinked to the copy kept, or moved to
+a quarantine folder, with one index update for all of them
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import json_codec
+from civitai_handler import generate_sha256
+from file_utils import atomic_write_bytes
+from model_index import build_model_record, find_root
+from model_metadata import model_lock
+from model_moves import model_file_paths, move_model_files
+
+logger = logging.getLogger(__name__)
+
+# Files hashed at once (hashlib releases the GIL while hashing)
+HASH_WORKERS = 4
+
+# Bytes read per step while hashing
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Suffix of the link created next to a duplicate before it replaces it
+LINK_SUFFIX = '.linking'
+
+RESOLVE_ACTIONS = ('delete', 'hardlink', 'quarantine')
+
+
+class HashCache:
+    """
+    SHA256 of model files computed earlier, kept in a JSON file
+
+    Entries are keyed by path and only used while the file's size and
+    mtime are unchanged, so an edited or replaced file is hashed again.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._entries = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._entries is None:
+            self._entries = {}
+            if os.path.exists(self.file_path):
+                try:
+                    entries = json_codec.read_json(self.file_path)
+                    if isinstance(entries, dict):
+                        self._entries = entries
+                except (OSError, ValueError) as e:
+                    logger.warning("Ignoring unreadable hash cache %s: %s", self.file_path, e)
+
+    def get(self, path, stat):
+        """Cached SHA256 of path if its size and mtime match stat, else None"""
+        with self._lock:
+            self._load()
+            entry = self._entries.get(path)
+        if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            return entry[2]
+        return None
+
+    def put(self, path, stat, sha256):
+        with self._lock:
+            self._load()
+            self._entries[path] = [stat.st_size, stat.st_mtime_ns, sha256]
+            self._dirty = True
+
+    def sha256(self, path, stat, progress=None):
+        """SHA256 of path, from the cache or computed (and cached); None if unreadable"""
+        sha256 = self.get(path, stat)
+        if sha256 is None:
+            sha256 = generate_sha256(path, chunk_size=HASH_CHUNK_SIZE)
+            if sha256 is None:
+                return None
+            self.put(path, stat, sha256)
+            if progress is not None:
+                progress.add(hashed=1, hashed_bytes=stat.st_size)
+        return sha256
+
+    def save(self):
+        """Write the cache if entries were added"""
+        with self._lock:
+            if not self._dirty:
+                return
+            # Drop entries of files that are gone
+            entries = {path: entry for path, entry in self._entries.items() if os.path.exists(path)}
+            try:
+                atomic_write_bytes(self.file_path, json_codec.dumps(entries))
+                self._entries = entries
+                self._dirty = False
+            except OSError as e:
+                logger.warning("Could not save hash cache %s: %s", self.file_path, e)
+
+
+class DuplicateProgress:
+    """Live counters of one duplicate search, safe to read while it runs"""
+
+    __slots__ = ('models', 'candidates', 'to_hash', 'to_hash_bytes', 'hashed', 'hashed_bytes', 'started', 'finished', '_lock')
+
+    def __init__(self):
+        self.models = 0
+        self.candidates = 0
+        self.to_hash = 0
+        self.to_hash_bytes = 0
+        self.hashed = 0
+        self.hashed_bytes = 0
+        self.started = time.time()
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def add(self, hashed=0, hashed_bytes=0):
+        with self._lock:
+            self.hashed += hashed
+            self.hashed_bytes += hashed_bytes
+
+    def finish(self):
+        self.finished = time.time()
+
+    def to_dict(self):
+        return {
+            'models': self.models,
+            'candidates': self.candidates,
+            'toHash': self.to_hash,
+            'toHashBytes': self.to_hash_bytes,
+            'hashed': self.hashed,
+            'hashedBytes': self.hashed_bytes,
+            'seconds': round((self.finished or time.time()) - self.started, 2)
+        }
+
+
+def embedded_sha256(record):
+    """
+    SHA256 of the model file as listed in its .civitai.info (files[].hashes)
+
+    The entry must match the model file by name or, failing that, be the
+    only entry of the same size, since an info file may describe another
+    variant of the model.
+
+    Returns:
+        Lowercase hex digest, or None
+    """
+    files = record.civitai_info().get('files') if record.civitai_file else None
+    if not isinstance(files, list):
+        return None
+    by_size = []
+    for entry in files:
+        if not isinstance(entry, dict) or not isinstance(entry.get('hashes'), dict):
+            continue
+        sha256 = entry['hashes'].get('SHA256')
+        if not isinstance(sha256, str) or len(sha256) != 64:
+            continue
+        if entry.get('name') == record.filename:
+            return sha256.lower()
+        size_kb = entry.get('sizeKB')
+        if isinstance(size_kb, (int, float)) and abs(size_kb * 1024 - record.size) < 1024:
+            by_size.append(sha256.lower())
+    return by_size[0] if len(set(by_size)) == 1 else None
+
+
+def find_duplicates(records, hash_cache, progress=None, workers=HASH_WORKERS):
+    """
+    Group models whose files have identical contents
+
+    Only models sharing their size with another model are looked at. Files
+    that are already hardlinks of each other count once; a group of links
+    to one file is not a duplicate.
+
+    Args:
+        records: ModelRecords to compare
+        hash_cache: HashCache of computed hashes
+        progress: Optional DuplicateProgress
+        workers: Files hashed at once
+
+    Returns:
+        List of groups, most reclaimable bytes first: {"sha256", "size",
+        "reclaimable", "models": [{"id", "path", "hashSource", "linked"}]}
+        where hashSource is "cache", "civitai" or "computed", and linked
+        tells that the file is a hardlink of an earlier one in the group
+    """
+    progress = progress or DuplicateProgress()
+    progress.models = len(records)
+
+    by_size = defaultdict(list)
+    for record in records:
+        if record.size > 0:
+            by_size[record.size].append(record)
+
+    # Same-size files, by inode (hardlinks are one file)
+    candidates = []
+    for size, same_size in by_size.items():
+        if len(same_size) < 2:
+            continue
+        stats = []
+        for record in same_size:
+            try:
+                stats.append((record, os.stat(record.path)))
+            except OSError:
+                continue
+        if len({(stat.st_dev, stat.st_ino) for _, stat in stats}) > 1:
+            candidates.extend(stats)
+    progress.candidates = len(candidates)
+
+    # Hashes known without reading the file, then compute the rest once per inode
+    hashes = {}
+    sources = {}
+    to_hash = {}
+    for record, stat in candidates:
+        inode = (stat.st_dev, stat.st_ino)
+        if inode in hashes or inode in to_hash:
+            continue
+        sha256 = hash_cache.get(record.path, stat)
+        source = 'cache'
+        if sha256 is None:
+            sha256, source = embedded_sha256(record), 'civitai'
+        if sha256 is None:
+            to_hash[inode] = (record.path, stat)
+        else:
+            hashes[inode], sources[inode] = sha256, source
+    progress.to_hash = len(to_hash)
+    progress.to_hash_bytes = sum(stat.st_size for _, stat in to_hash.values())
+
+    if to_hash:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(to_hash)))) as executor:
+            computed = executor.map(lambda item: hash_cache.sha256(item[0], item[1], progress), to_hash.values())
+            for inode, sha256 in zip(to_hash, computed):
+                if sha256 is not None:
+                    hashes[inode], sources[inode] = sha256, 'computed'
+        hash_cache.save()
+
+    groups = defaultdict(list)
+    for record, stat in candidates:
+        inode = (stat.st_dev, stat.st_ino)
+        if inode in hashes:
+            groups[(stat.st_size, hashes[inode])].append((record, inode))
+
+    report = []
+    for (size, sha256), members in groups.items():
+        inodes = {inode for _, inode in members}
+        if len(inodes) < 2:
+            continue
+        seen = set()
+        models = []
+        for record, inode in members:
+            models.append({'id': record.id, 'path': record.path, 'hashSource': sources[inode], 'linked': inode in seen})
+            seen.add(inode)
+        report.append({'sha256': sha256, 'size': size, 'reclaimable': size * (len(inodes) - 1), 'models': models})
+    report.sort(key=lambda group: -group['reclaimable'])
+    progress.finish()
+    return report
+
+
+class DuplicateFinder:
+    """
+    Latest duplicate report of the library, computed in the background
+
+    A report is kept until the listing it was made from changes (see
+    model_listing.listing_etag), so opening the report again is free.
+    """
+
+    def __init__(self, hash_cache):
+        self.hash_cache = hash_cache
+        self._lock = threading.Lock()
+        self._key = None
+        self._report = None
+        self._progress = None
+        self._running = False
+
+    def report(self, key, records, refresh=False):
+        """
+        The report for a listing, starting a search if there is none yet
+
+        Args:
+            key: ETag of the listing records belongs to
+            records: ModelRecords of the listing
+            refresh: Search again even if a report for key exists
+
+        Returns:
+            {"state": "running", "progress"} while searching, else
+            {"state": "done", "progress", "groups", "reclaimable"}
+        """
+        with self._lock:
+            current = self._key == key and (self._running or (self._report is not None and not refresh))
+            if not current and not self._running:
+                self._key, self._report, self._running = key, None, True
+                self._progress = DuplicateProgress()
+                threading.Thread(target=self._search, args=(key, records, self._progress),
+                                 name="duplicates", daemon=True).start()
+            if self._report is None or self._key != key:
+                return {'state': 'running', 'progress': self._progress.to_dict()}
+            return {
+                'state': 'done',
+                'progress': self._progress.to_dict(),
+                'groups': self._report,
+                'reclaimable': sum(group['reclaimable'] for group in self._report)
+            }
+
+    def _search(self, key, records, progress):
+        report = []
+        try:
+            report = find_duplicates(records, self.hash_cache, progress)
+            logger.info("Found %d duplicate groups among %d models in %.1fs (%d files hashed)",
+                        len(report), len(records), time.time() - progress.started, progress.hashed)
+        except Exception as e:
+            logger.error("Duplicate search failed: %s", e)
+        finally:
+            progress.finish()
+            with self._lock:
+                if self._key == key:
+                    self._report = report
+                self._running = False
+
+
+def quarantine_directory(root, relative_dir, base=''):
+    """
+    Folder a quarantined model goes to
+
+    Args:
+        root: LibraryRoot of the model
+        relative_dir: The model's folder within the root
+        base: Configured quarantine folder; empty for "<root>-duplicates"
+            next to the root (outside the library, usually on the same drive)
+
+    Returns:
+        Folder path, mirroring the model's folder
+    """
+    if base:
+        parent = os.path.join(base, root.id)
+    else:
+        parent = os.path.normpath(root.path) + '-duplicates'
+    return os.path.join(parent, *[part for part in relative_dir.split('/') if part])
+
+
+def _replace_with_link(keep_path, path):
+    """Atomically replace path with a hardlink of keep_path"""
+    link_path = path + LINK_SUFFIX
+    os.link(keep_path, link_path)
+    try:
+        os.replace(link_path, path)
+    except OSError:
+        os.remove(link_path)
+        raise
+
+
+def resolve_duplicates(model_index, roots, hash_cache, merges, action, quarantine_base=''):
+    """
+    Merge duplicate models into the copy kept
+
+    Before anything is changed, the files are hashed (or taken from the
+    hash cache) and compared, so a .civitai.info hash alone never decides
+    that a file can go.
+
+    Args:
+        model_index: ModelIndex holding the models
+        roots: Configured LibraryRoots
+        hash_cache: HashCache of computed hashes
+        merges: List of {"keep": id, "remove": [ids]}
+        action: "delete" (remove the other copies with their sidecars and
+            previews), "hardlink" (replace the other model files with links
+            to the kept one; sidecars stay) or "quarantine" (move the other
+            copies with their files, see quarantine_directory)
+        quarantine_base: Configured quarantine folder, if any
+
+    Returns:
+        (results, freed bytes); results hold {"id", "status"} per removed
+        model with status "deleted", "linked", "quarantined", "unchanged",
+        "mismatch", "not_found" or "error" (with "error"), and "bytes" the
+        merge reclaims. Quarantined bytes are not counted as freed until
+        the quarantine folder is emptied.
+
+    Raises:
+        ValueError: Unknown action
+    """
+    if action not in RESOLVE_ACTIONS:
+        raise ValueError(f"Unknown action {action!r} (expected one of {', '.join(RESOLVE_ACTIONS)})")
+    records = {record.id: record for record in model_index.records(roots)}
+    results = []
+    freed = 0
+    removed = defaultdict(list)
+    replaced = defaultdict(list)
+
+    for merge in merges:
+        keep = records.get(merge.get('keep'))
+        try:
+            keep_stat = os.stat(keep.path) if keep else None
+        except OSError:
+            keep_stat = None
+        keep_sha256 = hash_cache.sha256(keep.path, keep_stat) if keep_stat else None
+        for model_id in merge.get('remove') or ():
+            record = records.get(model_id)
+            if record is None or keep is None or model_id == keep.id:
+                results.append({'id': model_id, 'status': 'not_found'})
+                continue
+            with model_lock(model_id):
+                try:
+                    stat = os.stat(record.path)
+                except OSError:
+                    results.append({'id': model_id, 'status': 'not_found'})
+                    continue
+                if keep_stat and (stat.st_dev, stat.st_ino) == (keep_stat.st_dev, keep_stat.st_ino):
+                    results.append({'id': model_id, 'status': 'unchanged'})
+                    continue
+                if keep_sha256 is None or stat.st_size != keep_stat.st_size or hash_cache.sha256(record.path, stat) != keep_sha256:
+                    results.append({'id': model_id, 'status': 'mismatch', 'error': "Contents differ from the model kept"})
+                    continue
+                # Space comes back only when no other link to the file remains
+                reclaimed = stat.st_size if stat.st_nlink == 1 else 0
+                try:
+                    if action == 'hardlink':
+                        if stat.st_dev != keep_stat.st_dev:
+                            raise OSError("Cannot hardlink across drives")
+                        _replace_with_link(keep.path, record.path)
+                        status = 'linked'
+                    elif action == 'quarantine':
+                        root = find_root(roots, record.root_id)
+                        move_model_files(record, quarantine_directory(root, record.relative_dir, quarantine_base))
+                        status = 'quarantined'
+                    else:
+                        for path in model_file_paths(record):
+                            os.remove(path)
+                        status = 'deleted'
+                except OSError as e:
+                    logger.warning("Could not %s duplicate %s: %s", action, model_id, e)
+                    results.append({'id': model_id, 'status': 'error', 'error': str(e)})
+                    continue
+            logger.info("Duplicate %s of %s %s", model_id, keep.id, status)
+            results.append({'id': model_id, 'status': status, 'bytes': reclaimed})
+            if action != 'quarantine':
+                freed += reclaimed
+            if action == 'hardlink':
+                # The file now has the kept copy's date; the rest of the model is unchanged
+                rebuilt = build_model_record(find_root(roots, record.root_id), record.directory, record.relative_dir, record.filename)
+                if rebuilt is not None:
+                    replaced[record.root_id].append(rebuilt)
+            else:
+                removed[record.root_id].append(model_id)
+
+    hash_cache.save()
+    for root_id in dict.fromkeys(list(removed) + list(replaced)):
+        model_index.update_records(find_root(roots, root_id), replaced=replaced.get(root_id, ()), removed=removed.get(root_id, ()))
+    return results, freed
@@ -0,0 +1,168 @@
+# -*- coding: UTF-8 -*-
+"""
+Facet Index Module
+Value counts for the filter dropdowns (base model, category, creator, tags),
+kept per library shard so a rescan only recounts that shard
+"""
+
+import heapq
+import logging
+from collections import Counter
+from itertools import chain
+
+logger = logging.getLogger(__name__)
+
+FACETS = ('baseModel', 'category', 'creator', 'tags')
+
+# Multi-valued facets (one count per distinct value in the record)
+MULTI_VALUED_FACETS = ('tags',)
+
+UNKNOWN_BASE_MODEL = 'Unknown'
+
+# Merged whole-library counts of the current shard indexes: (name, hide_nsfw) -> (indexes, values)
+_totals_cache = {}
+
+
+def _string(value):
+    if isinstance(value, str) and value.strip():
+        return value.strip()
+    return None
+
+
+def _json_string(record, key):
+    json_data = record.json
+    return _string(json_data.get(key)) if isinstance(json_data, dict) else None
+
+
+def _split_tags(tags):
+    """Distinct comma-separated tags, in order"""
+    if not tags:
+        return ()
+    return tuple(dict.fromkeys(tag.strip() for tag in tags.split(',') if tag.strip()))
+
+
+def facet_values(record):
+    """
+    Facet values of one record, as shown in the UI
+
+    Returns:
+        Dict facet name -> value (None if missing), tuple of values for tags
+    """
+    return {
+        'baseModel': _string(record.base_model) or UNKNOWN_BASE_MODEL,
+        'category': _string(record.category),
+        'creator': _json_string(record, 'creator'),
+        'tags': _split_tags(_json_string(record, 'tags'))
+    }
+
+
+def is_nsfw(record):
+    """Whether a record is hidden by the hideNSFW setting"""
+    return isinstance(record.json, dict) and record.json.get('nsfw') == 'true'
+
+
+class FacetIndex:
+    """
+    Facet values of one shard of ModelRecords, by record ordinal
+
+    Whole-shard counts (and the NSFW part of them) are computed once at
+    build time; counts for a subset (a query's matches) are a single pass
+    over that subset. Ordinals are positions in the shard list, the same as
+    in the shard's SearchIndex.
+    """
+
+    def __init__(self, records):
+        self.records = records
+        self.nsfw = frozenset(ordinal for ordinal, record in enumerate(records) if is_nsfw(record))
+        self._values = {name: [] for name in FACETS}
+        for record in records:
+            for name, value in facet_values(record).items():
+                self._values[name].append(value)
+        self._totals = {name: self._count(name, range(len(records))) for name in FACETS}
+        self._nsfw_totals = {name: self._count(name, self.nsfw) for name in FACETS}
+
+    def _count(self, name, ordinals):
+        values = map(self._values[name].__getitem__, ordinals)
+        if name in MULTI_VALUED_FACETS:
+            values = chain.from_iterable(values)
+        counts = Counter(values)
+        counts.pop(None, None)
+        return counts
+
+    def counts(self, name, ordinals=None, hide_nsfw=False):
+        """
+        Count the values of a facet
+
+        Args:
+            name: One of FACETS
+            ordinals: Only count these records (all records if None)
+            hide_nsfw: Leave out NSFW records
+
+        Returns:
+            Counter value -> number of records
+        """
+        if ordinals is None:
+            counts = Counter(self._totals[name])
+            if hide_nsfw:
+                counts.subtract(self._nsfw_totals[name])
+                counts = +counts
+            return counts
+        if hide_nsfw and self.nsfw:
+            ordinals = [ordinal for ordinal in ordinals if ordinal not in self.nsfw]
+        return self._count(name, ordinals)
+
+
+def _sorted_totals(indexes, name, hide_nsfw):
+    """Merged whole-library counts as (value, count) in _value_order, cached per set of shard indexes"""
+    key = (name, hide_nsfw)
+    cached = _totals_cache.get(key)
+    if cached is not None and len(cached[0]) == len(indexes) and all(a is b for a, b in zip(cached[0], indexes)):
+        return cached[1]
+
+    totals = Counter()
+    for index in indexes:
+        totals.update(index.counts(name, hide_nsfw=hide_nsfw))
+    values = sorted(totals.items(), key=_value_order)
+    _totals_cache[key] = (tuple(indexes), values)
+    return values
+
+
+def _value_order(item):
+    return (-item[1], item[0].casefold(), item[0])
+
+
+def facet_counts(indexes, names=FACETS, matches=None, hide_nsfw=False, limit=None):
+    """
+    Merge facet counts across shards
+
+    Args:
+        indexes: List of FacetIndex, one per shard
+        names: Facets to count
+        matches: Optional list of ordinal sets (one per shard) of a query's
+            results; adds a 'matched' count to every value
+        hide_nsfw: Leave out NSFW records
+        limit: Maximum number of values per facet (all if None)
+
+    Returns:
+        Dict facet name -> list of {'value', 'count'[, 'matched']}, by
+        descending matched count (with matches), count, then value
+    """
+    result = {}
+    for name in names:
+        values = _sorted_totals(indexes, name, hide_nsfw)
+        if matches is None:
+            if limit is not None:
+                values = values[:limit]
+            result[name] = [{'value': value, 'count': count} for value, count in values]
+            continue
+
+        matched = Counter()
+        for index, ordinals in zip(indexes, matches):
+            matched.update(index.counts(name, ordinals, hide_nsfw))
+        # values is already in count order, so a stable sort on matched keeps it as the tie-break
+        if limit is not None:
+            values = heapq.nsmallest(limit, values, key=lambda item: -matched.get(item[0], 0))
+        else:
+            values = sorted(values, key=lambda item: -matched.get(item[0], 0))
+        result[name] = [{'value': value, 'count': count, 'matched': matched.get(value, 0)} for value, count in values]
+    return result
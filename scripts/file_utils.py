@@ -0,0 +1,118 @@
+# -*- coding: UTF-8 -*-
+"""
+File Utilities Module
+Small filesystem helpers shared by the server and the batch scripts
+"""
+
+import os
+import json
+import stat
+import tempfile
+
+
+def atomic_write_bytes(file_path, data):
+    """
+    Write bytes to a file atomically (temp file in the same folder + rename)
+
+    Readers never see a half-written file, and a crash mid-write leaves the
+    previous contents in place. A replaced file keeps its permissions.
+
+    Args:
+        file_path: Destination path
+        data: Bytes to write
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    try:
+        mode = stat.S_IMODE(os.stat(file_path).st_mode)
+    except OSError:
+        mode = 0o644
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix=os.path.basename(file_path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates the file private to the owner
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_json(file_path, data, indent=4, sort_keys=False):
+    """
+    Serialize data as JSON and write it atomically
+
+    Args:
+        file_path: Destination path
+        data: JSON-serializable object
+        indent: Indentation passed to json.dumps (matches the sidecar format)
+        sort_keys: Write object keys in alphabetical order
+    """
+    atomic_write_bytes(file_path, json.dumps(data, indent=indent, sort_keys=sort_keys).encode('utf-8'))
+
+
+class FileTooLargeError(ValueError):
+    """Raised when streamed data exceeds the allowed size"""
+
+
+def stream_to_temp_file(directory, chunks, max_size=None, suffix='', mode=0o644):
+    """
+    Write an iterable of byte chunks to a new temp file in directory
+
+    The caller renames the file into place (os.replace) or removes it. On
+    any error, including going over max_size, the temp file is removed.
+
+    Args:
+        directory: Folder for the temp file (same filesystem as the target)
+        chunks: Iterable of bytes
+        max_size: Maximum number of bytes, or None for no limit
+        suffix: Temp file name suffix
+        mode: Permissions for the file (mkstemp creates it owner-only)
+
+    Returns:
+        Tuple (temp_path, size)
+
+    Raises:
+        FileTooLargeError: If the data is larger than max_size
+    """
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix=suffix)
+    size = 0
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in chunks:
+                size += len(chunk)
+                if max_size is not None and size > max_size:
+                    raise FileTooLargeError(f"File is larger than {max_size} bytes")
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(temp_path, mode)
+        return temp_path, size
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+# Leading bytes of the image formats accepted as previews
+IMAGE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpeg'),
+)
+
+
+def sniff_image_type(file_path):
+    """Return 'png' or 'jpeg' from a file's magic bytes, or None"""
+    with open(file_path, 'rb') as f:
+        header = f.read(16)
+    for signature, image_type in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return image_type
+    return None
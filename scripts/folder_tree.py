@@ -0,0 +1,120 @@
+# -*- coding: UTF-8 -*-
+"""
+Folder Tree Module
+Folder hierarchy of one library root with model counts, sizes and newest
+model dates aggregated per subtree, built from the model index
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class FolderNode:
+    """One folder: its own models and the totals of its whole subtree"""
+
+    __slots__ = ('path', 'name', 'children', 'direct_models', 'direct_bytes', 'models', 'bytes', 'modified')
+
+    def __init__(self, path):
+        self.path = path
+        self.name = path.rsplit('/', 1)[-1]
+        self.children = []
+        self.direct_models = 0
+        self.direct_bytes = 0
+        self.models = 0
+        self.bytes = 0
+        self.modified = 0
+
+    def to_dict(self):
+        """Folder summary as served by /folders (children not included)"""
+        return {
+            'path': self.path,
+            'name': self.name,
+            'models': self.models,
+            'bytes': self.bytes,
+            'modified': self.modified,
+            'directModels': self.direct_models,
+            'directBytes': self.direct_bytes,
+            'hasChildren': bool(self.children)
+        }
+
+
+class FolderTree:
+    """
+    Folders of one shard of ModelRecords, keyed by path relative to the root
+
+    Folders without models are included when the scan reported them (see
+    scan_library); otherwise the tree holds the folders of the records.
+    'modified' is the newest model file date in the subtree (0 if empty).
+    """
+
+    def __init__(self, records):
+        self.records = records
+        self._nodes = {'': FolderNode('')}
+        for path in getattr(records, 'directories', ()):
+            self._node(path)
+        for record in records:
+            node = self._node(record.relative_dir)
+            node.direct_models += 1
+            node.direct_bytes += record.size
+            if record.date_modified > node.modified:
+                node.modified = record.date_modified
+
+        # Deepest folders first, so each subtree is complete before it is added to its parent
+        for path in sorted(self._nodes, key=lambda path: path.count('/') if path else -1, reverse=True):
+            node = self._nodes[path]
+            node.models += node.direct_models
+            node.bytes += node.direct_bytes
+            node.children.sort(key=lambda child: child.name.casefold())
+            if path:
+                parent = self._nodes[path.rsplit('/', 1)[0] if '/' in path else '']
+                parent.models += node.models
+                parent.bytes += node.bytes
+                if node.modified > parent.modified:
+                    parent.modified = node.modified
+
+    def _node(self, path):
+        """Return the node for path, creating it and any missing ancestors"""
+        node = self._nodes.get(path)
+        if node is None:
+            node = self._nodes[path] = FolderNode(path)
+            parent = self._node(path.rsplit('/', 1)[0] if '/' in path else '')
+            parent.children.append(node)
+        return node
+
+    def get(self, path=''):
+        """Return the FolderNode for a relative path, or None"""
+        return self._nodes.get(path.strip('/'))
+
+    def paths(self):
+        """All folder paths below the root, depth-first in name order"""
+        result = []
+        stack = list(reversed(self._nodes[''].children))
+        while stack:
+            node = stack.pop()
+            result.append(node.path)
+            stack.extend(reversed(node.children))
+        return result
+
+    def subtree(self, path='', depth=1):
+        """
+        Folder summary with children expanded to a given depth
+
+        Args:
+            path: Folder path relative to the root ('' for the root)
+            depth: Levels of children to include (0 for none)
+
+        Returns:
+            Dict as FolderNode.to_dict(), with 'children' lists down to
+            depth, or None if the folder is unknown
+        """
+        node = self.get(path)
+        if node is None:
+            return None
+        return self._expand(node, depth)
+
+    def _expand(self, node, depth):
+        summary = node.to_dict()
+        if depth > 0:
+            summary['children'] = [self._expand(child, depth - 1) for child in node.children]
+        return summary
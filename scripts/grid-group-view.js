@@ -1,12 +1,15 @@
 // grid-group-view.js - Handles grouped grid view display and functionality
 
 // Import settings manager
-import appSettings from './settings.js';
-import { generateCarouselHTML, initializeCarousel } from './preview-carousel.js';
+import appSettings, { formatModelsDirectory } from './settings.js';
+import { createLazyImageObserver } from './preview-bundles.js';
+import { renderModelCard, createGridSpacer } from './grid-view.js';
+import { VirtualList, clearVirtualLists, updateVirtualLists } from './virtual-list.js';
 
 // Function to display models in grouped grid view
 export function displayGroupedGridView(models, modelsContainer, openModelDetails, settings, groupBy) {
     modelsContainer.className = 'grouped-grid-view';
+    clearVirtualLists();
 
     if (models.length === 0) {
         modelsContainer.innerHTML = `
@@ -20,25 +23,8 @@ export function displayGroupedGridView(models, modelsContainer, openModelDetails
     // Clear the container
     modelsContainer.innerHTML = '';
 
-    // Create and setup Intersection Observer for lazy loading
-    const imageObserver = new IntersectionObserver((entries, observer) => {
-        entries.forEach(entry => {
-            if (entry.isIntersecting) {
-                const img = entry.target;
-                const dataSrc = img.getAttribute('data-src');
-                if (dataSrc) {
-                    img.src = dataSrc;
-                    img.removeAttribute('data-src');
-                    img.classList.remove('lazy-image');
-                    img.classList.add('loaded');
-                }
-                observer.unobserve(img);
-            }
-        });
-    }, {
-        rootMargin: '100px 0px', // Start loading images when they're 100px from viewport
-        threshold: 0.1
-    });
+    // Lazy loading: visible previews are fetched in bundles (see preview-bundles.js)
+    const imageObserver = createLazyImageObserver();
 
     // Group models by the selected property
     const groupedModels = groupModelsByProperty(models, groupBy);
@@ -65,6 +51,9 @@ export function displayGroupedGridView(models, modelsContainer, openModelDetails
         sortedGroups = Object.keys(groupedModels).sort();
     }
 
+    // Card container -> its VirtualList, to find the model of a clicked card
+    const groupLists = new Map();
+
     // Create a container for each group
     sortedGroups.forEach(groupName => {
         const groupModels = groupedModels[groupName];
@@ -83,39 +72,13 @@ export function displayGroupedGridView(models, modelsContainer, openModelDetails
         const groupModelsContainer = document.createElement('div');
         groupModelsContainer.className = 'group-models';
 
-        // Add model cards to this group
-        groupModels.forEach(model => {
-            const modelCard = document.createElement('div');
-            modelCard.className = 'model-card';
-            modelCard.dataset.id = model.id;
-
-            // Use previewImages array if available, fallback to single previewUrl
-            const previewImages = model.previewImages || (model.previewUrl ? [model.previewUrl] : []);
-            const carouselHTML = generateCarouselHTML(previewImages, model.name);
-
-            modelCard.innerHTML = `
-                <div class="model-preview">
-                    ${carouselHTML}
-                </div>
-                <div class="model-info">
-                    <div class="model-name">${model.name}</div>
-                    <div class="model-meta">${model.category} | ${model.baseModel}</div>
-                </div>
-            `;
-
-            modelCard.addEventListener('click', () => openModelDetails(model));
-
-            groupModelsContainer.appendChild(modelCard);
-
-            // Initialize carousel if multiple images
-            if (previewImages.length > 1) {
-                initializeCarousel(modelCard, previewImages);
-            }
-
-            // Observe all lazy images for lazy loading (main image and thumbnails)
-            const lazyImages = modelCard.querySelectorAll('.lazy-image');
-            lazyImages.forEach(img => imageObserver.observe(img));
+        // Only the cards near the viewport are in the DOM (see virtual-list.js)
+        const list = new VirtualList(groupModelsContainer, groupModels, {
+            kind: 'model-card',
+            renderItem: (model, index, card) => renderModelCard(model, card, imageObserver),
+            createSpacer: createGridSpacer
         });
+        groupLists.set(groupModelsContainer, list);
 
         // Add models container to group container
         groupContainer.appendChild(groupModelsContainer);
@@ -123,6 +86,18 @@ export function displayGroupedGridView(models, modelsContainer, openModelDetails
         // Add group container to main container
         modelsContainer.appendChild(groupContainer);
     });
+
+    // One click handler for all cards, since cards are recycled while scrolling
+    modelsContainer.onclick = (event) => {
+        const card = event.target.closest('.model-card');
+        const model = card && groupLists.get(card.parentElement)?.itemForNode(card);
+        if (model) {
+            openModelDetails(model);
+        }
+    };
+
+    // Lay out all groups together, once they are in the page
+    updateVirtualLists();
 }
 
 // Helper function to group models by a property
@@ -177,14 +152,17 @@ function groupModelsByProperty(models, property) {
                 // Group by full directory path
                 if (model.path) {
                     // Get the models directory from settings
-                    const modelsDir = appSettings.getSetting('modelsDirectory').replace(/\\/g, '/');
+                    const modelsDir = formatModelsDirectory(appSettings.getSetting('modelsDirectory')).replace(/\\/g, '/');
 
                     // Convert path to forward slashes for consistency
                     const fullPath = model.path.replace(/\\/g, '/');
 
                     // Create relative path by removing the models directory prefix
+                    // (the server reports it directly when models span several library roots)
                     let relativePath = fullPath;
-                    if (modelsDir && fullPath.startsWith(modelsDir)) {
+                    if (model.relativeDir !== undefined) {
+                        relativePath = model.relativeDir ? `${model.relativeDir}/${model.filename}` : model.filename;
+                    } else if (modelsDir && fullPath.startsWith(modelsDir)) {
                         relativePath = fullPath.substring(modelsDir.length);
                         // Remove leading slash if present
                         if (relativePath.startsWith('/')) {
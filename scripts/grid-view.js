@@ -1,10 +1,13 @@
 // grid-view.js - Handles grid view display and functionality
 
-import { generateCarouselHTML, initializeCarousel } from './preview-carousel.js';
+import { generateCarouselHTML, initializeCarousel, previewPlaceholder } from './preview-carousel.js';
+import { createLazyImageObserver } from './preview-bundles.js';
+import { VirtualList, clearVirtualLists, updateVirtualLists } from './virtual-list.js';
 
 // Function to display models in grid view
 export function displayGridView(models, modelsContainer, openModelDetails, settings) {
     modelsContainer.className = 'grid-view';
+    clearVirtualLists();
 
     if (models.length === 0) {
         modelsContainer.innerHTML = `
@@ -15,55 +18,70 @@ export function displayGridView(models, modelsContainer, openModelDetails, setti
         return;
     }
 
-    // Create and setup Intersection Observer for lazy loading
-    const imageObserver = new IntersectionObserver((entries, observer) => {
-        entries.forEach(entry => {
-            if (entry.isIntersecting) {
-                const img = entry.target;
-                const dataSrc = img.getAttribute('data-src');
-                if (dataSrc) {
-                    img.src = dataSrc;
-                    img.removeAttribute('data-src');
-                    img.classList.remove('lazy-image');
-                    img.classList.add('loaded');
-                }
-                observer.unobserve(img);
-            }
-        });
-    }, {
-        rootMargin: '100px 0px', // Start loading images when they're 100px from viewport
-        threshold: 0.1
+    // Lazy loading: visible previews are fetched in bundles (see preview-bundles.js)
+    const imageObserver = createLazyImageObserver();
+
+    // Only the cards near the viewport are in the DOM (see virtual-list.js)
+    const list = new VirtualList(modelsContainer, models, {
+        kind: 'model-card',
+        renderItem: (model, index, card) => renderModelCard(model, card, imageObserver),
+        createSpacer: createGridSpacer
     });
 
-    models.forEach(model => {
-        const modelCard = document.createElement('div');
-        modelCard.className = 'model-card';
-        modelCard.dataset.id = model.id;
+    // One click handler for all cards, since cards are recycled while scrolling
+    modelsContainer.onclick = (event) => {
+        const model = list.itemForNode(event.target.closest('.model-card'));
+        if (model) {
+            openModelDetails(model);
+        }
+    };
 
-        // Use previewImages array if available, fallback to single previewUrl
-        const previewImages = model.previewImages || (model.previewUrl ? [model.previewUrl] : []);
-        const carouselHTML = generateCarouselHTML(previewImages, model.name);
+    updateVirtualLists();
+}
 
-        modelCard.innerHTML = `
-            <div class="model-preview">
-                ${carouselHTML}
-            </div>
-            <div class="model-info">
-                <div class="model-name">${model.name}</div>
-                <div class="model-meta">${model.category} | ${model.baseModel}</div>
-            </div>
-        `;
+/**
+ * Fill a model card (a recycled one, or a new one if card is null)
+ * @param {Object} model - Model to show
+ * @param {HTMLElement|null} card - Card element to reuse
+ * @param {IntersectionObserver} imageObserver - Lazy loader for the preview images
+ * @returns {HTMLElement} The card
+ */
+export function renderModelCard(model, card, imageObserver) {
+    if (card) {
+        card.querySelectorAll('.lazy-image').forEach(img => imageObserver.unobserve(img));
+    } else {
+        card = document.createElement('div');
+        card.className = 'model-card';
+    }
+    card.dataset.id = model.id;
 
-        modelCard.addEventListener('click', () => openModelDetails(model));
-        modelsContainer.appendChild(modelCard);
+    // Use previewImages array if available, fallback to single previewUrl
+    const previewImages = model.previewImages || (model.previewUrl ? [model.previewUrl] : []);
+    const carouselHTML = generateCarouselHTML(previewImages, model.name, previewPlaceholder(model));
 
-        // Initialize carousel if multiple images
-        if (previewImages.length > 1) {
-            initializeCarousel(modelCard, previewImages);
-        }
+    card.innerHTML = `
+        <div class="model-preview">
+            ${carouselHTML}
+        </div>
+        <div class="model-info">
+            <div class="model-name">${model.name}</div>
+            <div class="model-meta">${model.category} | ${model.baseModel}</div>
+        </div>
+    `;
 
-        // Observe all lazy images for lazy loading (main image and thumbnails)
-        const lazyImages = modelCard.querySelectorAll('.lazy-image');
-        lazyImages.forEach(img => imageObserver.observe(img));
-    });
+    // Initialize carousel if multiple images
+    if (previewImages.length > 1) {
+        initializeCarousel(card, previewImages);
+    }
+
+    // Observe all lazy images for lazy loading (main image and thumbnails)
+    card.querySelectorAll('.lazy-image').forEach(img => imageObserver.observe(img));
+    return card;
+}
+
+// Stands in for the rows of cards above and below the rendered ones
+export function createGridSpacer() {
+    const spacer = document.createElement('div');
+    spacer.className = 'virtual-spacer';
+    return spacer;
 }
@@ -0,0 +1,149 @@
+# -*- coding: UTF-8 -*-
+"""
+Image Info Module
+Placeholder data for preview images: pixel dimensions read from the file
+header, and a dominant colour when Pillow is installed, cached by path and
+mtime so a rescan only looks at new or changed previews
+"""
+
+import struct
+import logging
+import functools
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Preview info entries kept between scans (one per preview image in the library)
+PREVIEW_INFO_CACHE_SIZE = 65536
+
+# Enough of the file for the PNG, GIF and WebP headers; JPEG reads on to its frame header
+HEADER_SIZE = 32
+# Give up looking for a JPEG frame header after this many bytes (large EXIF/ICC blocks come first)
+MAX_JPEG_SCAN = 1024 * 1024
+
+# Pillow reduces the image to this size before averaging (JPEGs are decoded at reduced scale)
+COLOR_SAMPLE_SIZE = 16
+
+# Width and height in pixels (None if the format is not recognized), colour as '#rrggbb' or None
+PreviewInfo = namedtuple('PreviewInfo', ['width', 'height', 'color'])
+
+# JPEG start-of-frame markers (baseline, progressive, ...), which carry the image size
+_JPEG_SOF_MARKERS = frozenset((0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF))
+
+
+def preview_info(file_path, stat):
+    """
+    Return the PreviewInfo of an image file
+
+    Args:
+        file_path: Image path
+        stat: os.stat() result (or DirEntry.stat()) of the file; the cache
+            is keyed on its mtime and size
+
+    Returns:
+        PreviewInfo, or None if the file cannot be read
+    """
+    return _preview_info(file_path, stat.st_mtime_ns, stat.st_size)
+
+
+@functools.lru_cache(maxsize=PREVIEW_INFO_CACHE_SIZE)
+def _preview_info(file_path, mtime_ns, size):
+    try:
+        with open(file_path, 'rb') as f:
+            dimensions = image_dimensions(f)
+    except OSError as e:
+        logger.debug("Cannot read preview %s: %s", file_path, e)
+        return None
+    width, height = dimensions or (None, None)
+    return PreviewInfo(width, height, dominant_color(file_path))
+
+
+def image_dimensions(f):
+    """
+    Read (width, height) from the header of a PNG, JPEG, GIF or WebP file
+
+    Preview files are often JPEG data under a .png name, so the format comes
+    from the magic bytes, not the extension.
+
+    Args:
+        f: Binary file object positioned at the start
+
+    Returns:
+        Tuple (width, height), or None if the format is not recognized
+    """
+    header = f.read(HEADER_SIZE)
+    if header.startswith(b'\x89PNG\r\n\x1a\n') and header[12:16] == b'IHDR':
+        return struct.unpack('>II', header[16:24])
+    if header[:6] in (b'GIF87a', b'GIF89a'):
+        return struct.unpack('<HH', header[6:10])
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return _webp_dimensions(header)
+    if header.startswith(b'\xff\xd8'):
+        f.seek(2)
+        return _jpeg_dimensions(f)
+    return None
+
+
+def _webp_dimensions(header):
+    chunk = header[12:16]
+    if chunk == b'VP8X':
+        width = int.from_bytes(header[24:27], 'little') + 1
+        height = int.from_bytes(header[27:30], 'little') + 1
+        return width, height
+    if chunk == b'VP8L' and len(header) >= 25:
+        bits = int.from_bytes(header[21:25], 'little')
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b'VP8 ' and len(header) >= 30:
+        width, height = struct.unpack('<HH', header[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    return None
+
+
+def _jpeg_dimensions(f):
+    """Walk the JPEG segments up to the first start-of-frame marker"""
+    while f.tell() < MAX_JPEG_SCAN:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        code = marker[1]
+        if code == 0xFF:
+            # Fill byte before the marker
+            f.seek(-1, 1)
+            continue
+        if code in (0x01, 0xD8) or 0xD0 <= code <= 0xD7:
+            # Markers without a length field
+            continue
+        length = f.read(2)
+        if len(length) < 2:
+            return None
+        segment_length = struct.unpack('>H', length)[0]
+        if code in _JPEG_SOF_MARKERS:
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack('>HH', frame[1:5])
+            return width, height
+        f.seek(segment_length - 2, 1)
+    return None
+
+
+def dominant_color(file_path):
+    """Average colour of an image as '#rrggbb' (None without Pillow or if it cannot be decoded)"""
+    if Image is None:
+        return None
+    try:
+        with Image.open(file_path) as image:
+            # JPEG: let the decoder scale down by up to 8x instead of decoding full size
+            image.draft('RGB', (COLOR_SAMPLE_SIZE, COLOR_SAMPLE_SIZE))
+            image = image.convert('RGB')
+            image.thumbnail((COLOR_SAMPLE_SIZE, COLOR_SAMPLE_SIZE))
+            red, green, blue = image.resize((1, 1), Image.BOX).getpixel((0, 0))
+    except Exception as e:
+        logger.debug("Cannot compute colour of %s: %s", file_path, e)
+        return None
+    return f"#{red:02x}{green:02x}{blue:02x}"
@@ -0,0 +1,111 @@
+# -*- coding: UTF-8 -*-
+"""
+JSON Codec Module
+Fast JSON decoding/encoding for sidecar reads and API payloads: uses orjson
+or msgspec when installed and falls back to the standard library
+"""
+
+import json
+import locale
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+# Backends in order of preference
+AVAILABLE_BACKENDS = [name for name, module in (('orjson', orjson), ('msgspec', msgspec)) if module is not None] + ['json']
+
+BACKEND = None
+_loads = None
+_dumps = None
+
+
+def use_backend(name):
+    """
+    Select the codec backend
+
+    Args:
+        name: 'orjson', 'msgspec' or 'json' (must be installed)
+    """
+    global BACKEND, _loads, _dumps
+    if name not in AVAILABLE_BACKENDS:
+        raise ValueError(f"JSON backend not available: {name}")
+    if name == 'orjson':
+        _loads, _dumps = orjson.loads, orjson.dumps
+    elif name == 'msgspec':
+        _loads, _dumps = _msgspec_loads, msgspec.json.encode
+    else:
+        _loads, _dumps = json.loads, _stdlib_dumps
+    BACKEND = name
+    logger.debug("Using JSON backend: %s", name)
+
+
+def _msgspec_loads(data):
+    # Raise ValueError like the other backends
+    try:
+        return msgspec.json.decode(data)
+    except msgspec.DecodeError as e:
+        raise ValueError(str(e)) from e
+
+
+def _stdlib_dumps(obj):
+    return json.dumps(obj).encode('utf-8')
+
+
+def loads(data):
+    """Decode JSON from bytes or str"""
+    return _loads(data)
+
+
+def dumps(obj):
+    """
+    Encode obj as compact UTF-8 JSON bytes (API payloads)
+
+    Output is not byte-compatible across backends; use dumps_sidecar() for
+    files users edit by hand. Objects the fast encoder rejects (non-string
+    keys, huge integers) go through the standard library.
+    """
+    try:
+        return _dumps(obj)
+    except TypeError:
+        return _stdlib_dumps(obj)
+
+
+def read_json(file_path):
+    """
+    Load a JSON file
+
+    Files the decoder rejects (e.g. not UTF-8) are decoded again with the
+    locale encoding, as open(file_path, 'r') does, so behaviour matches the
+    old readers (a cp1252 sidecar still loads on a Windows locale).
+    """
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    try:
+        return _loads(data)
+    except ValueError:
+        pass
+    return json.loads(data.decode(locale.getpreferredencoding(False)))
+
+
+def dumps_sidecar(obj, indent=4, sort_keys=False):
+    """
+    Encode obj exactly as json.dumps(obj, indent=indent) would
+
+    Sidecar .json, .civitai.info and config.json files are user-edited and
+    diffed, so they always use the standard library formatting (ASCII
+    escapes, ", "/": " separators) regardless of the backend.
+    """
+    return json.dumps(obj, indent=indent, sort_keys=sort_keys)
+
+
+use_backend(AVAILABLE_BACKENDS[0])
@@ -0,0 +1,16 @@
+# -*- coding: UTF-8 -*-
+"""
+JSON Converter Module
+Importable name for zCivitai-2-JSONv4.py, so the server and the CLI can use
+the converter (and hand its functions to worker processes) with a plain import
+"""
+
+import os
+import sys
+import importlib.util
+
+_spec = importlib.util.spec_from_file_location(
+    __name__, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'zCivitai-2-JSONv4.py'))
+_module = importlib.util.module_from_spec(_spec)
+sys.modules[__name__] = _module
+_spec.loader.exec_module(_module)
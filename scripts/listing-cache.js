@@ -0,0 +1,72 @@
+// listing-cache.js - Last model listing per models directory, kept in IndexedDB
+
+const DB_NAME = 'lora-manager';
+const DB_VERSION = 1;
+const STORE = 'listings';
+// Bumped when the shape of the stored listing changes (2: models carry their version)
+const LISTING_FORMAT = 2;
+
+let dbPromise = null;
+
+// Open the database once; resolves null where IndexedDB is unavailable (private mode, old browser)
+function openDatabase() {
+    if (!dbPromise) {
+        dbPromise = new Promise(resolve => {
+            try {
+                const request = indexedDB.open(DB_NAME, DB_VERSION);
+                request.onupgradeneeded = () => request.result.createObjectStore(STORE);
+                request.onsuccess = () => resolve(request.result);
+                request.onerror = () => {
+                    console.warn('Model listing cache unavailable:', request.error);
+                    resolve(null);
+                };
+            } catch (error) {
+                console.warn('Model listing cache unavailable:', error);
+                resolve(null);
+            }
+        });
+    }
+    return dbPromise;
+}
+
+// Run one request against the store; resolves its result, or null on any failure
+async function withStore(mode, makeRequest) {
+    const db = await openDatabase();
+    if (!db) {
+        return null;
+    }
+    return new Promise(resolve => {
+        try {
+            const request = makeRequest(db.transaction(STORE, mode).objectStore(STORE));
+            request.onsuccess = () => resolve(request.result ?? null);
+            request.onerror = () => {
+                console.warn('Model listing cache error:', request.error);
+                resolve(null);
+            };
+        } catch (error) {
+            console.warn('Model listing cache error:', error);
+            resolve(null);
+        }
+    });
+}
+
+/**
+ * Read the cached listing of a models directory
+ * @param {string} dirPath - Models directory setting (one or more library roots)
+ * @returns {Promise<{etag: string, models: Array}|null>} Cached listing, or null
+ */
+export async function readCachedListing(dirPath) {
+    const listing = await withStore('readonly', store => store.get(dirPath));
+    return listing && listing.format === LISTING_FORMAT ? listing : null;
+}
+
+/**
+ * Store the listing of a models directory, replacing the previous one
+ * @param {string} dirPath - Models directory setting
+ * @param {string} etag - ETag the server sent with the listing
+ * @param {Array} models - Model list
+ * @returns {Promise} Resolves once written (or on failure)
+ */
+export function writeCachedListing(dirPath, etag, models) {
+    return withStore('readwrite', store => store.put({ format: LISTING_FORMAT, etag, models, savedAt: Date.now() }, dirPath));
+}
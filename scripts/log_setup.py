@@ -0,0 +1,90 @@
+# -*- coding: UTF-8 -*-
+"""
+Logging Setup Module
+Configures leveled, per-module loggers that write through a non-blocking
+queue to the console and a rotating log file
+"""
+
+import os
+import atexit
+import queue
+import logging
+import logging.handlers
+
+# Default log location (next to manager.py)
+APP_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_LOG_FILE = os.path.join(APP_DIRECTORY, 'logs', 'lora-manager.log')
+
+# Log format and rotation limits
+LOG_FORMAT = '%(asctime)s [%(levelname)s] %(name)s: %(message)s'
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 3
+
+_listener = None
+
+
+def setup_logging(level='INFO', log_file=DEFAULT_LOG_FILE, console=True):
+    """
+    Route all loggers through a queue to background console/file handlers
+
+    Callers only pay for putting a record on the queue; formatting and I/O
+    happen on the listener thread. Calling again reconfigures the handlers.
+
+    Args:
+        level: Level name or number for the root logger (default INFO)
+        log_file: Path of the rotating log file, or None to disable
+        console: Also write records to stderr if True
+
+    Returns:
+        The configured root logger
+    """
+    global _listener
+
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+        if not isinstance(level, int):
+            level = logging.INFO
+
+    shutdown_logging()
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = []
+
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(formatter)
+        handlers.append(console_handler)
+
+    if log_file:
+        try:
+            os.makedirs(os.path.dirname(log_file), exist_ok=True)
+            file_handler = logging.handlers.RotatingFileHandler(
+                log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8')
+            file_handler.setFormatter(formatter)
+            handlers.append(file_handler)
+        except OSError as e:
+            logging.getLogger(__name__).warning("Could not open log file %s: %s", log_file, e)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return root
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
@@ -2,22 +2,40 @@
 // Handles all model CRUD operations and server interactions
 
 import { showLoadingOverlay, hideLoadingOverlay } from './ui-utils.js';
+import { readCachedListing, writeCachedListing } from './listing-cache.js';
 
 /**
  * Load models from the specified directory
+ *
+ * The last listing is kept in IndexedDB and revalidated with its ETag, so
+ * an unchanged library transfers nothing and a changed one only the
+ * changed models. With onUpdate, a cached listing is returned at once and
+ * onUpdate receives the revalidated list if the server has changes.
  * @param {string} dirPath - Path to models directory
  * @param {HTMLElement} modelsContainer - Container element for displaying models
+ * @param {Function} [onUpdate] - Called with the new model array when a cached listing was returned and has changed
  * @returns {Promise<Array>} Array of model objects
  */
-export async function loadModelsFromDirectory(dirPath, modelsContainer) {
+export async function loadModelsFromDirectory(dirPath, modelsContainer, onUpdate) {
+    const cached = await readCachedListing(dirPath);
+    if (cached && onUpdate) {
+        // Show the cached listing now, and the server's changes once they arrive
+        revalidateListing(dirPath, cached)
+            .then(models => {
+                if (models) {
+                    onUpdate(models);
+                }
+            })
+            .catch(error => console.error('Error revalidating Lora data:', error));
+        hideLoadingOverlay();
+        return cached.models;
+    }
+
+    // While the server is still building its index (e.g. right after startup), show scan progress
+    const stopProgress = watchIndexProgress(modelsContainer);
     try {
-        const response = await fetch('/load-loras?path=' + encodeURIComponent(dirPath));
-        if (!response.ok) {
-            const errorText = await response.text();
-            throw new Error(errorText || `HTTP error! status: ${response.status}`);
-        }
-        const models = await response.json();
-        return models;
+        const models = await revalidateListing(dirPath, cached);
+        return models || cached.models;
     } catch (error) {
         console.error('Error loading Lora data:', error);
         if (modelsContainer) {
@@ -29,10 +47,107 @@ export async function loadModelsFromDirectory(dirPath, modelsContainer) {
         }
         throw error;
     } finally {
+        stopProgress();
         hideLoadingOverlay();
     }
 }
 
+/**
+ * Fetch the listing, conditionally on the cached one, and update the cache
+ * @param {string} dirPath - Path to models directory
+ * @param {Object|null} cached - Cached listing {etag, models}, or null
+ * @returns {Promise<Array|null>} New model array, or null if the cached listing is current
+ */
+async function revalidateListing(dirPath, cached) {
+    const headers = cached ? { 'If-None-Match': cached.etag } : {};
+    // The cache here replaces the browser's HTTP cache for this response
+    const response = await fetch('/load-loras?delta=true&path=' + encodeURIComponent(dirPath), { headers, cache: 'no-store' });
+    if (response.status === 304) {
+        return null;
+    }
+    if (!response.ok) {
+        const errorText = await response.text();
+        throw new Error(errorText || `HTTP error! status: ${response.status}`);
+    }
+
+    const data = await response.json();
+    let models;
+    if (data.models) {
+        models = data.models;
+    } else {
+        // Delta against the cached listing: replace changed models, add new ones, drop removed ones
+        const removed = new Set(data.removed);
+        const changed = new Map(data.changed.map(model => [model.id, model]));
+        models = cached.models
+            .filter(model => !removed.has(model.id))
+            .map(model => {
+                const update = changed.get(model.id);
+                changed.delete(model.id);
+                return update || model;
+            });
+        models.push(...changed.values());
+    }
+    await writeCachedListing(dirPath, data.etag, models);
+    return models;
+}
+
+// Delay between /index-status polls while models are loading (ms)
+const INDEX_STATUS_INTERVAL = 500;
+
+/**
+ * Poll the server's index status and show scan progress in the container
+ * @param {HTMLElement} modelsContainer - Container element for the progress message
+ * @returns {Function} Call to stop polling
+ */
+function watchIndexProgress(modelsContainer) {
+    let stopped = false;
+    let timer = null;
+
+    const poll = async () => {
+        try {
+            const response = await fetch('/index-status');
+            const status = response.ok ? await response.json() : null;
+            if (!stopped && status && !status.ready && modelsContainer) {
+                const modelCount = status.roots.reduce((sum, root) => sum + root.models, 0);
+                const folderCount = status.roots.reduce((sum, root) => sum + root.directories, 0);
+                modelsContainer.innerHTML = `
+                    <div class="placeholder-message">
+                        <p>Scanning library... ${modelCount} models in ${folderCount} folders so far</p>
+                    </div>
+                `;
+            }
+        } catch (error) {
+            // Progress is informational only
+        }
+        if (!stopped) {
+            timer = setTimeout(poll, INDEX_STATUS_INTERVAL);
+        }
+    };
+
+    // A warm index answers before the first poll
+    timer = setTimeout(poll, INDEX_STATUS_INTERVAL);
+    return () => {
+        stopped = true;
+        clearTimeout(timer);
+    };
+}
+
+/**
+ * Load filter values with model counts from the server index
+ * @param {Array<string>} facets - Facet names (baseModel, category, creator, tags)
+ * @param {boolean} hideNSFW - Leave NSFW models out of the counts
+ * @returns {Promise<Object>} Facet name -> array of {value, count}, most common first
+ */
+export async function loadFacets(facets, hideNSFW) {
+    const params = new URLSearchParams({ facets: facets.join(','), hideNSFW: hideNSFW ? 'true' : 'false' });
+    const response = await fetch('/facets?' + params);
+    if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    const data = await response.json();
+    return data.facets;
+}
+
 /**
  * Refresh models from directory
  * @param {Object} settingsManager - Settings manager instance
@@ -75,6 +190,7 @@ export async function saveFilename(currentModel, newName, refreshCallback) {
                 'Content-Type': 'application/json'
             },
             body: JSON.stringify({
+                id: currentModel.id,
                 oldName: oldName,
                 newName: newName.trim()
             })
@@ -83,10 +199,14 @@ export async function saveFilename(currentModel, newName, refreshCallback) {
         if (!response.ok) {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
+        const result = await response.json();
 
-        // Update model object
+        // Update model object (the id follows the new name)
         currentModel.name = newName.trim();
         currentModel.filename = newName.trim() + '.safetensors';
+        if (result.id) {
+            currentModel.id = result.id;
+        }
 
         // Refresh the model list
         if (refreshCallback) {
@@ -100,6 +220,175 @@ export async function saveFilename(currentModel, newName, refreshCallback) {
     }
 }
 
+/**
+ * Fields of a sidecar object that differ between two versions of it
+ * @param {Object} before - Fields before the edit
+ * @param {Object} after - Fields after the edit
+ * @returns {Object} Changed fields with their new values (null for removed fields)
+ */
+export function jsonChanges(before, after) {
+    const changes = {};
+    Object.keys(after).forEach(key => {
+        if (JSON.stringify(before[key]) !== JSON.stringify(after[key])) {
+            changes[key] = after[key];
+        }
+    });
+    Object.keys(before).forEach(key => {
+        if (!(key in after)) {
+            changes[key] = null;
+        }
+    });
+    return changes;
+}
+
+/**
+ * Save changed sidecar fields of a model with PATCH /model/<id>
+ *
+ * Only the changed fields are sent; the server merges them into the .json
+ * file. The model's version is sent as If-Match, so an edit made from
+ * another tab or window in the meantime is not overwritten.
+ * @param {Object} model - Model being edited (its json and version are updated)
+ * @param {Object} fields - Field -> new value (null removes the field)
+ * @returns {Promise<Object>} The model
+ */
+export async function patchModel(model, fields) {
+    if (Object.keys(fields).length === 0) {
+        return model;
+    }
+
+    const headers = { 'Content-Type': 'application/json' };
+    if (model.version) {
+        headers['If-Match'] = `"${model.version}"`;
+    }
+    const response = await fetch(`/model/${encodeURIComponent(model.id)}`, {
+        method: 'PATCH',
+        headers,
+        body: JSON.stringify({ json: fields })
+    });
+
+    if (response.status === 412) {
+        throw new Error('This model was changed in another tab or window. Refresh to load the latest version, then edit again.');
+    }
+    if (!response.ok) {
+        const errorText = await response.text();
+        throw new Error(errorText || `HTTP error! status: ${response.status}`);
+    }
+
+    const result = await response.json();
+    model.version = result.version;
+    model.json = model.json || {};
+    Object.entries(fields).forEach(([key, value]) => {
+        if (value === null) {
+            delete model.json[key];
+        } else {
+            model.json[key] = value;
+        }
+    });
+    return model;
+}
+
+/**
+ * Apply one operation to the sidecars of many models with POST /batch-update
+ *
+ * The models' versions are sent along, so a model edited elsewhere since it
+ * was loaded is skipped (status "conflict") instead of overwritten.
+ * @param {Array} models - Models to edit
+ * @param {Object} operation - {op: 'set'|'append'|'remove'|'replace', field, value} or {op: 'replace', field, pattern, replacement, ignoreCase}
+ * @returns {Promise<Object>} Report: {total, updated, unchanged, conflict, not_found, error, results: [{id, status, version?, error?}]}
+ */
+export async function batchUpdateModels(models, operation) {
+    const versions = {};
+    models.forEach(model => {
+        if (model.version) {
+            versions[model.id] = model.version;
+        }
+    });
+    const response = await fetch('/batch-update', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ ids: models.map(model => model.id), versions, operation })
+    });
+    if (!response.ok) {
+        const errorText = await response.text();
+        throw new Error(errorText || `HTTP error! status: ${response.status}`);
+    }
+    return response.json();
+}
+
+// Delay between /batch-move-status polls while a batch move runs (ms)
+const MOVE_STATUS_INTERVAL = 500;
+
+/**
+ * Move and/or rename many models with POST /batch-move
+ * @param {Array} models - Models to move
+ * @param {Object} target - {targetFolder, targetRoot} to move into, and/or {rename: {pattern, replacement, ignoreCase}}
+ * @param {Function} [onProgress] - Called with {models, done, bytes, copied} while the move runs
+ * @returns {Promise<Object>} Report: {total, moved, unchanged, conflict, invalid, not_found, error, results: [{id, status, newId?, error?}]}
+ */
+export async function batchMoveModels(models, target, onProgress) {
+    const job = `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+    let timer = null;
+    if (onProgress) {
+        timer = setInterval(async () => {
+            try {
+                const response = await fetch(`/batch-move-status?job=${job}`);
+                if (response.ok) {
+                    onProgress(await response.json());
+                }
+            } catch (error) {
+                // Progress is informational; the move itself reports errors
+            }
+        }, MOVE_STATUS_INTERVAL);
+    }
+    try {
+        const response = await fetch('/batch-move', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ ids: models.map(model => model.id), job, ...target })
+        });
+        if (!response.ok) {
+            const errorText = await response.text();
+            throw new Error(errorText || `HTTP error! status: ${response.status}`);
+        }
+        return response.json();
+    } finally {
+        clearInterval(timer);
+    }
+}
+
+/**
+ * Fetch the duplicate report (GET /duplicates)
+ * @param {boolean} [refresh] - Search again even if the library is unchanged
+ * @returns {Promise<Object>} {state: 'running', progress} while the server searches, then {state: 'done', progress, groups, reclaimable}
+ */
+export async function loadDuplicates(refresh = false) {
+    const response = await fetch('/duplicates' + (refresh ? '?refresh=true' : ''));
+    if (!response.ok) {
+        const errorText = await response.text();
+        throw new Error(errorText || `HTTP error! status: ${response.status}`);
+    }
+    return response.json();
+}
+
+/**
+ * Merge duplicates into the copies kept (POST /duplicates/resolve)
+ * @param {string} action - 'delete', 'hardlink' or 'quarantine'
+ * @param {Array} merges - [{keep: id, remove: [ids]}]
+ * @returns {Promise<Object>} {action, freed, counts, results: [{id, status, bytes?, error?}]}
+ */
+export async function resolveDuplicates(action, merges) {
+    const response = await fetch('/duplicates/resolve', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ action, merges })
+    });
+    if (!response.ok) {
+        const errorText = await response.text();
+        throw new Error(errorText || `HTTP error! status: ${response.status}`);
+    }
+    return response.json();
+}
+
 /**
  * Save JSON metadata for model
  * @param {Object} currentModel - Current model object
@@ -120,7 +409,9 @@ export async function saveJsonMetadata(currentModel, jsonContent, jsonType = 'mo
         }
 
         const endpoint = jsonType === 'model' ? '/save-json' : '/save-civitai';
-        const response = await fetch(`${endpoint}?name=${encodeURIComponent(currentModel.name)}`, {
+        // The id picks the right model when several roots hold the same name
+        const params = new URLSearchParams({ name: currentModel.name, id: currentModel.id || '' });
+        const response = await fetch(`${endpoint}?${params}`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -162,7 +453,10 @@ export async function refreshModelData(currentModel, models, updateCallback) {
         const updatedModels = await response.json();
 
         // Find the current model in the updated data
-        const updatedModel = updatedModels.find(model => model.name === currentModel.name);
+        // Names can repeat across roots; ids cannot
+        const updatedModel = currentModel.id
+            ? updatedModels.find(model => model.id === currentModel.id)
+            : updatedModels.find(model => model.name === currentModel.name);
 
         if (updatedModel) {
             // Call the update callback to refresh UI
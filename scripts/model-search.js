@@ -0,0 +1,120 @@
+// model-search.js - Model search in a Web Worker, so typing does not block the page
+
+import { SearchIndex } from './search-index.js';
+import { searchFields } from './search-parser.js';
+
+let worker = null;
+// Used instead of the worker when it cannot be started (e.g. no module worker support)
+const localIndex = new SearchIndex();
+
+let indexedModels = null; // Model list the index was built from
+let latestRequest = 0;
+const pending = new Map(); // request id -> {query, resolve}
+let lastResult = null; // {models, query, matches} of the latest completed search
+
+try {
+    worker = new Worker(new URL('./search-worker.js', import.meta.url), { type: 'module' });
+    worker.onmessage = ({ data }) => {
+        const request = pending.get(data.id);
+        pending.delete(data.id);
+        request?.resolve(data.matches);
+    };
+    worker.onerror = (event) => {
+        event.preventDefault();
+        fallBackToMainThread(event.message || event);
+    };
+} catch (error) {
+    fallBackToMainThread(error);
+}
+
+function fallBackToMainThread(error) {
+    console.warn('Search worker unavailable, searching on the main thread:', error);
+    if (worker) {
+        worker.terminate();
+        worker = null;
+    }
+    if (indexedModels) {
+        localIndex.setModels(indexedModels.map(searchFields));
+    }
+    // Answer the searches the worker never will
+    pending.forEach(request => request.resolve(localIndex.search(request.query)));
+    pending.clear();
+}
+
+// (Re)build the index when the model list was replaced
+function ensureIndexed(models) {
+    if (models === indexedModels) {
+        return;
+    }
+    indexedModels = models;
+    lastResult = null;
+    const fields = models.map(searchFields);
+    if (worker) {
+        worker.postMessage({ type: 'models', fields });
+    } else {
+        localIndex.setModels(fields);
+    }
+}
+
+/**
+ * Search a model list
+ *
+ * The list is indexed on first use (again whenever a different array is
+ * passed), so later searches only send the query to the worker.
+ * @param {Array} models - Full model list
+ * @param {string} query - Search query (see search-parser.js)
+ * @returns {Promise<Set|null>} Matching models, or null if a newer search was started meanwhile
+ */
+export async function searchModels(models, query) {
+    ensureIndexed(models);
+    const id = ++latestRequest;
+    const matches = await new Promise(resolve => {
+        if (worker) {
+            pending.set(id, { query, resolve });
+            worker.postMessage({ type: 'search', id, query });
+        } else {
+            resolve(localIndex.search(query));
+        }
+    });
+
+    // Superseded by a newer search, or the list changed underneath
+    if (id !== latestRequest || models !== indexedModels) {
+        return null;
+    }
+    const result = new Set(Array.from(matches, index => models[index]));
+    lastResult = { models, query, matches: result };
+    return result;
+}
+
+/**
+ * Result of the latest search, if it was for this list and query
+ * @param {Array} models - Full model list
+ * @param {string} query - Search query
+ * @returns {Set|undefined} Matching models, or undefined if it has to be searched
+ */
+export function cachedSearchResult(models, query) {
+    if (lastResult && lastResult.models === models && lastResult.query === query) {
+        return lastResult.matches;
+    }
+    return undefined;
+}
+
+/**
+ * Re-index one model after its metadata was edited in place
+ * @param {Object} model - Model from the indexed list
+ */
+export function updateSearchModel(model) {
+    const index = indexedModels ? indexedModels.indexOf(model) : -1;
+    if (index === -1) {
+        return;
+    }
+    // Results computed before the edit may be wrong for this model
+    lastResult = null;
+    latestRequest++;
+    const fields = searchFields(model);
+    if (worker) {
+        worker.postMessage({ type: 'update', index, fields });
+    } else {
+        localIndex.updateModel(index, fields);
+    }
+}
@@ -0,0 +1,811 @@
+# -*- coding: UTF-8 -*-
+"""
+Model Index Module
+Scans the model library roots into the listing served by /load-loras and
+keeps one process-wide copy of it between requests, sharded per root
+"""
+
+import os
+import re
+import sys
+import copy
+import time
+import logging
+import functools
+import threading
+from collections import deque, namedtuple
+
+import json_codec
+from facet_index import FacetIndex
+from image_info import preview_info
+from folder_tree import FolderTree
+from model_listing import ShardListing
+from search_index import SearchIndex
+
+logger = logging.getLogger(__name__)
+
+# URL prefix under which files inside a library root are served
+ROOT_URL_PREFIX = '/roots/'
+
+# Directories listed in parallel per root unless configured otherwise (scanConcurrency)
+DEFAULT_SCAN_CONCURRENCY = 8
+
+# Shown when a model has no preview image
+PLACEHOLDER_PREVIEW_URL = '/assets/placeholder.png'
+
+# Preview image suffixes: model.preview.png, model.preview2.png, ...
+PREVIEW_SUFFIXES = ["", "2", "3", "4"]
+
+# Raw .civitai.info documents kept in memory by load_civitai_info()
+CIVITAI_INFO_CACHE_SIZE = 256
+
+# Sidecar .json fields with few distinct values, interned to share one copy
+INTERNED_JSON_FIELDS = (
+    'base model', 'category', 'subcategory', 'folder', 'sd version',
+    'nsfw', 'creator', 'high low', 'model version', 'preferred weight'
+)
+
+# A configured library root: short URL-safe id plus its filesystem path
+LibraryRoot = namedtuple('LibraryRoot', ['id', 'path'])
+
+
+def library_roots(models_directory):
+    """
+    Normalize the modelsDirectory setting into a list of library roots
+
+    Args:
+        models_directory: A path string, or a list of path strings and/or
+            {"path": ..., "name": ...} dicts
+
+    Returns:
+        List of LibraryRoot with unique ids, in configured order
+    """
+    if not models_directory:
+        return []
+    entries = models_directory if isinstance(models_directory, list) else [models_directory]
+
+    roots = []
+    used_ids = set()
+    for entry in entries:
+        if isinstance(entry, dict):
+            path, name = entry.get('path', ''), entry.get('name', '')
+        else:
+            path, name = entry, ''
+        if not path:
+            continue
+        base_id = re.sub(r'[^A-Za-z0-9_-]+', '-', name or os.path.basename(os.path.normpath(path))).strip('-') or 'root'
+        root_id, n = base_id, 2
+        while root_id in used_ids:
+            root_id, n = f"{base_id}-{n}", n + 1
+        used_ids.add(root_id)
+        roots.append(LibraryRoot(root_id, path))
+    return roots
+
+
+def find_root(roots, root_id):
+    """Return the root with the given id, or None"""
+    for root in roots:
+        if root.id == root_id:
+            return root
+    return None
+
+
+def root_for_path(roots, file_path):
+    """Return the root containing file_path, or None"""
+    file_path = os.path.normcase(os.path.abspath(file_path))
+    for root in roots:
+        root_path = os.path.normcase(os.path.abspath(root.path))
+        if file_path == root_path or file_path.startswith(root_path.rstrip(os.sep) + os.sep):
+            return root
+    return None
+
+
+class ShardRecords(list):
+    """The ModelRecords of one library root, plus every folder path the scan found (models or not)"""
+
+    __slots__ = ('directories', '_by_id')
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.directories = ()
+        self._by_id = None
+
+    def find(self, model_id):
+        """Return the record with the given id, or None (shards are not modified once built)"""
+        if self._by_id is None:
+            self._by_id = {record.id: record for record in self}
+        return self._by_id.get(model_id)
+
+
+class ScanProgress:
+    """Live counters of one shard scan, safe to read while the scan runs"""
+
+    __slots__ = ('directories', 'models', 'started', 'finished', '_lock')
+
+    def __init__(self):
+        self.directories = 0
+        self.models = 0
+        self.started = time.time()
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def add(self, directories, models):
+        with self._lock:
+            self.directories += directories
+            self.models += models
+
+    def finish(self):
+        self.finished = time.time()
+
+    def to_dict(self):
+        return {
+            'directories': self.directories,
+            'models': self.models,
+            'seconds': round((self.finished or time.time()) - self.started, 2)
+        }
+
+
+def scan_library(library_root, concurrency=DEFAULT_SCAN_CONCURRENCY, progress=None):
+    """
+    Scan one library root and build one record per .safetensors file
+
+    Directory listings and sidecar reads are spread over a pool of worker
+    threads (see DirectoryWorkQueue), which keeps many requests in flight on
+    high-latency network shares. Sidecar existence is answered from the
+    directory listing instead of per-file stat calls.
+
+    Args:
+        library_root: LibraryRoot to scan
+        concurrency: Maximum number of directories processed at once
+        progress: Optional ScanProgress updated as directories are done
+
+    Returns:
+        ShardRecords of ModelRecord, ordered by folder (depth-first, sorted
+        by name) and then by filename
+    """
+    lora_path = library_root.path
+    if not lora_path or not os.path.isdir(lora_path):
+        logger.warning("Skipping missing models directory: %s", lora_path)
+        return ShardRecords()
+
+    results = {}
+    linked_directories = []
+
+    def process_directory(item):
+        directory, relative_dir = item
+        try:
+            with os.scandir(directory) as entries:
+                entries = list(entries)
+        except OSError as e:
+            logger.warning("Error listing directory: %s - %s", directory, e)
+            return []
+
+        subdirectories = []
+        files = []
+        for entry in entries:
+            try:
+                if entry.is_dir():
+                    # Like os.walk, list symlinked folders but do not descend into them
+                    child_dir = f"{relative_dir}/{entry.name}" if relative_dir else entry.name
+                    if entry.is_symlink():
+                        linked_directories.append(child_dir)
+                    else:
+                        subdirectories.append((entry.path, child_dir))
+                elif entry.is_file():
+                    files.append(entry)
+            except OSError:
+                continue
+
+        results[relative_dir] = _build_directory_records(library_root, directory, relative_dir, files)
+        if progress is not None:
+            progress.add(1, len(results[relative_dir]))
+        return subdirectories
+
+    DirectoryWorkQueue(max(1, int(concurrency))).run(process_directory, [(lora_path, '')])
+
+    records = ShardRecords()
+    for relative_dir in sorted(results, key=lambda d: d.split('/') if d else []):
+        records.extend(results[relative_dir])
+    records.directories = tuple(sorted((set(results) | set(linked_directories)) - {''}, key=lambda d: d.split('/')))
+    return records
+
+
+def _read_sidecar(file_path, description):
+    """Load a JSON sidecar, returning None (and logging) if it cannot be read"""
+    try:
+        return json_codec.read_json(file_path)
+    except Exception as e:
+        logger.warning("Error reading %s: %s - %s", description, file_path, e)
+        return None
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _compact_json(json_data):
+    """Intern the keys and enumeration-like values of a sidecar .json dict"""
+    compact = {}
+    for key, value in json_data.items():
+        key = _intern(key)
+        compact[key] = _intern(value) if key in INTERNED_JSON_FIELDS else value
+    return compact
+
+
+def _civitai_summary(civitai_data):
+    """The civitai.info fields shown in the listing: (model name, creator, url)"""
+    if not isinstance(civitai_data, dict) or not civitai_data:
+        return None
+    model = civitai_data.get("model")
+    creator = civitai_data.get("creator")
+    return (
+        model.get("name") if isinstance(model, dict) else None,
+        creator.get("username") if isinstance(creator, dict) else None,
+        civitai_data.get("url")
+    )
+
+
+def _build_directory_records(library_root, directory, relative_dir, file_entries):
+    """Build the model records for the .safetensors files of one directory"""
+    records = []
+    files = sorted(entry.name for entry in file_entries)
+    if not any(file.endswith(".safetensors") for file in files):
+        return records
+
+    # Case-insensitive lookup of sibling files, as the filesystem would resolve them on Windows
+    names_lower = {}
+    for file in files:
+        names_lower.setdefault(file.lower(), file)
+    stats = {entry.name: entry for entry in file_entries}
+
+    # Shared by every record in this directory
+    directory = sys.intern(directory)
+    relative_dir = sys.intern(relative_dir)
+    folder_name = sys.intern(os.path.basename(directory))
+    id_prefix = f"{library_root.id}/{relative_dir + '/' if relative_dir else ''}"
+
+    for file in files:
+        if not file.endswith(".safetensors"):
+            continue
+        model_name = file.replace(".safetensors", "")
+        json_name = names_lower.get(f"{model_name}.json".lower())
+        civitai_name = names_lower.get(f"{model_name}.civitai.info".lower())
+
+        # Detect multiple preview images (preview.png, preview2.png, preview3.png, preview4.png)
+        preview_names = tuple(
+            names_lower[f"{model_name}.preview{suffix}.png".lower()]
+            for suffix in PREVIEW_SUFFIXES
+            if f"{model_name}.preview{suffix}.png".lower() in names_lower
+        )
+
+        # Each sidecar is read once; only a summary of civitai.info is kept
+        json_data = _read_sidecar(os.path.join(directory, json_name), "JSON") if json_name else None
+        civitai_data = _read_sidecar(os.path.join(directory, civitai_name), "civitaiInfo") if civitai_name else None
+
+        # Base model from JSON if present, otherwise from civitai.info
+        # (check for both 'baseModel' and 'base model' in either file)
+        base_model = "Unknown"
+        for source in (json_data, civitai_data):
+            if isinstance(source, dict):
+                if "baseModel" in source:
+                    base_model = source["baseModel"]
+                elif "base model" in source:
+                    base_model = source["base model"]
+            if base_model != "Unknown":
+                break
+
+        # Use category from JSON if it exists, otherwise the folder name
+        category = folder_name
+        if isinstance(json_data, dict) and "category" in json_data:
+            category = json_data["category"]
+
+        # Placeholder data (dimensions, colour) of the main preview, cached by its mtime
+        main_preview = None
+        if preview_names:
+            main_preview = preview_info(os.path.join(directory, preview_names[0]), stats[preview_names[0]].stat())
+
+        model_stat = stats[file].stat()
+        records.append(ModelRecord(
+            id=id_prefix + model_name,
+            name=model_name,
+            filename=file,
+            directory=directory,
+            relative_dir=relative_dir,
+            root_id=library_root.id,
+            preview_names=preview_names,
+            preview_info=main_preview,
+            size=model_stat.st_size,
+            date_modified=model_stat.st_mtime,
+            category=_intern(category),
+            base_model=_intern(base_model),
+            # Find all associated files with the same base name
+            associated_files=tuple(f for f in files if f.startswith(model_name + ".")),
+            json=_compact_json(json_data) if isinstance(json_data, dict) else (json_data if json_data is not None else {}),
+            civitai_file=civitai_name,
+            civitai_summary=_civitai_summary(civitai_data)
+        ))
+    return records
+
+
+def build_model_record(library_root, directory, relative_dir, filename):
+    """
+    Build the ModelRecord of one model from its files on disk (e.g. after an edit)
+
+    Args:
+        library_root: LibraryRoot containing the model
+        directory: Folder of the model
+        relative_dir: Folder path relative to the root ('' for the root itself)
+        filename: Model file name (.safetensors)
+
+    Returns:
+        ModelRecord, or None if the model file is gone
+    """
+    model_name = filename.replace(".safetensors", "")
+    prefix = model_name.lower() + "."
+    with os.scandir(directory) as entries:
+        file_entries = [entry for entry in entries if entry.name.lower().startswith(prefix) and entry.is_file()]
+    model_id = f"{library_root.id}/{relative_dir + '/' if relative_dir else ''}{model_name}"
+    records = _build_directory_records(library_root, directory, relative_dir, file_entries)
+    return next((record for record in records if record.id == model_id), None)
+
+
+def load_civitai_info(file_path):
+    """
+    Return the raw .civitai.info document for file_path
+
+    Documents are cached in an LRU of CIVITAI_INFO_CACHE_SIZE entries keyed
+    on path and mtime, so edits are picked up. Each call returns its own
+    copy, so callers may change it without affecting the cached document.
+    """
+    try:
+        mtime_ns = os.stat(file_path).st_mtime_ns
+    except OSError:
+        return {}
+    return copy.deepcopy(_load_civitai_info(file_path, mtime_ns))
+
+
+@functools.lru_cache(maxsize=CIVITAI_INFO_CACHE_SIZE)
+def _load_civitai_info(file_path, mtime_ns):
+    civitai_data = _read_sidecar(file_path, "civitaiInfo")
+    if civitai_data is None:
+        return {}
+    # Extract URL from civitai.info and add it as modelUrl
+    if isinstance(civitai_data, dict) and "url" in civitai_data:
+        civitai_data["modelUrl"] = civitai_data["url"]
+    return civitai_data
+
+
+class ModelRecord:
+    """
+    Compact in-memory form of one model in the index
+
+    Strings repeated across the library (directories, root ids, categories,
+    base models, sidecar keys and enumeration values) are interned, so each
+    record only holds references to one shared copy. The raw civitai.info
+    document is not kept: the listing gets the few fields the UI shows and
+    the full document is read on demand through load_civitai_info().
+
+    Memory is roughly 1 KB per model plus its decoded .json sidecar (about
+    4 KB per model in total for converted Civitai metadata, against ~28 KB
+    when the raw documents were kept), and the civitai.info LRU adds at
+    most CIVITAI_INFO_CACHE_SIZE documents (typically 20-50 KB each).
+    """
+
+    __slots__ = (
+        'id', 'name', 'filename', 'directory', 'relative_dir', 'root_id',
+        'preview_names', 'preview_info', 'size', 'date_modified', 'category', 'base_model',
+        'associated_files', 'json', 'civitai_file', 'civitai_summary'
+    )
+
+    def __init__(self, **fields):
+        for slot in self.__slots__:
+            setattr(self, slot, fields[slot])
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, self.filename)
+
+    @property
+    def civitai_info_path(self):
+        """Path of the .civitai.info sidecar, or None"""
+        return os.path.join(self.directory, self.civitai_file) if self.civitai_file else None
+
+    def civitai_info(self):
+        """The full civitai.info document (loaded lazily, {} if none)"""
+        return load_civitai_info(self.civitai_info_path) if self.civitai_file else {}
+
+    def to_dict(self):
+        """The model as served by /load-loras"""
+        url_prefix = f"{ROOT_URL_PREFIX}{self.root_id}/{self.relative_dir + '/' if self.relative_dir else ''}"
+        preview_images = [url_prefix + preview_name for preview_name in self.preview_names]
+
+        civitai_info = {}
+        if self.civitai_summary:
+            model_name, creator, url = self.civitai_summary
+            if model_name is not None:
+                civitai_info["model"] = {"name": model_name}
+            if creator is not None:
+                civitai_info["creator"] = {"username": creator}
+            if url is not None:
+                civitai_info["url"] = url
+                civitai_info["modelUrl"] = url
+
+        return {
+            "id": self.id,
+            "name": self.name,
+            "filename": self.filename,
+            "path": self.path,
+            "previewUrl": preview_images[0] if preview_images else PLACEHOLDER_PREVIEW_URL,
+            "previewImages": preview_images,
+            # Placeholder until the preview loads: its pixel size and average colour (None if unknown)
+            "previewWidth": self.preview_info.width if self.preview_info else None,
+            "previewHeight": self.preview_info.height if self.preview_info else None,
+            "previewColor": self.preview_info.color if self.preview_info else None,
+            "size": self.size,
+            "dateModified": self.date_modified,
+            "category": self.category,
+            "baseModel": self.base_model,
+            "associatedFiles": list(self.associated_files),
+            "rootId": self.root_id,
+            "relativeDir": self.relative_dir,
+            "json": self.json,
+            "civitaiInfo": civitai_info
+        }
+
+
+class DirectoryWorkQueue:
+    """
+    Work-stealing queue of directories for a fixed pool of scanner threads
+
+    Each worker pushes the subdirectories it discovers onto its own deque and
+    pops from the newest end (depth-first, good cache locality on the file
+    server); an idle worker steals the oldest entry from another worker, which
+    tends to be a large untouched subtree.
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._deques = [deque() for _ in range(workers)]
+        self._condition = threading.Condition()
+        self._pending = 0
+
+    def run(self, process, initial_items):
+        """
+        Process items until no work remains
+
+        Args:
+            process: Callable taking one item and returning a list of new items
+            initial_items: Items to seed the queue with
+        """
+        for item in initial_items:
+            self._push(0, item)
+        if self.workers == 1:
+            self._work(0, process)
+            return
+        threads = [
+            threading.Thread(target=self._work, args=(worker, process), name=f"scan-worker-{worker}", daemon=True)
+            for worker in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def _push(self, worker, item):
+        with self._condition:
+            self._deques[worker].append(item)
+            self._pending += 1
+            self._condition.notify()
+
+    def _pop(self, worker):
+        with self._condition:
+            while True:
+                if self._deques[worker]:
+                    return self._deques[worker].pop()
+                for offset in range(1, self.workers):
+                    victim = self._deques[(worker + offset) % self.workers]
+                    if victim:
+                        return victim.popleft()
+                if self._pending == 0:
+                    return None
+                self._condition.wait()
+
+    def _done(self):
+        with self._condition:
+            self._pending -= 1
+            if self._pending == 0:
+                self._condition.notify_all()
+
+    def _work(self, worker, process):
+        while True:
+            item = self._pop(worker)
+            if item is None:
+                return
+            try:
+                for new_item in process(item):
+                    self._push(worker, new_item)
+            except Exception as e:
+                logger.error("Error scanning %s: %s", item, e)
+            finally:
+                self._done()
+
+
+class ShardScan:
+    """One in-flight scan of a library root, shared by every caller waiting for it"""
+
+    __slots__ = ('generation', 'progress', 'done')
+
+    def __init__(self, generation):
+        # Invalidation generation of the root when the scan started
+        self.generation = generation
+        self.progress = ScanProgress()
+        self.done = threading.Event()
+
+
+class ModelIndex:
+    """
+    Process-wide cache of the model listing, one shard per library root
+
+    Each shard is built on its own thread, so a slow network mount does not
+    hold up the scan of the others, and can be invalidated on its own.
+    Shards are reused until invalidated or the configured roots change.
+
+    Scans are single-flight: a root is only ever scanned by one thread, and
+    callers needing it join that scan. invalidate() bumps the root's
+    generation; a scan that started before the bump is still finished and
+    swapped in, and the invalidations it missed are covered by one
+    follow-up scan when the root is next needed, however many arrived.
+    """
+
+    def __init__(self, scanner=scan_library):
+        self._scanner = scanner
+        # Guards the shard state below; never held while scanning
+        self._lock = threading.Lock()
+        self._shards = {}
+        self._shard_generations = {}
+        self._generations = {}
+        self._scans = {}
+        # Latest scan of each root, readable without the lock
+        self._progress = {}
+        # Indexes derived from the shards, per index class: root -> index
+        self._derived = {SearchIndex: {}, FacetIndex: {}, FolderTree: {}, ShardListing: {}}
+        self._derived_locks = {factory: threading.Lock() for factory in self._derived}
+
+    def get(self, roots, refresh=False):
+        """
+        Return the merged listing for roots as served by /load-loras
+
+        Args:
+            roots: List of LibraryRoot, in display order
+            refresh: Force a rescan of every shard if True
+
+        Returns:
+            List of model dicts
+        """
+        return [record.to_dict() for record in self.records(roots, refresh)]
+
+    def find(self, roots, model_id):
+        """Return the ModelRecord with the given id, or None"""
+        shards = self._ensure_shards(roots)
+        for root in roots:
+            record = shards[root].find(model_id)
+            if record is not None:
+                return record
+        return None
+
+    def records(self, roots, refresh=False):
+        """
+        Return the merged ModelRecords for roots, scanning only stale shards
+
+        Args:
+            roots: List of LibraryRoot, in display order
+            refresh: Rescan every shard if True (joining scans already running)
+
+        Returns:
+            List of ModelRecord
+        """
+        shards = self._ensure_shards(roots, refresh)
+        records = []
+        for root in roots:
+            records.extend(shards[root])
+        logger.debug("Listing %d items", len(records))
+        return records
+
+    def search_indexes(self, roots):
+        """
+        Return one SearchIndex per root, in display order
+
+        An index is built on first use and, once a root has been searched,
+        rebuilt in the background whenever its shard is rescanned.
+        """
+        return self._derived_indexes(SearchIndex, roots)
+
+    def facet_indexes(self, roots):
+        """Return one FacetIndex per root, in display order (maintained like search_indexes)"""
+        return self._derived_indexes(FacetIndex, roots)
+
+    def folder_trees(self, roots):
+        """Return one FolderTree per root, in display order (maintained like search_indexes)"""
+        return self._derived_indexes(FolderTree, roots)
+
+    def listings(self, roots, refresh=False):
+        """Return one ShardListing (model versions) per root, in display order (maintained like search_indexes)"""
+        return self._derived_indexes(ShardListing, roots, refresh)
+
+    def _derived_indexes(self, factory, roots, refresh=False):
+        shards = self._ensure_shards(roots, refresh)
+        cache = self._derived[factory]
+        with self._derived_locks[factory]:
+            # Forget indexes of roots that are no longer configured
+            for root in [root for root in cache if root not in roots]:
+                del cache[root]
+        return [self._derived_index(factory, root, shards[root]) for root in roots]
+
+    def _derived_index(self, factory, root, shard):
+        """Return the factory-built index of a shard, building it if it is out of date"""
+        cache = self._derived[factory]
+        with self._derived_locks[factory]:
+            index = cache.get(root)
+            if index is None or index.records is not shard:
+                start = time.time()
+                index = cache[root] = factory(shard)
+                logger.debug("%s for %s built in %.2fs", factory.__name__, root.id, time.time() - start)
+            return index
+
+    def _ensure_shards(self, roots, refresh=False):
+        """
+        Bring the shards of roots up to date, joining or starting scans
+
+        Returns:
+            Dict root -> shard records, consistent as of the scans waited for
+        """
+        with self._lock:
+            self._forget_removed_roots(roots)
+            needed = {root: self._generations.setdefault(root, 0) for root in roots}
+        # A refresh is satisfied by any scan that finishes after it arrived
+        unrefreshed = set(roots) if refresh else set()
+
+        while True:
+            waiting = []
+            with self._lock:
+                for root in roots:
+                    shard_generation = self._shard_generations.get(root)
+                    if root not in unrefreshed and shard_generation is not None and shard_generation >= needed[root]:
+                        continue
+                    scan = self._scans.get(root)
+                    if scan is None:
+                        scan = self._scans[root] = ShardScan(self._generations[root])
+                        logger.info("Scanning %s...", root.path)
+                        threading.Thread(target=self._scan_shard, args=(root, scan), name=f"scan-{root.id}", daemon=True).start()
+                    waiting.append((root, scan))
+                if not waiting:
+                    return {root: self._shards[root] for root in roots}
+            for root, scan in waiting:
+                scan.done.wait()
+                unrefreshed.discard(root)
+
+    def _forget_removed_roots(self, roots):
+        """Drop state of roots that are no longer configured (caller holds the lock)"""
+        for state in (self._shards, self._shard_generations, self._generations):
+            for root in [root for root in state if root not in roots]:
+                del state[root]
+
+    def _scan_shard(self, root, scan):
+        self._progress[root] = scan.progress
+        try:
+            shard = self._scanner(root, progress=scan.progress)
+            logger.debug("Scanned %s: %d models", root.path, len(shard))
+        except Exception as e:
+            logger.error("Error scanning %s: %s", root.path, e)
+            shard = ShardRecords()
+        finally:
+            scan.progress.finish()
+
+        with self._lock:
+            # Swap the finished snapshot in (unless the root was removed meanwhile)
+            if root in self._generations:
+                self._shards[root] = shard
+                self._shard_generations[root] = scan.generation
+            del self._scans[root]
+        scan.done.set()
+        logger.info("Cache built for %s with %d items", root.id, len(shard))
+
+        self._rebuild_derived(root, shard)
+
+    def _rebuild_derived(self, root, shard):
+        """Rebuild the derived indexes (search, facets, folders, listing versions) of roots that use them off the request path"""
+        for factory, cache in self._derived.items():
+            if root in cache:
+                threading.Thread(target=self._derived_index, args=(factory, root, shard),
+                                 name=f"{factory.__name__}-{root.id}", daemon=True).start()
+
+    def update_records(self, root, replaced=(), removed=()):
+        """
+        Apply known changes to a root's shard without rescanning it
+
+        The shard is copied with the changes and swapped in, like a finished
+        scan. If a scan of the root is running, it may have read the old
+        files, so the root is also invalidated for one follow-up scan.
+
+        Args:
+            root: LibraryRoot whose shard changes
+            replaced: ModelRecords to add, or to replace the record with the same id
+            removed: Ids of models to drop
+
+        Returns:
+            True if applied, False if the shard is not loaded (the next get() scans it)
+        """
+        replaced = {record.id: record for record in replaced}
+        removed = set(removed)
+        with self._lock:
+            shard = self._shards.get(root)
+            if shard is None:
+                return False
+            updated = ShardRecords(
+                replaced.pop(record.id, record) for record in shard if record.id not in removed
+            )
+            # Models that are new to this root go after the existing ones
+            updated.extend(replaced.values())
+            # Keep the folder list complete when a model lands in a new folder
+            updated.directories = tuple(sorted(
+                set(getattr(shard, 'directories', None) or ()) | {record.relative_dir for record in updated if record.relative_dir},
+                key=lambda d: d.split('/')))
+            self._shards[root] = updated
+            if root in self._scans:
+                self._generations[root] += 1
+        logger.debug("Updated %s in place: %d models, %d removed", root.id, len(updated), len(removed))
+        self._rebuild_derived(root, updated)
+        return True
+
+    def invalidate(self, root_id=None, reason=''):
+        """
+        Mark shards stale so the next get() rescans them
+
+        Invalidations during a running scan are coalesced into one follow-up
+        scan of that root.
+
+        Args:
+            root_id: Only invalidate this root's shard; all shards if None
+            reason: Short description for the log
+        """
+        with self._lock:
+            for root in self._generations:
+                if root_id is None or root.id == root_id:
+                    self._generations[root] += 1
+        logger.debug("Cache invalidated%s", f" due to {reason}" if reason else '')
+
+    def status(self, roots):
+        """
+        Scan state of each root, without waiting for a running scan
+
+        Returns:
+            Dict {'ready': bool, 'roots': [{'id', 'path', 'state', 'directories',
+            'models', 'seconds'}]} where state is 'ready', 'scanning' or
+            'pending' (not scanned yet or invalidated); counts are those of
+            the latest scan
+        """
+        result = []
+        for root in roots:
+            progress = self._progress.get(root)
+            shard_generation = self._shard_generations.get(root)
+            if root in self._scans:
+                state = 'scanning'
+            elif shard_generation is not None and shard_generation >= self._generations.get(root, 0):
+                state = 'ready'
+            else:
+                state = 'pending'
+            entry = {'id': root.id, 'path': root.path, 'state': state}
+            entry.update(progress.to_dict() if progress is not None else {'directories': 0, 'models': 0, 'seconds': 0})
+            result.append(entry)
+        return {'ready': all(entry['state'] == 'ready' for entry in result), 'roots': result}
+
+    def build_async(self, roots):
+        """Build the listing for roots on a background thread (e.g. at startup)"""
+        thread = threading.Thread(target=self.records, args=(roots,), name='index-build', daemon=True)
+        thread.start()
+        return thread
+
+    def rebuild_async(self, roots):
+        """Invalidate and rebuild the listing for roots on a background thread"""
+        self.invalidate(reason='settings change')
+        return self.build_async(roots)
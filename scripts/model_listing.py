@@ -0,0 +1,142 @@
+# -*- coding: UTF-8 -*-
+"""
+Model Listing Module
+Versions for the /load-loras listing: a content hash per model, an ETag per
+listing, and the versions of listings served recently, so a client holding
+one of them can be answered with 304 or with only the models that changed
+"""
+
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Hex digits kept of a model's version hash
+VERSION_LENGTH = 16
+
+# Listings whose versions are kept for delta responses
+LISTING_HISTORY_SIZE = 16
+
+
+def record_version(record):
+    """
+    Version of a model: a hash of its /load-loras entry
+
+    The same content gives the same version across rescans and restarts,
+    whichever JSON backend is installed (the hash is taken over a canonical
+    stdlib encoding, not json_codec.dumps); any change that shows in the
+    listing (metadata, previews, size, date) gives a new one.
+
+    Args:
+        record: ModelRecord
+
+    Returns:
+        Hex string of VERSION_LENGTH characters
+    """
+    canonical = json.dumps(record.to_dict(), sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(canonical.encode('ascii')).hexdigest()[:VERSION_LENGTH]
+
+
+def listing_entry(record, version):
+    """A model's /load-loras entry: its to_dict() plus its version (for If-Match on edits)"""
+    entry = record.to_dict()
+    entry['version'] = version
+    return entry
+
+
+class ShardListing:
+    """
+    Model versions of one shard of ModelRecords, with the shard's ETag
+
+    Built like the search and facet indexes (see ModelIndex.listings), so
+    versions are hashed once per scan, not per request.
+    """
+
+    def __init__(self, records):
+        self.records = records
+        self.versions = {record.id: record_version(record) for record in records}
+        signature = hashlib.sha1()
+        for model_id, version in self.versions.items():
+            signature.update(f"{model_id}\0{version}\0".encode('utf-8', 'surrogateescape'))
+        self.etag = signature.hexdigest()
+
+    def entries(self):
+        """The shard's /load-loras entries, in shard order"""
+        return [listing_entry(record, self.versions[record.id]) for record in self.records]
+
+
+def listing_etag(listings):
+    """
+    ETag of the merged listing of several shards
+
+    Args:
+        listings: ShardListing per root, in display order
+
+    Returns:
+        Quoted ETag string
+    """
+    signature = hashlib.sha1()
+    for listing in listings:
+        signature.update(listing.etag.encode('ascii'))
+    return f'"{signature.hexdigest()}"'
+
+
+class ListingHistory:
+    """
+    Versions of the listings served recently, by ETag
+
+    Only the shards' version dicts are kept (not their records), so an
+    entry costs a reference per shard while the shard is current and its
+    ids and version strings once it has been replaced.
+    """
+
+    def __init__(self, size=LISTING_HISTORY_SIZE):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def remember(self, etag, listings):
+        """Record the versions of a listing about to be served under etag"""
+        with self._lock:
+            if etag in self._entries:
+                self._entries.move_to_end(etag)
+                return
+            self._entries[etag] = tuple(listing.versions for listing in listings)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def delta(self, etag, listings):
+        """
+        Changes from a listing served earlier to the current one
+
+        Args:
+            etag: ETag the client holds
+            listings: Current ShardListing per root, in display order
+
+        Returns:
+            Tuple (entries of changed models, removed model ids), or None if
+            etag is not in the history (the client needs the full listing)
+        """
+        with self._lock:
+            old_shards = self._entries.get(etag)
+        if old_shards is None:
+            return None
+
+        old_versions = {}
+        for versions in old_shards:
+            old_versions.update(versions)
+
+        changed = []
+        current_ids = set()
+        for listing in listings:
+            current_ids.update(listing.versions)
+            for record in listing.records:
+                version = listing.versions[record.id]
+                if old_versions.get(record.id) != version:
+                    changed.append(listing_entry(record, version))
+        removed = [model_id for model_id in old_versions if model_id not in current_ids]
+        logger.debug("Listing delta from %s: %d changed, %d removed", etag, len(changed), len(removed))
+        return changed, removed
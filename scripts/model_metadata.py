@@ -0,0 +1,342 @@
+# -*- coding: UTF-8 -*-
+"""
+Model Metadata Module
+Field-level edits of a model's .json sidecar: changed fields are merged
+into the file on disk under a per-model lock, guarded by the model's
+listing version, written atomically, and the index record is rebuilt in
+place instead of rescanning the library. Batch edits apply one operation
+to many models the same way, with one index update at the end
+"""
+
+import os
+import re
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import json_codec
+from file_utils import atomic_write_json
+from model_index import build_model_record, find_root
+from model_listing import record_version
+import search_index
+
+logger = logging.getLogger(__name__)
+
+# Edits of different models rarely share a lock; edits of one model are serialized
+LOCK_STRIPES = 64
+
+_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+# Sidecars written at once by a batch edit (each write waits for an fsync)
+BATCH_WRITE_WORKERS = 8
+
+BATCH_OPERATIONS = ('set', 'append', 'remove', 'replace')
+
+
+class ModelNotFoundError(LookupError):
+    """The model id is not in the index (or its file is gone)"""
+
+
+class VersionConflictError(Exception):
+    """The model changed since the client read it"""
+
+    def __init__(self, current_version):
+        super().__init__(f"Model has changed (current version {current_version})")
+        self.current_version = current_version
+
+
+def model_lock(model_id):
+    """Lock serializing metadata edits of one model"""
+    return _locks[hash(model_id) % LOCK_STRIPES]
+
+
+def json_sidecar_path(record):
+    """Path of the model's .json sidecar (existing file, matched case-insensitively, or where to create it)"""
+    expected = record.name + ".json"
+    for name in record.associated_files:
+        if name.lower() == expected.lower():
+            return os.path.join(record.directory, name)
+    return os.path.join(record.directory, expected)
+
+
+def merge_json(current, changes):
+    """
+    Apply field changes to a sidecar dict
+
+    Args:
+        current: Sidecar contents (not modified)
+        changes: Dict of field -> new value; None removes the field
+
+    Returns:
+        New dict
+    """
+    merged = dict(current)
+    for key, value in changes.items():
+        if value is None:
+            merged.pop(key, None)
+        else:
+            merged[key] = value
+    return merged
+
+
+def _read_sidecar(json_path):
+    """Sidecar contents, or {} if there is none yet"""
+    if not os.path.exists(json_path):
+        return {}
+    current = json_codec.read_json(json_path)
+    if not isinstance(current, dict):
+        raise ValueError(f"{json_path} does not hold a JSON object")
+    return current
+
+
+def _write_changes(record, changes):
+    """
+    Merge changes into the record's sidecar on disk (caller holds the model lock)
+
+    Args:
+        record: ModelRecord of the model
+        changes: Dict of field -> new value (None removes the field), or a
+            function of the current sidecar dict returning such a dict
+
+    Returns:
+        True if the sidecar was written, False if nothing changed
+    """
+    json_path = json_sidecar_path(record)
+    current = _read_sidecar(json_path)
+    if callable(changes):
+        changes = changes(current)
+    merged = merge_json(current, changes)
+    if merged == current and os.path.exists(json_path):
+        return False
+    # Keys sorted like the files the UI has always written
+    atomic_write_json(json_path, merged, sort_keys=True)
+    return True
+
+
+def update_model_json(model_index, roots, model_id, changes, expected_version=None):
+    """
+    Merge field changes into a model's .json sidecar
+
+    The merge is done against the file on disk, so fields written by other
+    tools since the last scan are kept.
+
+    Args:
+        model_index: ModelIndex holding the model
+        roots: Configured LibraryRoots
+        model_id: Model id as in the listing
+        changes: Dict of field -> new value (None removes the field)
+        expected_version: Listing version the client edited, or None to skip the check
+
+    Returns:
+        The rebuilt ModelRecord
+
+    Raises:
+        ModelNotFoundError: Unknown model
+        VersionConflictError: The model's current version is not expected_version
+        ValueError: The sidecar on disk is not a JSON object
+        OSError: The sidecar could not be written
+    """
+    with model_lock(model_id):
+        record = model_index.find(roots, model_id)
+        if record is None or not os.path.isfile(record.path):
+            raise ModelNotFoundError(model_id)
+        if expected_version is not None:
+            current_version = record_version(record)
+            if current_version != expected_version:
+                raise VersionConflictError(current_version)
+
+        _write_changes(record, changes)
+
+        root = find_root(roots, record.root_id)
+        updated = build_model_record(root, record.directory, record.relative_dir, record.filename)
+        if updated is None:
+            raise ModelNotFoundError(model_id)
+        model_index.update_records(root, replaced=[updated])
+        logger.debug("Updated %s: %s", model_id, ', '.join(changes))
+        return updated
+
+
+def _field_items(value):
+    """Items of a multi-valued field: a list as is, a string split at commas (like tags)"""
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(',') if item.strip()]
+    return [] if value is None else [value]
+
+
+def _same_item(a, b):
+    if isinstance(a, str) and isinstance(b, str):
+        return a.casefold() == b.casefold()
+    return a == b
+
+
+def _with_items(current, items):
+    """New field value holding items, in the shape of the current value"""
+    if isinstance(current, list):
+        return items
+    return ', '.join(str(item) for item in items)
+
+
+def batch_operation(spec):
+    """
+    Compile a batch operation into a function computing a model's changes
+
+    Supported operations (field is a sidecar key, e.g. "category" or "tags"):
+        {"op": "set", "field": f, "value": v}: set the field (null removes it)
+        {"op": "append", "field": f, "value": item or [items]}: add the
+            items that are missing (case-insensitively) to a list field or
+            a comma-separated one
+        {"op": "remove", "field": f, "value": item or [items]}: drop those items
+        {"op": "replace", "field": f, "pattern": regex, "replacement": text,
+            "ignoreCase": bool}: regex substitution in a text field (or in
+            each text item of a list); \\1 refers to a group
+
+    Args:
+        spec: Operation dict as above
+
+    Returns:
+        Function of the current sidecar dict returning a dict of changes
+        (empty if the model is not affected)
+
+    Raises:
+        ValueError: Invalid operation
+    """
+    if not isinstance(spec, dict):
+        raise ValueError("Operation must be an object")
+    op = spec.get('op')
+    field = spec.get('field')
+    if op not in BATCH_OPERATIONS:
+        raise ValueError(f"Unknown operation {op!r} (expected one of {', '.join(BATCH_OPERATIONS)})")
+    if not isinstance(field, str) or not field:
+        raise ValueError("Operation needs a field")
+
+    if op == 'set':
+        if 'value' not in spec:
+            raise ValueError("set needs a value (null removes the field)")
+        value = spec['value']
+        # Models that already have the value are left alone by _write_changes
+        return lambda current: {field: value}
+
+    if op in ('append', 'remove'):
+        items = _field_items(spec.get('value'))
+        if not items:
+            raise ValueError(f"{op} needs a value")
+
+        def apply(current):
+            existing = _field_items(current.get(field))
+            if op == 'append':
+                added = [item for item in items if not any(_same_item(item, other) for other in existing)]
+                if not added:
+                    return {}
+                return {field: _with_items(current.get(field), existing + added)}
+            kept = [item for item in existing if not any(_same_item(item, other) for other in items)]
+            if len(kept) == len(existing):
+                return {}
+            return {field: _with_items(current.get(field), kept)}
+        return apply
+
+    pattern = spec.get('pattern')
+    replacement = spec.get('replacement', '')
+    if not isinstance(pattern, str) or not pattern or not isinstance(replacement, str):
+        raise ValueError("replace needs a pattern and a replacement text")
+    try:
+        regex = re.compile(pattern, re.IGNORECASE if spec.get('ignoreCase') else 0)
+        # Checks the group references once instead of failing on every model
+        regex.sub(replacement, '')
+    except re.error as e:
+        raise ValueError(f"Invalid pattern: {e}") from None
+
+    def substitute(value):
+        return regex.sub(replacement, value) if isinstance(value, str) else value
+
+    def apply(current):
+        value = current.get(field)
+        new_value = [substitute(item) for item in value] if isinstance(value, list) else substitute(value)
+        return {} if new_value == value else {field: new_value}
+    return apply
+
+
+def matching_model_ids(model_index, roots, query, include=None):
+    """
+    Ids of the models matching a search query (search-parser.js grammar)
+
+    Args:
+        model_index: ModelIndex to search
+        roots: Configured LibraryRoots
+        query: Query string
+        include: Optional predicate on records (e.g. hiding NSFW models)
+
+    Returns:
+        List of model ids, in listing order
+    """
+    ids = []
+    indexes = model_index.search_indexes(roots)
+    for index, ordinals in zip(indexes, search_index.match(indexes, query)):
+        for ordinal in sorted(ordinals):
+            record = index.records[ordinal]
+            if include is None or include(record):
+                ids.append(record.id)
+    return ids
+
+
+def batch_update_json(model_index, roots, model_ids, operation, versions=None, workers=BATCH_WRITE_WORKERS):
+    """
+    Apply one operation to the sidecars of many models
+
+    Sidecars are written in parallel, each under its model's lock, and the
+    rebuilt records go into the index with one update per root.
+
+    Args:
+        model_index: ModelIndex holding the models
+        roots: Configured LibraryRoots
+        model_ids: Ids of the models to edit
+        operation: Function from batch_operation()
+        versions: Optional dict id -> listing version the client saw; models
+            changed since are skipped with status "conflict"
+        workers: Sidecars written at once
+
+    Returns:
+        List of per-model results in the order of model_ids (duplicates
+        dropped): {"id", "status"} with status "updated", "unchanged",
+        "conflict", "not_found" or "error", plus "version" (the model's
+        current version) or "error" (message)
+    """
+    versions = versions or {}
+    model_ids = list(dict.fromkeys(model_ids))
+
+    def edit(model_id):
+        with model_lock(model_id):
+            # Looked up under the lock, so an edit that landed since the batch started is seen
+            record = model_index.find(roots, model_id)
+            if record is None:
+                return {'id': model_id, 'status': 'not_found'}, None
+            try:
+                if not os.path.isfile(record.path):
+                    return {'id': model_id, 'status': 'not_found'}, None
+                version = record_version(record)
+                expected = versions.get(model_id)
+                if expected is not None and expected != version:
+                    return {'id': model_id, 'status': 'conflict', 'version': version}, None
+                if not _write_changes(record, operation):
+                    return {'id': model_id, 'status': 'unchanged', 'version': version}, None
+                updated = build_model_record(find_root(roots, record.root_id), record.directory, record.relative_dir, record.filename)
+            except (OSError, ValueError) as e:
+                logger.warning("Batch edit of %s failed: %s", model_id, e)
+                return {'id': model_id, 'status': 'error', 'error': str(e)}, None
+        if updated is None:
+            return {'id': model_id, 'status': 'not_found'}, None
+        return {'id': model_id, 'status': 'updated', 'version': record_version(updated)}, updated
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(model_ids)))) as executor:
+        outcomes = list(executor.map(edit, model_ids))
+
+    # One index update per root for the whole batch
+    replaced = {}
+    for _, updated in outcomes:
+        if updated is not None:
+            replaced.setdefault(updated.root_id, []).append(updated)
+    for root_id, root_records in replaced.items():
+        model_index.update_records(find_root(roots, root_id), replaced=root_records)
+    logger.debug("Batch edit of %d models: %d updated", len(model_ids), sum(len(r) for r in replaced.values()))
+    return [result for result, _ in outcomes]
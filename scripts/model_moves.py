@@ -0,0 +1,427 @@
+# -*- coding: UTF-8 -*-
+"""
+Model Moves Module
+Batch move and rename of models with their sidecars and previews: renames
+where source and target are on the same device, parallel copies with
+progress counters where they are not, and one index update for the batch
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from model_index import PREVIEW_SUFFIXES, build_model_record, find_root, root_for_path
+from model_listing import record_version
+from model_metadata import model_lock
+
+logger = logging.getLogger(__name__)
+
+# Models copied at once when moving across devices
+BATCH_COPY_WORKERS = 4
+
+# Bytes read and written per step of a cross-device copy
+COPY_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Suffix of a file being copied, until it is complete
+PARTIAL_SUFFIX = '.moving'
+
+# Batch moves whose progress stays readable after they finish
+JOB_HISTORY_SIZE = 16
+
+
+class MoveProgress:
+    """Live counters of one batch move, safe to read while it runs"""
+
+    __slots__ = ('models', 'done', 'bytes', 'copied', 'started', 'finished', '_lock')
+
+    def __init__(self):
+        self.models = 0
+        self.done = 0
+        self.bytes = 0
+        self.copied = 0
+        self.started = time.time()
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def add(self, done=0, copied=0):
+        with self._lock:
+            self.done += done
+            self.copied += copied
+
+    def finish(self):
+        self.finished = time.time()
+
+    def to_dict(self):
+        return {
+            'models': self.models,
+            'done': self.done,
+            'bytes': self.bytes,
+            'copied': self.copied,
+            'finished': self.finished is not None,
+            'seconds': round((self.finished or time.time()) - self.started, 2)
+        }
+
+
+class MoveJobs:
+    """Progress of recent batch moves, by the job id the client chose"""
+
+    def __init__(self, size=JOB_HISTORY_SIZE):
+        self.size = size
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, job_id):
+        """Register a new batch move and return its MoveProgress"""
+        progress = MoveProgress()
+        if job_id:
+            with self._lock:
+                self._jobs[job_id] = progress
+                self._jobs.move_to_end(job_id)
+                while len(self._jobs) > self.size:
+                    self._jobs.popitem(last=False)
+        return progress
+
+    def get(self, job_id):
+        """MoveProgress of a job, or None if unknown"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+
+def rename_pattern(spec):
+    """
+    Compile a rename rule for model names
+
+    Args:
+        spec: {"pattern": regex, "replacement": text, "ignoreCase": bool};
+            e.g. a prefix rename is {"pattern": "^old_", "replacement": "new_"}
+
+    Returns:
+        Function old model name -> new model name
+
+    Raises:
+        ValueError: Invalid rule
+    """
+    if not isinstance(spec, dict):
+        raise ValueError("Rename must be an object")
+    pattern = spec.get('pattern')
+    replacement = spec.get('replacement', '')
+    if not isinstance(pattern, str) or not pattern or not isinstance(replacement, str):
+        raise ValueError("Rename needs a pattern and a replacement text")
+    try:
+        regex = re.compile(pattern, re.IGNORECASE if spec.get('ignoreCase') else 0)
+        regex.sub(replacement, '')
+    except re.error as e:
+        raise ValueError(f"Invalid pattern: {e}") from None
+    return lambda name: regex.sub(replacement, name)
+
+
+def _valid_model_name(name):
+    return (isinstance(name, str) and name.strip() == name and name not in ('', '.', '..')
+            and not any(c in name for c in '/\\\0'))
+
+
+def _model_files(record, names_lower):
+    """
+    Files that move with a model: the model itself, its sidecars and its previews
+
+    Args:
+        record: ModelRecord of the model
+        names_lower: Current file names of its folder, by lowercase name
+            (the folder may have changed since it was scanned)
+    """
+    suffixes = [".json", ".civitai.info"] + [f".preview{suffix}.png" for suffix in PREVIEW_SUFFIXES]
+    names = [record.filename]
+    for suffix in suffixes:
+        name = names_lower.get((record.name + suffix).lower())
+        if name:
+            names.append(name)
+    return names
+
+
+def _folder_names(directory, listings):
+    """File names of a folder by lowercase name, listed once per batch"""
+    if directory not in listings:
+        names_lower = {}
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                names_lower.setdefault(entry.name.lower(), entry.name)
+        listings[directory] = names_lower
+    return listings[directory]
+
+
+class _Move:
+    """One planned model move: source record, target location, and file pairs"""
+
+    __slots__ = ('record', 'target_root', 'target_dir', 'relative_dir', 'new_name', 'files', 'same_device')
+
+    def __init__(self, record, target_root, target_dir, relative_dir, new_name, file_names):
+        self.record = record
+        self.target_root = target_root
+        self.target_dir = target_dir
+        self.relative_dir = relative_dir
+        self.new_name = new_name
+        self.files = [
+            (os.path.join(record.directory, name), os.path.join(target_dir, new_name + name[len(record.name):]))
+            for name in file_names
+        ]
+        self.same_device = True
+
+
+def _plan(record, roots, spec, rename, claimed, listings):
+    """
+    Work out where a model goes
+
+    Returns:
+        (_Move, None) or (None, result dict for a model that is not moved)
+    """
+    model_id = record.id
+    source_root = find_root(roots, record.root_id)
+    target_root = find_root(roots, spec['targetRoot']) if spec.get('targetRoot') else source_root
+    if target_root is None:
+        return None, {'id': model_id, 'status': 'invalid', 'error': f"Unknown target root: {spec['targetRoot']}"}
+
+    target_folder = spec.get('targetFolder')
+    if target_folder is None:
+        target_folder = record.relative_dir
+    if not isinstance(target_folder, str):
+        return None, {'id': model_id, 'status': 'invalid', 'error': "Target folder must be a string"}
+    target_dir = os.path.normpath(os.path.join(target_root.path, *[part for part in target_folder.split('/') if part]))
+    if root_for_path([target_root], target_dir) is None:
+        return None, {'id': model_id, 'status': 'invalid', 'error': "Target folder is outside the models directory"}
+    relative_dir = os.path.relpath(target_dir, target_root.path).replace(os.sep, '/')
+    if relative_dir == '.':
+        relative_dir = ''
+
+    new_name = spec.get('newName') or (rename(record.name) if rename else record.name)
+    if not _valid_model_name(new_name):
+        return None, {'id': model_id, 'status': 'invalid', 'error': f"Invalid model name: {new_name!r}"}
+
+    try:
+        names_lower = _folder_names(record.directory, listings)
+    except OSError as e:
+        return None, {'id': model_id, 'status': 'error', 'error': str(e)}
+    if record.filename.lower() not in names_lower:
+        return None, {'id': model_id, 'status': 'not_found'}
+    move = _Move(record, target_root, target_dir, relative_dir, new_name, _model_files(record, names_lower))
+    if all(os.path.normcase(os.path.abspath(source)) == os.path.normcase(os.path.abspath(target))
+           for source, target in move.files):
+        return None, {'id': model_id, 'status': 'unchanged', 'version': record_version(record)}
+
+    for source, target in move.files:
+        key = os.path.normcase(os.path.abspath(target))
+        # A case-only rename may find the source under the target name
+        taken = os.path.exists(target) and not (os.path.exists(source) and os.path.samefile(source, target))
+        if taken or key in claimed:
+            return None, {'id': model_id, 'status': 'conflict', 'error': f"{os.path.basename(target)} already exists in the target folder"}
+    claimed.update(os.path.normcase(os.path.abspath(target)) for _, target in move.files)
+    return move, None
+
+
+def _rename_files(move):
+    """Rename a model's files, putting back the ones already renamed if one fails"""
+    done = []
+    try:
+        for source, target in move.files:
+            os.rename(source, target)
+            done.append((source, target))
+    except OSError:
+        for source, target in reversed(done):
+            try:
+                os.rename(target, source)
+            except OSError as e:
+                logger.error("Could not restore %s after a failed move: %s", source, e)
+        raise
+
+
+def _copy_file(source, target, progress):
+    """Copy one file through a partial file, keeping its modification time"""
+    partial = target + PARTIAL_SUFFIX
+    try:
+        with open(source, 'rb') as src, open(partial, 'wb') as dst:
+            while True:
+                chunk = src.read(COPY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                dst.write(chunk)
+                progress.add(copied=len(chunk))
+            dst.flush()
+            os.fsync(dst.fileno())
+        stat = os.stat(source)
+        os.utime(partial, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        os.replace(partial, target)
+    except OSError:
+        try:
+            os.remove(partial)
+        except OSError:
+            pass
+        raise
+
+
+def _copy_files(move, progress):
+    """Copy a model's files to another device, then remove the originals"""
+    copied = []
+    try:
+        for source, target in move.files:
+            _copy_file(source, target, progress)
+            copied.append(target)
+    except OSError:
+        for target in copied:
+            try:
+                os.remove(target)
+            except OSError:
+                pass
+        raise
+    # The copies are complete; a source that cannot be removed is only reported
+    for source, _ in move.files:
+        try:
+            os.remove(source)
+        except OSError as e:
+            logger.warning("Moved %s, but could not remove the original: %s", source, e)
+
+
+def _same_device(move):
+    return os.stat(move.record.directory).st_dev == os.stat(move.target_dir).st_dev
+
+
+def model_file_paths(record):
+    """
+    Current paths of a model's file, sidecars and previews
+
+    Raises:
+        OSError: The model's folder cannot be listed
+    """
+    names_lower = _folder_names(record.directory, {})
+    return [os.path.join(record.directory, name) for name in _model_files(record, names_lower)
+            if name.lower() in names_lower]
+
+
+def move_model_files(record, target_dir, progress=None):
+    """
+    Move one model's files into a folder outside the index (e.g. a quarantine)
+
+    Same-device moves are renames, others copies, as in batch_move(); the
+    caller holds the model's lock and updates the index.
+
+    Args:
+        record: ModelRecord of the model
+        target_dir: Folder to move into (created if missing)
+        progress: Optional MoveProgress counting copied bytes
+
+    Raises:
+        FileExistsError: A file of that name is already in target_dir
+        OSError: The move failed (the files are left where they were)
+    """
+    move = _Move(record, None, target_dir, None, record.name, _model_files(record, _folder_names(record.directory, {})))
+    for _, target in move.files:
+        if os.path.exists(target):
+            raise FileExistsError(f"{target} already exists")
+    os.makedirs(target_dir, exist_ok=True)
+    if _same_device(move):
+        _rename_files(move)
+    else:
+        _copy_files(move, progress or MoveProgress())
+
+
+def batch_move(model_index, roots, moves, rename=None, progress=None, workers=BATCH_COPY_WORKERS):
+    """
+    Move and/or rename many models with their sidecars and previews
+
+    Models whose target folder is on the same device are renamed one after
+    another; the others are copied in parallel (progress counts their bytes)
+    and then removed. A model's files are moved together or not at all.
+    The index gets one update per affected root at the end.
+
+    Args:
+        model_index: ModelIndex holding the models
+        roots: Configured LibraryRoots
+        moves: List of {"id", "targetFolder", "targetRoot", "newName"}; a
+            missing targetFolder keeps the model's folder, a missing
+            targetRoot its root, a missing newName its name (or applies rename)
+        rename: Optional function old name -> new name (see rename_pattern)
+        progress: Optional MoveProgress updated as models are moved
+        workers: Models copied at once across devices
+
+    Returns:
+        List of per-model results in the order of moves (duplicates
+        dropped): {"id", "status"} with status "moved", "unchanged",
+        "conflict", "invalid", "not_found" or "error", plus "newId" and
+        "version" of a moved model, or "error" (message)
+    """
+    progress = progress or MoveProgress()
+    records = {record.id: record for record in model_index.records(roots)}
+
+    # Plan every move first, so targets claimed within the batch conflict too
+    results = []
+    planned = []
+    claimed = set()
+    listings = {}
+    # A model listed twice is moved once, as first listed
+    unique = {}
+    for spec in moves:
+        unique.setdefault(spec.get('id'), spec)
+    for spec in unique.values():
+        model_id = spec.get('id')
+        record = records.get(model_id)
+        if record is None:
+            results.append({'id': model_id, 'status': 'not_found'})
+            continue
+        move, result = _plan(record, roots, spec, rename, claimed, listings)
+        results.append(result)
+        if move is not None:
+            planned.append((len(results) - 1, move))
+
+    progress.models = len(planned)
+    copies = []
+    for position, move in planned:
+        try:
+            os.makedirs(move.target_dir, exist_ok=True)
+            move.same_device = _same_device(move)
+            if not move.same_device:
+                progress.bytes += sum(os.path.getsize(source) for source, _ in move.files)
+                copies.append((position, move))
+        except OSError as e:
+            results[position] = {'id': move.record.id, 'status': 'error', 'error': str(e)}
+
+    def run(move):
+        model_id = move.record.id
+        with model_lock(model_id):
+            try:
+                if move.same_device:
+                    _rename_files(move)
+                else:
+                    _copy_files(move, progress)
+            except OSError as e:
+                logger.warning("Moving %s failed: %s", model_id, e)
+                return {'id': model_id, 'status': 'error', 'error': str(e)}, None
+            finally:
+                progress.add(done=1)
+        record = build_model_record(move.target_root, move.target_dir, move.relative_dir, move.new_name + ".safetensors")
+        if record is None:
+            return {'id': model_id, 'status': 'error', 'error': "Model file missing after the move"}, None
+        return {'id': model_id, 'status': 'moved', 'newId': record.id, 'version': record_version(record)}, record
+
+    renames = [(position, move) for position, move in planned if move.same_device and results[position] is None]
+    outcomes = [(position, move, run(move)) for position, move in renames]
+    if copies:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(copies)))) as executor:
+            positions, copy_moves = zip(*copies)
+            outcomes.extend(zip(positions, copy_moves, executor.map(run, copy_moves)))
+
+    # One index update per root: moved models leave their source root and join their target root
+    removed = {}
+    replaced = {}
+    for position, move, (result, record) in outcomes:
+        results[position] = result
+        if record is not None:
+            removed.setdefault(move.record.root_id, []).append(move.record.id)
+            replaced.setdefault(record.root_id, []).append(record)
+    for root_id in dict.fromkeys(list(removed) + list(replaced)):
+        model_index.update_records(find_root(roots, root_id), replaced=replaced.get(root_id, ()), removed=removed.get(root_id, ()))
+
+    progress.finish()
+    logger.debug("Batch move of %d models: %d moved", len(moves), sum(len(r) for r in replaced.values()))
+    return results
@@ -0,0 +1,180 @@
+# -*- coding: UTF-8 -*-
+"""
+Multipart Module
+Streaming multipart/form-data parser for request bodies (replaces the
+cgi.FieldStorage module removed in Python 3.13): parts are read in bounded
+chunks, so file uploads never have to fit in memory
+"""
+
+import logging
+from email.parser import BytesHeaderParser
+from email.message import Message
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# Limits for the non-file parts of a form
+MAX_HEADER_SIZE = 16 * 1024
+MAX_FIELD_SIZE = 64 * 1024
+
+
+class MultipartError(ValueError):
+    """Malformed multipart body, or a part over its size limit"""
+
+
+def parse_boundary(content_type):
+    """
+    Return the boundary of a multipart/form-data Content-Type header as bytes
+
+    Raises:
+        MultipartError: If the header is not multipart/form-data with a boundary
+    """
+    message = Message()
+    message['Content-Type'] = content_type or ''
+    boundary = message.get_param('boundary')
+    if message.get_content_type() != 'multipart/form-data' or not boundary:
+        raise MultipartError("Expected multipart/form-data with a boundary")
+    if isinstance(boundary, tuple):
+        boundary = boundary[2]
+    return boundary.encode('latin-1')
+
+
+class Part:
+    """One form part; its body must be read (chunks(), read_text()) before the next part"""
+
+    def __init__(self, parser, headers):
+        self._parser = parser
+        self.headers = headers
+        self.name = headers.get_param('name', header='content-disposition')
+        self.filename = headers.get_filename()
+        self.content_type = headers.get_content_type()
+        self._done = False
+
+    def chunks(self):
+        """Yield the part body as bytes chunks of at most about CHUNK_SIZE"""
+        while not self._done:
+            chunk, self._done = self._parser._read_body_chunk()
+            if chunk:
+                yield chunk
+
+    def read_text(self, limit=MAX_FIELD_SIZE, encoding='utf-8'):
+        """Read a (small) text field"""
+        data = bytearray()
+        for chunk in self.chunks():
+            data += chunk
+            if len(data) > limit:
+                raise MultipartError(f"Field '{self.name}' is larger than {limit} bytes")
+        return data.decode(encoding)
+
+    def drain(self):
+        for _ in self.chunks():
+            pass
+
+
+class MultipartParser:
+    """
+    Iterate over the parts of a multipart/form-data body
+
+    Reads exactly content_length bytes from stream (so a persistent
+    connection stays usable), at most chunk_size at a time.
+
+    Usage:
+        for part in MultipartParser(rfile, content_type, content_length):
+            if part.name == 'imageFile':
+                for chunk in part.chunks(): ...
+    """
+
+    def __init__(self, stream, content_type, content_length, chunk_size=CHUNK_SIZE):
+        self._stream = stream
+        self._remaining = content_length
+        self._chunk_size = chunk_size
+        # Every delimiter is preceded by CRLF, except the first; prepending one makes them uniform
+        self._delimiter = b'\r\n--' + parse_boundary(content_type)
+        self._buffer = bytearray(b'\r\n')
+
+    def __iter__(self):
+        # Skip the preamble up to the first delimiter
+        self._skip_to_delimiter()
+        while self._after_delimiter():
+            part = Part(self, self._read_headers())
+            yield part
+            part.drain()
+        self.drain()
+
+    def drain(self):
+        """Consume the rest of the body (epilogue, or an abandoned upload)"""
+        while self._remaining > 0:
+            data = self._stream.read(min(self._chunk_size, self._remaining))
+            if not data:
+                break
+            self._remaining -= len(data)
+        self._buffer.clear()
+
+    def _fill(self):
+        """Read the next chunk of the body into the buffer"""
+        if self._remaining <= 0:
+            raise MultipartError("Unexpected end of multipart body")
+        data = self._stream.read(min(self._chunk_size, self._remaining))
+        if not data:
+            raise MultipartError("Connection closed in the middle of the multipart body")
+        self._remaining -= len(data)
+        self._buffer += data
+
+    def _skip_to_delimiter(self):
+        while True:
+            position = self._buffer.find(self._delimiter)
+            if position != -1:
+                del self._buffer[:position + len(self._delimiter)]
+                return
+            # Keep a tail that could hold the start of a delimiter
+            del self._buffer[:max(0, len(self._buffer) - len(self._delimiter))]
+            self._fill()
+
+    def _after_delimiter(self):
+        """Consume what follows a delimiter; True if another part follows"""
+        while len(self._buffer) < 2:
+            self._fill()
+        if self._buffer[:2] == b'--':
+            return False
+        # Transport padding (RFC 2046) before the line break
+        while True:
+            line_end = self._buffer.find(b'\r\n')
+            if line_end != -1:
+                break
+            if len(self._buffer) > MAX_HEADER_SIZE:
+                raise MultipartError("Malformed multipart delimiter line")
+            self._fill()
+        if self._buffer[:line_end].strip(b' \t'):
+            raise MultipartError("Malformed multipart delimiter line")
+        del self._buffer[:line_end + 2]
+        return True
+
+    def _read_headers(self):
+        while True:
+            end = self._buffer.find(b'\r\n\r\n')
+            if end != -1:
+                break
+            if len(self._buffer) > MAX_HEADER_SIZE:
+                raise MultipartError("Multipart part headers too large")
+            self._fill()
+        headers = BytesHeaderParser().parsebytes(bytes(self._buffer[:end + 2]))
+        del self._buffer[:end + 4]
+        if headers.get_param('name', header='content-disposition') is None:
+            raise MultipartError("Multipart part without a form field name")
+        return headers
+
+    def _read_body_chunk(self):
+        """Return (data, part_finished) for the current part"""
+        while True:
+            position = self._buffer.find(self._delimiter)
+            if position != -1:
+                data = bytes(self._buffer[:position])
+                del self._buffer[:position + len(self._delimiter)]
+                return data, True
+            safe = len(self._buffer) - len(self._delimiter) + 1
+            if safe >= self._chunk_size or (safe > 0 and self._remaining <= 0):
+                data = bytes(self._buffer[:safe])
+                del self._buffer[:safe]
+                return data, False
+            self._fill()
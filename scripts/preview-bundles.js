@@ -0,0 +1,144 @@
+// preview-bundles.js - Lazy loading of preview images, batched through /preview-bundle
+
+// Previews per bundle request (the server caps this at 64)
+const MAX_BATCH = 48;
+// Decoded previews kept as blob URLs across re-renders
+const MAX_CACHED_PREVIEWS = 600;
+// Only model previews are bundled; anything else (placeholder) loads directly
+const BUNDLED_PREFIX = '/roots/';
+
+// preview URL -> blob URL, oldest first
+const previewCache = new Map();
+let bundlesAvailable = true;
+
+/**
+ * Forget cached previews, e.g. after the model list was reloaded and
+ * previews may have been replaced, reordered or deleted
+ */
+export function clearPreviewCache() {
+    previewCache.forEach(objectUrl => URL.revokeObjectURL(objectUrl));
+    previewCache.clear();
+}
+
+function cachePreview(url, objectUrl) {
+    const previous = previewCache.get(url);
+    if (previous) {
+        URL.revokeObjectURL(previous);
+        previewCache.delete(url);
+    }
+    previewCache.set(url, objectUrl);
+    if (previewCache.size > MAX_CACHED_PREVIEWS) {
+        const [oldestUrl, oldestObjectUrl] = previewCache.entries().next().value;
+        URL.revokeObjectURL(oldestObjectUrl);
+        previewCache.delete(oldestUrl);
+    }
+}
+
+function showImage(img, src) {
+    img.src = src;
+    img.removeAttribute('data-src');
+    img.classList.remove('lazy-image');
+    img.classList.add('loaded');
+}
+
+/**
+ * Fetch one bundle and split it into blob URLs
+ * @param {Array<string>} urls - Preview URLs
+ * @returns {Promise<Map<string, string>>} Preview URL -> blob URL for the previews the server sent
+ */
+async function loadBundle(urls) {
+    const loaded = new Map();
+    try {
+        const params = new URLSearchParams();
+        urls.forEach(url => params.append('u', url));
+        const response = await fetch(`/preview-bundle?${params}`);
+        if (!response.ok) {
+            // Older server without the endpoint: stop trying
+            if (response.status === 404 || response.status === 501) {
+                bundlesAvailable = false;
+            }
+            return loaded;
+        }
+
+        // One line of JSON (offset map), then the image bytes
+        const bytes = new Uint8Array(await response.arrayBuffer());
+        const headerEnd = bytes.indexOf(10);
+        const { members } = JSON.parse(new TextDecoder().decode(bytes.subarray(0, headerEnd)));
+        const dataStart = headerEnd + 1;
+        members.forEach(member => {
+            const start = dataStart + member.offset;
+            const blob = new Blob([bytes.subarray(start, start + member.length)], { type: member.type });
+            const objectUrl = URL.createObjectURL(blob);
+            cachePreview(member.url, objectUrl);
+            loaded.set(member.url, objectUrl);
+        });
+    } catch (error) {
+        console.error('Error loading preview bundle:', error);
+    }
+    return loaded;
+}
+
+/**
+ * Create the IntersectionObserver used by the grid, grouped grid and table views
+ *
+ * Images carry their URL in data-src. Images that come into view within
+ * the same frame are collected and fetched in bundles of up to MAX_BATCH,
+ * so a screenful of cards costs one or two requests. Previews missing
+ * from a bundle fall back to loading their own URL.
+ * @returns {IntersectionObserver} Observer to call observe(img) on
+ */
+export function createLazyImageObserver() {
+    let pending = [];
+    let flushScheduled = false;
+
+    async function flush() {
+        flushScheduled = false;
+        const images = pending;
+        pending = [];
+
+        const urls = [...new Set(images.map(img => img.getAttribute('data-src')))];
+        const batches = [];
+        for (let i = 0; i < urls.length; i += MAX_BATCH) {
+            batches.push(urls.slice(i, i + MAX_BATCH));
+        }
+        const results = await Promise.all(batches.map(loadBundle));
+        const loaded = new Map(results.flatMap(result => [...result]));
+
+        images.forEach(img => {
+            const url = img.getAttribute('data-src');
+            // The carousel may have switched this image to another preview in the meantime
+            if (url) {
+                showImage(img, loaded.get(url) || previewCache.get(url) || url);
+            }
+        });
+    }
+
+    return new IntersectionObserver((entries, observer) => {
+        entries.forEach(entry => {
+            if (!entry.isIntersecting) {
+                return;
+            }
+            const img = entry.target;
+            observer.unobserve(img);
+            const url = img.getAttribute('data-src');
+            if (!url) {
+                return;
+            }
+            const cached = previewCache.get(url);
+            if (cached) {
+                showImage(img, cached);
+            } else if (bundlesAvailable && url.startsWith(BUNDLED_PREFIX)) {
+                pending.push(img);
+            } else {
+                showImage(img, url);
+            }
+        });
+        if (pending.length > 0 && !flushScheduled) {
+            flushScheduled = true;
+            setTimeout(flush, 0);
+        }
+    }, {
+        rootMargin: '100px 0px', // Start loading images when they're 100px from viewport
+        threshold: 0.1
+    });
+}
@@ -75,25 +75,49 @@ function switchToImage(cardElement, index, previewImages) {
     // Indicator now just shows total count, no need to update
 }
 
+// Placeholder fill when the server has no colour for a preview (a shade lighter than the card background)
+const PLACEHOLDER_COLOR = '#333';
+
+/**
+ * Placeholder shown until a model's preview loads
+ *
+ * With the preview's dimensions from the index this is an SVG of the same
+ * aspect ratio, filled with the preview's average colour, so the card does
+ * not change shape when the image arrives.
+ * @param {Object} model - Model from the listing (previewWidth, previewHeight, previewColor)
+ * @returns {string} Image URL
+ */
+export function previewPlaceholder(model) {
+    if (!model.previewWidth || !model.previewHeight) {
+        return '/assets/placeholder.png';
+    }
+    const svg = `<svg xmlns="http://www.w3.org/2000/svg" width="${model.previewWidth}" height="${model.previewHeight}">` +
+        `<rect width="100%" height="100%" fill="${model.previewColor || PLACEHOLDER_COLOR}"/></svg>`;
+    return `data:image/svg+xml,${encodeURIComponent(svg)}`;
+}
+
 /**
  * Generate HTML for preview carousel
  * @param {Array<string>} previewImages - Array of preview image URLs
  * @param {string} modelName - Name of the model for alt text
+ * @param {string} placeholder - Image shown until the first preview loads (see previewPlaceholder)
  * @returns {string} HTML string for the preview carousel
  */
-export function generateCarouselHTML(previewImages, modelName) {
+export function generateCarouselHTML(previewImages, modelName, placeholder = '/assets/placeholder.png') {
     if (!previewImages || previewImages.length === 0) {
         return `<img src="/assets/placeholder.png" data-src="/assets/placeholder.png" alt="${modelName}" class="lazy-image">`;
     }
 
+    const placeholderClass = placeholder.startsWith('data:') ? ' lqip' : '';
+
     if (previewImages.length === 1) {
         // Single image - no carousel needed
-        return `<img src="/assets/placeholder.png" data-src="${previewImages[0]}" alt="${modelName}" class="lazy-image preview-main-image">`;
+        return `<img src="${placeholder}" data-src="${previewImages[0]}" alt="${modelName}" class="lazy-image preview-main-image${placeholderClass}">`;
     }
 
     // Multiple images - create carousel with side arrow navigation
     return `
-        \u003cimg src=\"/assets/placeholder.png\" data-src=\"${previewImages[0]}\" alt=\"${modelName}\" class=\"lazy-image preview-main-image\" data-index=\"0\"\u003e
+        \u003cimg src=\"${placeholder}\" data-src=\"${previewImages[0]}\" alt=\"${modelName}\" class=\"lazy-image preview-main-image${placeholderClass}\" data-index=\"0\"\u003e
         \u003cbutton class=\"carousel-arrow carousel-arrow-prev\" title=\"Previous image\"\u003e
             \u003ci class=\"fas fa-chevron-left\"\u003e\u003c/i\u003e
         \u003c/button\u003e
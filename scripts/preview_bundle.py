@@ -0,0 +1,126 @@
+# -*- coding: UTF-8 -*-
+"""
+Preview Bundle Module
+Several preview images in one response (JSON offset map + concatenated
+image bytes), so a screenful of grid cards loads with one or two requests
+instead of one per card
+"""
+
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+import json_codec
+
+logger = logging.getLogger(__name__)
+
+# Per-bundle limits; previews left out are loaded one by one by the client
+MAX_BUNDLE_MEMBERS = 64
+MAX_BUNDLE_BYTES = 32 * 1024 * 1024
+
+# Preview file contents kept in memory across bundles
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+
+IMAGE_TYPES = {
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.webp': 'image/webp',
+    '.gif': 'image/gif'
+}
+
+
+class PreviewCache:
+    """
+    LRU of preview file contents, keyed by path
+
+    Entries are checked against the file's mtime and size on every use, so
+    a changed preview is read again and the rest of a bundle comes from
+    memory. Files larger than an eighth of the budget are not cached.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def read(self, path, stat):
+        """Return the contents of path, whose current os.stat() result is stat"""
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(path)
+                return entry[1]
+
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) != stat.st_size or len(data) > self.max_bytes // 8:
+            return data
+
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self._total -= len(old[1])
+            self._entries[path] = (version, data)
+            self._total += len(data)
+            while self._total > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._total -= len(evicted)
+        return data
+
+
+class PreviewBundle:
+    """
+    One bundle response for a list of (url, path) previews
+
+    The ETag is derived from the members' mtimes and sizes, so an unchanged
+    bundle can be answered with 304 before any file is read.
+
+    Body layout: one line of JSON {"members": [{"url", "offset", "length",
+    "type"}, ...]} followed by the image bytes; offsets count from the end
+    of that line. Missing files and members past MAX_BUNDLE_BYTES are left
+    out of the map.
+    """
+
+    def __init__(self, members):
+        self.members = []
+        total = 0
+        for url, path in members[:MAX_BUNDLE_MEMBERS]:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if self.members and total + stat.st_size > MAX_BUNDLE_BYTES:
+                break
+            total += stat.st_size
+            self.members.append((url, path, stat))
+
+        signature = hashlib.sha1()
+        for url, path, stat in self.members:
+            signature.update(f"{url}\0{stat.st_mtime_ns}\0{stat.st_size}\0".encode('utf-8', 'surrogateescape'))
+        self.etag = f'"{signature.hexdigest()}"'
+
+    def body(self, cache):
+        """Read the members (through a PreviewCache) and return the response body"""
+        entries = []
+        chunks = []
+        offset = 0
+        for url, path, stat in self.members:
+            try:
+                data = cache.read(path, stat)
+            except OSError as e:
+                logger.debug("Skipping preview %s: %s", path, e)
+                continue
+            entries.append({
+                'url': url,
+                'offset': offset,
+                'length': len(data),
+                'type': IMAGE_TYPES.get(os.path.splitext(path)[1].lower(), 'application/octet-stream')
+            })
+            chunks.append(data)
+            offset += len(data)
+        return b''.join([json_codec.dumps({'members': entries}), b'\n'] + chunks)
@@ -0,0 +1,201 @@
+# -*- coding: UTF-8 -*-
+"""
+Request Profiler Module
+Opt-in per-request profiling: wraps a handler call in cProfile (or a
+lightweight stack sampler) and keeps the captures in a profiles directory
+"""
+
+import os
+import sys
+import time
+import logging
+import threading
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+# Default capture location (next to manager.py)
+APP_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PROFILES_DIRECTORY = os.path.join(APP_DIRECTORY, 'profiles')
+
+# Capture file extensions
+PSTATS_EXTENSION = '.pstats'
+COLLAPSED_EXTENSION = '.collapsed'
+
+# Housekeeping limits
+MAX_PROFILES = 50
+SAMPLE_INTERVAL = 0.001
+
+# One capture at a time: requests run on their own threads, and Python's
+# profiler hooks do not support overlapping cProfile sessions
+_capture_lock = threading.Lock()
+
+
+def profile_call(func, label, mode='cprofile', directory=DEFAULT_PROFILES_DIRECTORY):
+    """
+    Run func() under a profiler and save the capture
+
+    Args:
+        func: Zero-argument callable to profile (usually the route handler)
+        label: Short description used in the capture filename (e.g. "GET /load-loras")
+        mode: 'cprofile' for deterministic .pstats output, 'sampling' for a
+              collapsed-stack file from the built-in sampler
+        directory: Where to write captures
+
+    Returns:
+        Whatever func() returns (unprofiled if another capture is running)
+    """
+    if not _capture_lock.acquire(blocking=False):
+        logger.debug("Profiler busy, not profiling %s", label)
+        return func()
+    try:
+        return _profile_call(func, label, mode, directory)
+    finally:
+        _capture_lock.release()
+
+
+def _profile_call(func, label, mode, directory):
+    start = time.time()
+    if mode == 'sampling':
+        sampler = StackSampler(threading.get_ident())
+        sampler.start()
+        try:
+            return func()
+        finally:
+            sampler.stop()
+            _save_capture(directory, label, start, COLLAPSED_EXTENSION, sampler.write)
+    else:
+        # Profiling is opt-in, so the profiler modules are only loaded when used
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(func)
+        finally:
+            _save_capture(directory, label, start, PSTATS_EXTENSION, profiler.dump_stats)
+
+
+def _save_capture(directory, label, start, extension, writer):
+    """Write a capture via writer(path) and prune old captures; never raises"""
+    try:
+        os.makedirs(directory, exist_ok=True)
+        elapsed_ms = int((time.time() - start) * 1000)
+        safe_label = ''.join(c if c.isalnum() else '_' for c in label).strip('_')
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(start))
+        filename = f"{stamp}-{int(start * 1000) % 1000:03d}_{safe_label}_{elapsed_ms}ms{extension}"
+        path = os.path.join(directory, filename)
+        writer(path)
+        logger.info("Saved request profile: %s", path)
+        _prune_captures(directory)
+    except Exception as e:
+        logger.error("Error saving request profile: %s", e)
+
+
+def _prune_captures(directory, keep=MAX_PROFILES):
+    """Delete all but the newest `keep` captures"""
+    for old in list_captures(directory)[keep:]:
+        try:
+            os.remove(old['path'])
+        except OSError:
+            pass
+
+
+def list_captures(directory=DEFAULT_PROFILES_DIRECTORY):
+    """
+    List saved captures, newest first
+
+    Returns:
+        List of dicts: {path, name, size, modified}
+    """
+    captures = []
+    if not os.path.isdir(directory):
+        return captures
+    for entry in os.scandir(directory):
+        if entry.is_file() and entry.name.endswith((PSTATS_EXTENSION, COLLAPSED_EXTENSION)):
+            stat = entry.stat()
+            captures.append({
+                'path': entry.path,
+                'name': entry.name,
+                'size': stat.st_size,
+                'modified': stat.st_mtime
+            })
+    captures.sort(key=lambda c: c['modified'], reverse=True)
+    return captures
+
+
+def top_functions(path, limit=15):
+    """
+    Summarize a capture as its top-N functions by cumulative time/samples
+
+    Args:
+        path: Path to a .pstats or .collapsed capture
+        limit: Number of rows to return
+
+    Returns:
+        List of dicts: {function, calls, total, cumulative}. For sampled
+        captures, total/cumulative are sample counts and calls is None.
+    """
+    if path.endswith(COLLAPSED_EXTENSION):
+        inclusive = Counter()
+        exclusive = Counter()
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                stack, _, count = line.rstrip('\n').rpartition(' ')
+                if not stack or not count.isdigit():
+                    continue
+                frames = stack.split(';')
+                for frame in set(frames):
+                    inclusive[frame] += int(count)
+                exclusive[frames[-1]] += int(count)
+        return [
+            {'function': frame, 'calls': None, 'total': exclusive[frame], 'cumulative': samples}
+            for frame, samples in inclusive.most_common(limit)
+        ]
+
+    import pstats
+    stats = pstats.Stats(path)
+    rows = []
+    for (filename, lineno, name), (cc, nc, tt, ct, callers) in stats.stats.items():
+        rows.append({
+            'function': f"{os.path.basename(filename)}:{lineno}({name})",
+            'calls': nc,
+            'total': tt,
+            'cumulative': ct
+        })
+    rows.sort(key=lambda r: r['cumulative'], reverse=True)
+    return rows[:limit]
+
+
+class StackSampler:
+    """Samples one thread's Python stack on a timer and aggregates collapsed stacks"""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def write(self, path):
+        """Write stacks in the collapsed format understood by flamegraph tools"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
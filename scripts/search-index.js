@@ -0,0 +1,105 @@
+// search-index.js - Precomputed search text for the model list, with cached queries and results
+
+import { compileQuery, buildSearchText, matchesSearchText } from './search-parser.js';
+
+// Compiled queries kept for reuse (typing and deleting revisits the same queries)
+const MAX_CACHED_QUERIES = 100;
+// Recent results kept, to answer a repeated query at once and to narrow extended ones
+const MAX_CACHED_RESULTS = 16;
+
+// Map used as an LRU: move a hit to the end, drop the oldest entries past max
+function touch(cache, key, value, max) {
+    cache.delete(key);
+    cache.set(key, value);
+    while (cache.size > max) {
+        cache.delete(cache.keys().next().value);
+    }
+}
+
+// True if every match of query b also matches query a (b only adds to a's required strings)
+function narrows(a, b) {
+    return a.advanced === b.advanced && a.needles !== null && b.needles !== null &&
+        a.needles.every(needle => b.needles.some(other => other.includes(needle)));
+}
+
+/**
+ * Search text of every model in the list, matched without touching the models
+ *
+ * Used by search-worker.js, and directly when workers are not available.
+ * Results are indexes into the list passed to setModels().
+ */
+export class SearchIndex {
+    constructor() {
+        this.texts = [];
+        this.queries = new Map(); // query -> compileQuery() result
+        this.results = new Map(); // query -> {compiled, matches}
+    }
+
+    /**
+     * Replace the model list
+     * @param {Array<Array>} fieldLists - searchFields() of each model, in list order
+     */
+    setModels(fieldLists) {
+        this.texts = fieldLists.map(buildSearchText);
+        this.results.clear();
+    }
+
+    /**
+     * Update one model after its metadata was edited
+     * @param {number} index - Position of the model in the list
+     * @param {Array} fields - searchFields() of the model
+     */
+    updateModel(index, fields) {
+        this.texts[index] = buildSearchText(fields);
+        this.results.clear();
+    }
+
+    /**
+     * Find the models matching a query
+     *
+     * When an earlier result is for a query this one only narrows (the user
+     * typed more), only that result's models are checked.
+     * @param {string} query - Search query (see search-parser.js)
+     * @returns {Uint32Array} Indexes of the matching models, in list order
+     */
+    search(query) {
+        const cached = this.results.get(query);
+        if (cached) {
+            touch(this.results, query, cached, MAX_CACHED_RESULTS);
+            return cached.matches;
+        }
+
+        let compiled = this.queries.get(query);
+        if (!compiled) {
+            compiled = compileQuery(query);
+        }
+        touch(this.queries, query, compiled, MAX_CACHED_QUERIES);
+
+        let candidates = null;
+        this.results.forEach(result => {
+            if (narrows(result.compiled, compiled) && (!candidates || result.matches.length < candidates.length)) {
+                candidates = result.matches;
+            }
+        });
+
+        const texts = this.texts;
+        const found = [];
+        if (candidates) {
+            for (const index of candidates) {
+                if (matchesSearchText(compiled, texts[index])) {
+                    found.push(index);
+                }
+            }
+        } else {
+            for (let index = 0; index < texts.length; index++) {
+                if (matchesSearchText(compiled, texts[index])) {
+                    found.push(index);
+                }
+            }
+        }
+
+        const matches = Uint32Array.from(found);
+        touch(this.results, query, { compiled, matches }, MAX_CACHED_RESULTS);
+        return matches;
+    }
+}
@@ -229,159 +229,183 @@ function parseTokens(tokens) {
     return parseExpression();
 }
 
-// Evaluate a search expression against a model
-function evaluateExpression(expr, model) {
+// Queries with any of these characters use the full syntax above; others are
+// matched as one plain string against the name, filename and category
+const ADVANCED_SYNTAX = /["!|<>]/;
+
+// Fields a plain query looks at (the first entries of searchFields)
+const BASIC_FIELD_COUNT = 3;
+
+// Separates fields in the search text (a query cannot contain it, so no match spans two fields)
+const FIELD_SEPARATOR = '\0';
+
+/**
+ * Searchable fields of a model, the basic fields first
+ * @param {Object} model - Model from the model list
+ * @returns {Array} Field values (may be empty or missing)
+ */
+export function searchFields(model) {
+    return [
+        // Basic fields
+        model.name,
+        model.filename,
+        model.category,
+        model.baseModel,
+
+        // JSON fields
+        model.json?.['civitai name'],
+        model.json?.['subcategory'],
+        model.json?.['folder'],
+        model.json?.['creator'],
+        model.json?.['tags'],
+        model.json?.['activation text'],
+        model.json?.['negative text'],
+        model.json?.['civitai text'],
+        model.json?.['description'],
+        model.json?.['example prompt'],
+
+        // Path
+        model.path
+    ];
+}
+
+/**
+ * Lowercased search text of a model, built once and matched by every query
+ * @param {Array} fields - Result of searchFields()
+ * @returns {{basic: string, all: string}} Text of the basic fields and of all fields
+ */
+export function buildSearchText(fields) {
+    const normalize = values => values
+        .filter(value => value)
+        .map(value => String(value).toLowerCase())
+        .join(FIELD_SEPARATOR);
+    return {
+        basic: normalize(fields.slice(0, BASIC_FIELD_COUNT)),
+        all: normalize(fields)
+    };
+}
+
+// Lowercase the terms of a parsed expression once, instead of per model
+function compileExpression(expr) {
+    if (!expr) {
+        return null;
+    }
+
+    switch (expr.type) {
+        case 'AND':
+        case 'OR':
+            return { type: expr.type, left: compileExpression(expr.left), right: compileExpression(expr.right) };
+
+        case 'NOT':
+            return { type: 'NOT', expr: compileExpression(expr.expr) };
+
+        case 'TERM':
+            // A term with spaces (inside < >) needs each of its words
+            return {
+                type: 'TERM',
+                words: expr.value.toLowerCase().split(' ').map(word => word.trim()).filter(word => word !== '')
+            };
+
+        case 'EXACT':
+            return { type: 'EXACT', value: expr.value.toLowerCase() };
+
+        default:
+            return expr;
+    }
+}
+
+// Strings that must all occur in a match, if the expression is only ANDed terms (null otherwise)
+function conjunctionNeedles(expr) {
+    if (!expr) {
+        return [];
+    }
+
+    switch (expr.type) {
+        case 'AND':
+            const left = conjunctionNeedles(expr.left);
+            const right = conjunctionNeedles(expr.right);
+            return left && right ? [...left, ...right] : null;
+
+        case 'TERM':
+            return expr.words;
+
+        case 'EXACT':
+            return [expr.value];
+
+        default:
+            return null;
+    }
+}
+
+/**
+ * Parse a search query into the form matchesSearchText() evaluates
+ *
+ * needles lists the strings every match contains when the query is only
+ * ANDed terms: a query whose needles each contain one of an earlier query's
+ * needles matches a subset of that query's results.
+ * @param {string} query - Search query
+ * @returns {{advanced: boolean, expr: Object|null, needles: Array<string>|null}}
+ */
+export function compileQuery(query) {
+    if (!ADVANCED_SYNTAX.test(query)) {
+        const needle = query.toLowerCase();
+        return { advanced: false, expr: null, needles: [needle] };
+    }
+
+    const expr = compileExpression(parseTokens(tokenizeQuery(query)));
+    return { advanced: true, expr, needles: conjunctionNeedles(expr) };
+}
+
+// Evaluate a compiled expression against the search text of a model
+function evaluateExpression(expr, text) {
     if (!expr) {
         return true;
     }
-    
+
     switch (expr.type) {
         case 'AND':
-            return evaluateExpression(expr.left, model) && evaluateExpression(expr.right, model);
-        
+            return evaluateExpression(expr.left, text) && evaluateExpression(expr.right, text);
+
         case 'OR':
-            return evaluateExpression(expr.left, model) || evaluateExpression(expr.right, model);
-        
+            return evaluateExpression(expr.left, text) || evaluateExpression(expr.right, text);
+
         case 'NOT':
             // For NOT operator, we need to ensure the term is actually excluded
-            return !evaluateExpression(expr.expr, model);
-        
+            return !evaluateExpression(expr.expr, text);
+
         case 'TERM':
-            return searchInModel(model, expr.value, false);
-        
+            return expr.words.every(word => text.includes(word));
+
         case 'EXACT':
-            return searchInModel(model, expr.value, true);
-        
+            return text.includes(expr.value);
+
         default:
             return false;
     }
 }
 
-// Search for a term in a model's searchable fields
-function searchInModel(model, term, exactMatch) {
-    const searchTerm = term.toLowerCase();
-    
-    // Define all searchable fields in the model
-    const searchableFields = [
-        // Basic fields
-        { value: model.name, weight: 10 },
-        { value: model.filename, weight: 10 },
-        { value: model.category, weight: 8 },
-        { value: model.baseModel, weight: 7, exactMatch: true },
-        
-        // JSON fields
-        { value: model.json?.['civitai name'], weight: 8 },
-        { value: model.json?.['subcategory'], weight: 7 },
-        { value: model.json?.['folder'], weight: 6 },
-        { value: model.json?.['creator'], weight: 8, exactMatch: true },
-        { value: model.json?.['tags'], weight: 9 },
-        { value: model.json?.['activation text'], weight: 5 },
-        { value: model.json?.['negative text'], weight: 5 },
-        { value: model.json?.['civitai text'], weight: 5 },
-        { value: model.json?.['description'], weight: 6 },
-        { value: model.json?.['example prompt'], weight: 5 },
-        
-        // Path
-        { value: model.path, weight: 4 }
-    ];
-    
-    // For exact matching, we need the exact phrase in at least one field
-    if (exactMatch) {
-        return searchableFields.some(field => {
-            if (!field.value) return false;
-            const fieldValue = String(field.value).toLowerCase();
-            
-            // For fields that need exact matching (like baseModel)
-            if (field.exactMatch) {
-                // First try exact match
-                if (fieldValue === searchTerm) {
-                    return true;
-                }
-                // Then try as part of comma-separated list
-                if (fieldValue.includes(',')) {
-                    if (fieldValue.split(',').some(part => part.trim() === searchTerm)) {
-                        return true;
-                    }
-                }
-                // Finally, allow partial matches for these fields too
-                return fieldValue.includes(searchTerm);
-            }
-            
-            return fieldValue.includes(searchTerm);
-        });
-    }
-    
-    // If the term contains spaces, we treat it as a space-separated list of terms that should all match (AND operation)
-    if (searchTerm.includes(' ')) {
-        // Split the search term into individual words
-        const searchWords = searchTerm.split(' ')
-            .filter(word => word.trim() !== '');
-            
-        // Check if all individual words exist in any of the model's fields
-        // This is the proper implementation of AND - all terms must match
-        return searchWords.every(word => {
-            // For each word, check if it exists in any field
-            return searchableFields.some(field => {
-                if (!field.value) return false;
-                const fieldValue = String(field.value).toLowerCase();
-                
-                // For fields that need exact matching (like baseModel)
-                if (field.exactMatch) {
-                    // First try exact match
-                    if (fieldValue === word.trim()) {
-                        return true;
-                    }
-                    // Then try as part of comma-separated list
-                    if (fieldValue.includes(',')) {
-                        if (fieldValue.split(',').some(part => part.trim() === word.trim())) {
-                            return true;
-                        }
-                    }
-                    // Finally, allow partial matches for these fields too
-                    return fieldValue.includes(word.trim());
-                }
-                
-                return fieldValue.includes(word.trim());
-            });
-        });
+/**
+ * Check a model's search text against a compiled query
+ * @param {Object} compiled - Result of compileQuery()
+ * @param {{basic: string, all: string}} searchText - Result of buildSearchText()
+ * @returns {boolean} True if the model matches
+ */
+export function matchesSearchText(compiled, searchText) {
+    if (!compiled.advanced) {
+        return searchText.basic.includes(compiled.needles[0]);
     }
-    
-    // For single-word terms, check if it exists in any field
-    return searchableFields.some(field => {
-        if (!field.value) return false;
-        
-        // For fields that need exact matching (like baseModel and creator)
-        if (field.exactMatch) {
-            // Check for exact match or as part of a comma-separated list
-            const fieldValue = String(field.value).toLowerCase();
-            // First try exact match
-            if (fieldValue === searchTerm) {
-                return true;
-            }
-            // Then try as part of comma-separated list
-            if (fieldValue.includes(',')) {
-                return fieldValue.split(',').some(part => part.trim() === searchTerm);
-            }
-            // Finally, allow partial matches for these fields too
-            return fieldValue.includes(searchTerm);
-        }
-        
-        // For regular fields, use includes
-        return String(field.value).toLowerCase().includes(searchTerm);
-    });
+    return evaluateExpression(compiled.expr, searchText.all);
 }
 
-
 // Main function to filter models based on search query
 export function filterModelsByQuery(models, query) {
     if (!query || query.trim() === '') {
         return models; // Return all models if no query
     }
-    
+
     // Tokenize and parse the query
-    const tokens = tokenizeQuery(query);
-    const expr = parseTokens(tokens);
-    
+    const expr = compileExpression(parseTokens(tokenizeQuery(query)));
+
     // Filter models based on the expression
-    return models.filter(model => evaluateExpression(expr, model));
-}
\ No newline at end of file
+    return models.filter(model => evaluateExpression(expr, buildSearchText(searchFields(model)).all));
+}
@@ -0,0 +1,19 @@
+// search-worker.js - Web Worker running the model search (see model-search.js)
+
+import { SearchIndex } from './search-index.js';
+
+const index = new SearchIndex();
+
+self.onmessage = ({ data }) => {
+    switch (data.type) {
+        case 'models':
+            index.setModels(data.fields);
+            break;
+        case 'update':
+            index.updateModel(data.index, data.fields);
+            break;
+        case 'search':
+            self.postMessage({ id: data.id, matches: index.search(data.query) });
+            break;
+    }
+};
@@ -0,0 +1,561 @@
+# -*- coding: UTF-8 -*-
+"""
+Search Index Module
+Server-side implementation of the search-parser.js query grammar, evaluated
+against an inverted index of the model records instead of scanning them
+"""
+
+import re
+import math
+import heapq
+import logging
+import threading
+from array import array
+from collections import OrderedDict, defaultdict
+
+logger = logging.getLogger(__name__)
+
+# Fields searched by substring, with their ranking weights (as in
+# searchInModel() in search-parser.js). Record attributes are given by name,
+# sidecar .json fields as ('json', key).
+SEARCH_FIELDS = (
+    ('name', 10),
+    ('filename', 10),
+    ('category', 8),
+    (('json', 'civitai name'), 8),
+    (('json', 'subcategory'), 7),
+    (('json', 'folder'), 6),
+    (('json', 'tags'), 9),
+    (('json', 'activation text'), 5),
+    (('json', 'negative text'), 5),
+    (('json', 'civitai text'), 5),
+    (('json', 'description'), 6),
+    (('json', 'example prompt'), 5),
+    ('path', 4)
+)
+
+# Fields with the "exactMatch" rules of search-parser.js (whole value or
+# comma-separated part for single words)
+EXACT_MATCH_FIELDS = (
+    ('base_model', 7),
+    (('json', 'creator'), 8)
+)
+
+SORT_OPTIONS = ('relevance', 'name-asc', 'name-desc', 'date-newest', 'date-oldest', 'size-asc', 'size-desc')
+DEFAULT_SEARCH_LIMIT = 100
+
+# Vocabulary scans remembered per index (one entry per distinct query word)
+WORD_CACHE_SIZE = 256
+
+_WHITESPACE = re.compile(r'\s')
+
+
+def tokenize_query(query):
+    """
+    Split a query into tokens exactly like tokenizeQuery() in search-parser.js
+
+    Returns:
+        List of (type, value) tuples; type is TERM, EXACT, AND, OR, NOT,
+        GROUP_START or GROUP_END
+    """
+    if not query or query.strip() == '':
+        return []
+
+    tokens = []
+    current = ''
+    in_quotes = False
+    in_group = False
+    group_depth = 0
+
+    def flush(token_type='TERM'):
+        nonlocal current
+        if current.strip():
+            tokens.append((token_type, current.strip()))
+        current = ''
+
+    for i, char in enumerate(query):
+        # Handle quotes for exact phrase matching
+        if char == '"':
+            flush('EXACT' if in_quotes else 'TERM')
+            in_quotes = not in_quotes
+            continue
+
+        if in_quotes:
+            current += char
+            continue
+
+        # Handle grouping with < >
+        if char == '<':
+            flush()
+            in_group = True
+            group_depth += 1
+            tokens.append(('GROUP_START', None))
+            continue
+
+        if char == '>':
+            flush()
+            group_depth -= 1
+            if group_depth == 0:
+                in_group = False
+            tokens.append(('GROUP_END', None))
+            continue
+
+        if not in_group and char == '|':
+            flush()
+            tokens.append(('OR', None))
+            continue
+
+        if not in_group and char == '!':
+            flush()
+            tokens.append(('NOT', None))
+            continue
+
+        # Spaces are AND unless the next character is an operator
+        if not in_group and char == ' ':
+            flush()
+            next_char = query[i + 1] if i + 1 < len(query) else None
+            if tokens and next_char and next_char not in '|!<>':
+                tokens.append(('AND', None))
+            continue
+
+        current += char
+
+    flush()
+    return tokens
+
+
+def parse_query(query):
+    """
+    Parse a query into an expression tree like parseTokens() in search-parser.js
+
+    Returns:
+        None (matches everything) or a nested tuple: ('AND', left, right),
+        ('OR', left, right), ('NOT', expr), ('TERM', value), ('EXACT', value)
+    """
+    tokens = tokenize_query(query)
+    if not tokens:
+        return None
+    position = 0
+
+    def parse_expression():
+        nonlocal position
+        left = parse_term()
+        while position < len(tokens):
+            token_type = tokens[position][0]
+            if token_type in ('AND', 'OR'):
+                position += 1
+                left = (token_type, left, parse_term())
+            elif token_type == 'NOT':
+                position += 1
+                left = ('AND', left, ('NOT', parse_term()))
+            else:
+                break
+        return left
+
+    def parse_term():
+        nonlocal position
+        while position < len(tokens):
+            token_type, value = tokens[position]
+            position += 1
+            if token_type == 'NOT':
+                return ('NOT', parse_term())
+            if token_type == 'GROUP_START':
+                expr = parse_expression()
+                # A missing closing bracket is tolerated
+                if position < len(tokens) and tokens[position][0] == 'GROUP_END':
+                    position += 1
+                return expr
+            if token_type in ('TERM', 'EXACT'):
+                return (token_type, value)
+            # Skip unexpected tokens
+        return None
+
+    return parse_expression()
+
+
+def _js_truthy(value):
+    """Whether a field value passes the `if (!field.value)` check in JS"""
+    if value is None or value is False or value == '':
+        return False
+    if isinstance(value, (int, float)) and (value == 0 or (isinstance(value, float) and math.isnan(value))):
+        return False
+    return True
+
+
+def _js_string(value):
+    """String(value) as JavaScript would render a JSON value"""
+    if isinstance(value, str):
+        return value
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    if value is None:
+        return 'null'
+    if isinstance(value, float):
+        if value.is_integer() and abs(value) < 1e21:
+            return str(int(value))
+        return repr(value)
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, list):
+        return ','.join('' if item is None else _js_string(item) for item in value)
+    return '[object Object]'
+
+
+def _field_value(record, field):
+    if isinstance(field, tuple):
+        json_data = record.json
+        return json_data.get(field[1]) if isinstance(json_data, dict) else None
+    return getattr(record, field)
+
+
+def _field_text(record, field):
+    """Lowercased searchable text of one field, or None if JS would skip it"""
+    value = _field_value(record, field)
+    if isinstance(value, str):
+        return value.lower() if value else None
+    if not _js_truthy(value):
+        return None
+    return _js_string(value).lower()
+
+
+def _exact_word_match(field_value, word):
+    """Single-word matching of an exactMatch field (baseModel, creator)"""
+    if field_value == word:
+        return True
+    if ',' in field_value:
+        return any(part.strip() == word for part in field_value.split(','))
+    return word in field_value
+
+
+class SearchIndex:
+    """
+    Inverted index over one shard of ModelRecords
+
+    Every searchable field is split on whitespace; each distinct token maps
+    to the ordinals of the records containing it, grouped by the weight of
+    the best field it occurs in (for ranking). Because query words never
+    contain whitespace, a word is a substring of a field exactly when it is
+    a substring of one of the field's tokens, so substring matching reduces
+    to a scan of the vocabulary plus a union of postings. baseModel and
+    creator have few distinct values and are matched value by value.
+    """
+
+    def __init__(self, records):
+        self.records = records
+        self.size = len(records)
+        self.universe = frozenset(range(self.size))
+        self._orders = {}
+        self._texts = None
+        self._word_cache = OrderedDict()
+        # Request threads share the index; the scan itself runs outside the lock
+        self._word_cache_lock = threading.Lock()
+
+        # Lower weights first, so dict updates leave each token's best weight
+        fields_by_weight = sorted(SEARCH_FIELDS, key=lambda field: field[1])
+        by_weight = defaultdict(dict)
+        exact_values = [{} for _ in EXACT_MATCH_FIELDS]
+        for ordinal, record in enumerate(records):
+            token_weights = {}
+            for field, weight in fields_by_weight:
+                text = _field_text(record, field)
+                if text is not None:
+                    token_weights.update(dict.fromkeys(text.split(), weight))
+            for token, weight in token_weights.items():
+                postings = by_weight[token]
+                ordinals = postings.get(weight)
+                if ordinals is None:
+                    ordinals = postings[weight] = array('i')
+                ordinals.append(ordinal)
+            for values, (field, weight) in zip(exact_values, EXACT_MATCH_FIELDS):
+                text = _field_text(record, field)
+                if text is not None:
+                    values.setdefault(text, []).append(ordinal)
+
+        # token -> ordinals (all weights); token -> weight, or weight -> ordinals
+        # where a token occurs with several weights
+        self._postings = {}
+        self._weights = {}
+        for token, postings in by_weight.items():
+            if len(postings) == 1:
+                (weight, ordinals), = postings.items()
+                self._postings[token] = ordinals
+                self._weights[token] = weight
+            else:
+                self._postings[token] = array('i', sorted(ordinal for ordinals in postings.values() for ordinal in ordinals))
+                self._weights[token] = postings
+        self._exact_values = exact_values
+        # Newline-separated vocabulary for substring scans with str.find
+        self._vocabulary = '\n' + '\n'.join(self._postings) + '\n'
+        logger.debug("Search index built: %d models, %d tokens", self.size, len(self._postings))
+
+    # ----- Matching -----
+
+    def match(self, expr):
+        """Return the set of ordinals matching a parsed expression"""
+        if expr is None:
+            return self.universe
+        kind = expr[0]
+        if kind == 'AND':
+            left = self.match(expr[1])
+            return left & self.match(expr[2]) if left else left
+        if kind == 'OR':
+            return self.match(expr[1]) | self.match(expr[2])
+        if kind == 'NOT':
+            return self.universe - self.match(expr[1])
+        if kind == 'TERM':
+            return self._match_term(expr[1].lower())
+        if kind == 'EXACT':
+            return self._match_phrase(expr[1].lower())
+        return set()
+
+    def _match_term(self, term):
+        if ' ' not in term:
+            return self._match_word(term, exact_rules=True)
+        # Space-separated terms (from groups): every word must match somewhere
+        result = None
+        for word in term.split(' '):
+            word = word.strip()
+            if not word:
+                continue
+            matched = self._match_word(word, exact_rules=False)
+            result = matched if result is None else result & matched
+        return result if result is not None else set()
+
+    def _match_phrase(self, phrase):
+        if not _WHITESPACE.search(phrase):
+            return self._match_word(phrase, exact_rules=False)
+        # Narrow down with the pieces of the phrase, then check each candidate
+        candidates = None
+        for piece in phrase.split():
+            matched = self._match_word(piece, exact_rules=False)
+            candidates = matched if candidates is None else candidates & matched
+        return self._verify(candidates, phrase)
+
+    def _match_word(self, word, exact_rules):
+        """Ordinals where word is a substring of a field (exact_rules: single-word exactMatch rules)"""
+        if _WHITESPACE.search(word):
+            # Cannot be answered from whitespace-split tokens
+            return self._verify(self.universe, word, exact_rules)
+
+        result = set()
+        for token in self._tokens_containing(word):
+            result.update(self._postings[token])
+            if len(result) == self.size:
+                return result
+        for values in self._exact_values:
+            for value, ordinals in values.items():
+                if (_exact_word_match(value, word) if exact_rules else word in value):
+                    result.update(ordinals)
+        return result
+
+    def _tokens_containing(self, word):
+        with self._word_cache_lock:
+            cached = self._word_cache.get(word)
+            if cached is not None:
+                self._word_cache.move_to_end(word)
+                return cached
+
+        vocabulary = self._vocabulary
+        tokens = []
+        position = vocabulary.find(word)
+        while position != -1:
+            start = vocabulary.rfind('\n', 0, position) + 1
+            end = vocabulary.find('\n', position)
+            tokens.append(vocabulary[start:end])
+            position = vocabulary.find(word, end)
+
+        with self._word_cache_lock:
+            self._word_cache[word] = tokens
+            if len(self._word_cache) > WORD_CACHE_SIZE:
+                self._word_cache.popitem(last=False)
+        return tokens
+
+    def _verify(self, candidates, text, exact_rules=False):
+        """Check candidates directly against their field texts (where the token index cannot answer)"""
+        if exact_rules or '\n' in text:
+            return {ordinal for ordinal in candidates if self._record_contains(ordinal, text, exact_rules)}
+        texts = self._search_texts()
+        return {ordinal for ordinal in candidates if text in texts[ordinal]}
+
+    def _search_texts(self):
+        """All field texts of each record joined by newlines, built on first use"""
+        if self._texts is None:
+            fields = SEARCH_FIELDS + EXACT_MATCH_FIELDS
+            self._texts = [
+                '\n'.join(text for text in (_field_text(record, field) for field, weight in fields) if text is not None)
+                for record in self.records
+            ]
+        return self._texts
+
+    def _record_contains(self, ordinal, text, exact_rules=False):
+        record = self.records[ordinal]
+        for field, weight in SEARCH_FIELDS:
+            field_text = _field_text(record, field)
+            if field_text is not None and text in field_text:
+                return True
+        for field, weight in EXACT_MATCH_FIELDS:
+            field_text = _field_text(record, field)
+            if field_text is not None and (_exact_word_match(field_text, text) if exact_rules else text in field_text):
+                return True
+        return False
+
+    # ----- Ranking -----
+
+    def scores(self, expr, ordinals):
+        """
+        Relevance of each matched ordinal: for every positive term, the
+        weight of the best field it occurs in, summed over terms
+        """
+        totals = None
+        for word in _positive_words(expr):
+            if _WHITESPACE.search(word):
+                continue
+            # Group postings by weight and apply them lowest first, so each
+            # ordinal ends up with its best weight
+            groups = {}
+            for token in self._tokens_containing(word):
+                weights = self._weights[token]
+                if isinstance(weights, dict):
+                    for weight, token_ordinals in weights.items():
+                        groups.setdefault(weight, []).append(token_ordinals)
+                else:
+                    groups.setdefault(weights, []).append(self._postings[token])
+            for values, (field, weight) in zip(self._exact_values, EXACT_MATCH_FIELDS):
+                for value, value_ordinals in values.items():
+                    if word in value:
+                        groups.setdefault(weight, []).append(value_ordinals)
+            best = {}
+            for weight in sorted(groups):
+                for token_ordinals in groups[weight]:
+                    best.update(dict.fromkeys(token_ordinals, weight))
+
+            if totals is None:
+                totals = best
+            else:
+                for ordinal, weight in best.items():
+                    totals[ordinal] = totals.get(ordinal, 0) + weight
+        if totals is None:
+            return dict.fromkeys(ordinals, 0)
+        return {ordinal: totals.get(ordinal, 0) for ordinal in ordinals}
+
+    def ranked(self, scores):
+        """Ordinals by descending score, ties in name order"""
+        buckets = {}
+        for ordinal in self.order('name-asc'):
+            score = scores.get(ordinal)
+            if score is not None:
+                bucket = buckets.get(score)
+                if bucket is None:
+                    bucket = buckets[score] = []
+                bucket.append(ordinal)
+        return [ordinal for score in sorted(buckets, reverse=True) for ordinal in buckets[score]]
+
+    def order(self, sort):
+        """Ordinals sorted by a non-relevance sort option (cached)"""
+        if sort not in self._orders:
+            self._orders[sort] = sorted(range(self.size), key=self.sort_key(sort),
+                                        reverse=sort in ('name-desc', 'date-newest', 'size-desc'))
+        return self._orders[sort]
+
+    def sort_key(self, sort):
+        """Key function on ordinals for a sort option (ascending)"""
+        records = self.records
+        if sort in ('date-newest', 'date-oldest'):
+            return lambda ordinal: records[ordinal].date_modified
+        if sort in ('size-asc', 'size-desc'):
+            return lambda ordinal: records[ordinal].size
+        return lambda ordinal: records[ordinal].name.casefold()
+
+
+def _positive_words(expr, negated=False):
+    """Query words outside NOT, used for ranking"""
+    if expr is None:
+        return []
+    kind = expr[0]
+    if kind in ('AND', 'OR'):
+        return _positive_words(expr[1], negated) + _positive_words(expr[2], negated)
+    if kind == 'NOT':
+        return _positive_words(expr[1], not negated)
+    if negated:
+        return []
+    value = expr[1].lower()
+    if kind == 'TERM':
+        return [word.strip() for word in value.split(' ') if word.strip()]
+    return [value]
+
+
+def match(indexes, query):
+    """
+    Evaluate a query across shard indexes
+
+    Returns:
+        List with the set of matching ordinals of each index
+    """
+    expr = parse_query(query)
+    return [index.match(expr) for index in indexes]
+
+
+def _sorted_stream(index, shard, ordinals, sort):
+    """Yield (sort key, shard, ordinal) for one shard's matches in sort order"""
+    key = index.sort_key(sort)
+    for ordinal in index.order(sort):
+        if ordinal in ordinals:
+            yield key(ordinal), shard, ordinal
+
+
+def search(indexes, query, sort='relevance', offset=0, limit=DEFAULT_SEARCH_LIMIT, include=None):
+    """
+    Evaluate a query across shard indexes and return one page of results
+
+    Args:
+        indexes: List of SearchIndex, in display order
+        query: Query string in the search-parser.js grammar
+        sort: One of SORT_OPTIONS ('relevance' falls back to 'name-asc'
+            for an empty query)
+        offset: Index of the first result to return
+        limit: Maximum number of results to return
+        include: Optional predicate on records applied before paging
+            (e.g. hiding NSFW models)
+
+    Returns:
+        (total, records) where total counts all matches
+    """
+    expr = parse_query(query)
+    if sort not in SORT_OPTIONS:
+        sort = 'relevance'
+    if sort == 'relevance' and expr is None:
+        sort = 'name-asc'
+
+    matches = []
+    for shard, index in enumerate(indexes):
+        ordinals = index.match(expr)
+        if include is not None:
+            ordinals = {ordinal for ordinal in ordinals if include(index.records[ordinal])}
+        matches.append(ordinals)
+    total = sum(len(ordinals) for ordinals in matches)
+    end = offset + limit
+
+    if sort == 'relevance':
+        if len(indexes) == 1:
+            ranked = indexes[0].ranked(indexes[0].scores(expr, matches[0]))[offset:end]
+            return total, [indexes[0].records[ordinal] for ordinal in ranked]
+        ranked = []
+        for shard, (index, ordinals) in enumerate(zip(indexes, matches)):
+            name_key = index.sort_key('name-asc')
+            ranked.extend((-score, name_key(ordinal), shard, ordinal) for ordinal, score in index.scores(expr, ordinals).items())
+        page = heapq.nsmallest(end, ranked)[offset:end]
+        return total, [indexes[shard].records[ordinal] for _, _, shard, ordinal in page]
+
+    # Walk each shard's presorted order, then merge shards
+    streams = [_sorted_stream(index, shard, ordinals, sort)
+               for shard, (index, ordinals) in enumerate(zip(indexes, matches))]
+    merged = heapq.merge(*streams, reverse=sort in ('name-desc', 'date-newest', 'size-desc'))
+    page = []
+    for position, (_, shard, ordinal) in enumerate(merged):
+        if position >= end:
+            break
+        if position >= offset:
+            page.append(indexes[shard].records[ordinal])
+    return total, page
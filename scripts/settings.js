@@ -182,9 +182,31 @@ class Settings {
     }
 }
 
+/**
+ * Format the modelsDirectory setting for display in a single text field
+ * @param {string|Array} modelsDirectory - One path, or a list of library roots
+ * @returns {string} Paths separated by "; "
+ */
+function formatModelsDirectory(modelsDirectory) {
+    if (Array.isArray(modelsDirectory)) {
+        return modelsDirectory.map(root => (typeof root === 'object' ? root.path : root)).join('; ');
+    }
+    return modelsDirectory || '';
+}
+
+/**
+ * Parse the settings text field back into the modelsDirectory setting
+ * @param {string} value - Paths separated by ";"
+ * @returns {string|Array} A single path, or a list when several are given
+ */
+function parseModelsDirectory(value) {
+    const paths = value.split(';').map(path => path.trim()).filter(path => path);
+    return paths.length > 1 ? paths : (paths[0] || '');
+}
+
 // Create a singleton instance
 const appSettings = new Settings();
 
 // Export the singleton and the Settings class
-export { Settings };
+export { Settings, formatModelsDirectory, parseModelsDirectory };
 export default appSettings;
\ No newline at end of file
@@ -0,0 +1,143 @@
+# -*- coding: UTF-8 -*-
+"""
+Settings Service Module
+Single in-memory copy of config.json: reloaded only when the file's mtime
+changes, written atomically, and broadcast to subscribers on change
+"""
+
+import os
+import copy
+import json
+import logging
+import threading
+
+from file_utils import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+# Written when config.json does not exist yet
+DEFAULT_SETTINGS = {
+    "modelsDirectory": "",
+    "theme": "dark",
+    "defaultView": "grid",
+    "defaultSort": "name-asc",
+    "hideNSFW": False,
+    "visibleColumns": {
+        "thumbnail": True,
+        "filename": True,
+        "civitaiName": True,
+        "baseModel": True,
+        "category": True,
+        "path": True,
+        "size": True,
+        "date": True,
+        "url": True,
+        "nsfw": True,
+        "positiveWords": True,
+        "negativeWords": True,
+        "authorsWords": True,
+        "description": True
+    }
+}
+
+
+class SettingsService:
+    """
+    Cached, thread-safe access to config.json
+
+    Subscribers are called as callback(old_settings, new_settings) whenever
+    the settings change, whether through save() or an external edit of the
+    file that is picked up on the next read.
+    """
+
+    def __init__(self, config_file, defaults=DEFAULT_SETTINGS):
+        self.config_file = config_file
+        self.defaults = defaults
+        self._lock = threading.RLock()
+        self._settings = None
+        self._mtime = None
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        """Register callback(old_settings, new_settings) for changes"""
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def get(self):
+        """
+        Return the current settings
+
+        The returned dict is shared; treat it as read-only and use save() to
+        change settings.
+        """
+        with self._lock:
+            self._reload_if_changed()
+            return self._settings
+
+    def get_setting(self, key, default=None):
+        """Return a single setting value"""
+        return self.get().get(key, default)
+
+    def save(self, data):
+        """
+        Atomically write new settings and notify subscribers
+
+        Args:
+            data: Complete settings dict to store
+
+        Returns:
+            True on success, False on error
+        """
+        with self._lock:
+            old_settings = self._settings
+            try:
+                atomic_write_json(self.config_file, data, indent=2)
+                self._mtime = self._stat_mtime()
+            except Exception as e:
+                logger.error("Error saving settings to %s: %s", self.config_file, e)
+                return False
+            self._settings = copy.deepcopy(data)
+            self._notify(old_settings, self._settings)
+            return True
+
+    def _stat_mtime(self):
+        try:
+            return os.stat(self.config_file).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _reload_if_changed(self):
+        mtime = self._stat_mtime()
+        if self._settings is not None and mtime == self._mtime:
+            return
+
+        old_settings = self._settings
+        if mtime is None:
+            # Create default config file if it doesn't exist
+            logger.info("Creating default settings file: %s", self.config_file)
+            new_settings = copy.deepcopy(self.defaults)
+            try:
+                atomic_write_json(self.config_file, new_settings, indent=2)
+            except Exception as e:
+                logger.error("Error saving settings to %s: %s", self.config_file, e)
+            mtime = self._stat_mtime()
+        else:
+            try:
+                with open(self.config_file, 'r') as file:
+                    new_settings = json.load(file)
+                logger.debug("Loaded settings: %s", new_settings)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.error("Invalid JSON format in %s (%s). Keeping previous settings.", self.config_file, e)
+                new_settings = old_settings if old_settings is not None else {"modelsDirectory": ""}
+
+        self._settings = new_settings
+        self._mtime = mtime
+        if old_settings is not None and old_settings != new_settings:
+            self._notify(old_settings, new_settings)
+
+    def _notify(self, old_settings, new_settings):
+        for callback in list(self._subscribers):
+            try:
+                callback(old_settings or {}, new_settings)
+            except Exception as e:
+                logger.error("Settings subscriber %r failed: %s", callback, e)
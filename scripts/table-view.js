@@ -1,7 +1,10 @@
 // table-view.js - Handles table view display and functionality
 
 // Import settings manager
-import appSettings from './settings.js';
+import appSettings, { formatModelsDirectory } from './settings.js';
+import { createLazyImageObserver } from './preview-bundles.js';
+import { previewPlaceholder } from './preview-carousel.js';
+import { VirtualList, clearVirtualLists, updateVirtualLists } from './virtual-list.js';
 
 // Function to display models in table view
 
@@ -126,6 +129,8 @@ export function displayTableView(models, container, openModelDetails, settings)
         return;
     }
     container.className = 'table-view-container';
+    container.onclick = null;
+    clearVirtualLists();
 
     if (!Array.isArray(models)) {
         console.error('Models must be an array');
@@ -286,11 +291,13 @@ export function displayTableView(models, container, openModelDetails, settings)
     container.appendChild(infoBox);
 
     // Initial table body
-    displayTableBody(models, table, openModelDetails, columns);
     container.appendChild(table);
+    displayTableBody(models, table, openModelDetails, columns);
 }
 
 function displayTableBody(models, table, openModelDetails, columns) {
+    clearVirtualLists();
+
     // Remove existing tbody if it exists
     const existingTbody = table.querySelector('tbody');
     if (existingTbody) {
@@ -299,158 +306,182 @@ function displayTableBody(models, table, openModelDetails, columns) {
 
     // Create new tbody
     const tbody = document.createElement('tbody');
+    table.appendChild(tbody);
 
-    // Create and setup Intersection Observer for lazy loading
-    const imageObserver = new IntersectionObserver((entries, observer) => {
-        entries.forEach(entry => {
-            if (entry.isIntersecting) {
-                const img = entry.target;
-                const dataSrc = img.getAttribute('data-src');
-                if (dataSrc) {
-                    img.src = dataSrc;
-                    img.removeAttribute('data-src');
-                    img.classList.remove('lazy-image');
-                    img.classList.add('loaded');
-                }
-                observer.unobserve(img);
-            }
-        });
-    }, {
-        rootMargin: '100px 0px', // Start loading images when they're 100px from viewport
-        threshold: 0.1
+    // Lazy loading: visible previews are fetched in bundles (see preview-bundles.js)
+    const imageObserver = createLazyImageObserver();
+
+    // Only the rows near the viewport are in the DOM (see virtual-list.js)
+    const list = new VirtualList(tbody, models, {
+        kind: 'table-row',
+        renderItem: (model, index, row) => renderTableRow(model, row, columns, imageObserver),
+        createSpacer: () => {
+            const row = document.createElement('tr');
+            row.className = 'virtual-spacer';
+            const cell = document.createElement('td');
+            cell.colSpan = columns.length;
+            row.appendChild(cell);
+            return row;
+        },
+        setSpacerHeight: (row, height) => {
+            row.firstChild.style.height = `${height}px`;
+        }
     });
 
-    models.forEach(model => {
-        const row = document.createElement('tr');
-        row.dataset.id = model.id;
+    // One click handler for all rows, since rows are recycled while scrolling
+    tbody.addEventListener('click', (event) => {
+        const model = list.itemForNode(event.target.closest('tr'));
+        if (model) {
+            openModelDetails(model);
+        }
+    });
 
-        // Add cells based on visible columns
-        columns.forEach(column => {
-            const cell = document.createElement('td');
+    updateVirtualLists();
+}
 
-            switch (column) {
-                case 'Preview':
-                    const thumbnail = document.createElement('div');
-                    thumbnail.className = 'thumbnail';
-                    const img = document.createElement('img');
-                    img.src = '/assets/placeholder.png';
-                    img.setAttribute('data-src', model.previewUrl || '/assets/placeholder.png');
-                    img.alt = model.filename;
-                    img.className = 'lazy-image';
-                    thumbnail.appendChild(img);
-                    cell.appendChild(thumbnail);
-                    // Observe the image for lazy loading
-                    imageObserver.observe(img);
-                    break;
-                case 'Filename':
-                    cell.textContent = model.filename.replace(/\.safetensors$/i, '');
-                    break;
-                case 'Civitai Name':
-                    cell.textContent = model.json?.['civitai name'] || '';
-                    break;
-                case 'Base Model':
-                    cell.textContent = model.baseModel || 'Unknown';
-                    break;
-                case 'Category':
-                    cell.textContent = model.category || 'Uncategorized';
-                    break;
-                case 'Path':
-                    // Simplify path display to show just the folder structure
-                    const fullPath = model.path.replace(/\\/g, '/');
-                    // Get the directory part of the path (remove filename)
-                    const pathDir = fullPath.substring(0, fullPath.lastIndexOf('/'));
-
-                    // Get the models directory from settings
-                    const modelsDir = appSettings.getSetting('modelsDirectory').replace(/\\/g, '/');
-
-                    // Create relative path by removing the models directory prefix
-                    let relativePath = pathDir;
-                    if (modelsDir && pathDir.startsWith(modelsDir)) {
-                        relativePath = pathDir.substring(modelsDir.length);
-                        // Remove leading slash if present
-                        if (relativePath.startsWith('/')) {
-                            relativePath = relativePath.substring(1);
-                        }
-                    }
+/**
+ * Fill a table row (a recycled one, or a new one if row is null)
+ * @param {Object} model - Model to show
+ * @param {HTMLTableRowElement|null} row - Row element to reuse
+ * @param {Array<string>} columns - Visible columns in display order
+ * @param {IntersectionObserver} imageObserver - Lazy loader for the preview thumbnails
+ * @returns {HTMLTableRowElement} The row
+ */
+function renderTableRow(model, row, columns, imageObserver) {
+    if (row) {
+        row.querySelectorAll('.lazy-image').forEach(img => imageObserver.unobserve(img));
+        row.replaceChildren();
+    } else {
+        row = document.createElement('tr');
+    }
+    row.dataset.id = model.id;
 
-                    cell.textContent = relativePath || 'Root';
-                    break;
-                case 'Size':
-                    cell.textContent = formatFileSize(model.size);
-                    break;
-                case 'Date':
-                    cell.textContent = new Date(model.dateModified * 1000).toLocaleDateString();
-                    break;
-                case 'URL':
-                    cell.className = 'url-cell';
-                    // Check for URL in civitaiInfo first, then in model.json
-                    const modelUrl = model.civitaiInfo?.modelUrl || model.json?.url || '';
-                    if (modelUrl) {
-                        const link = document.createElement('a');
-                        link.href = modelUrl;
-                        link.target = '_blank';
-                        // Add both icon and text for better visibility
-                        const icon = document.createElement('i');
-                        icon.className = 'fas fa-external-link-alt';
-                        icon.title = 'View on Civitai';
-                        link.appendChild(icon);
-                        link.appendChild(document.createTextNode(' Civitai'));
-                        cell.appendChild(link);
+    // Add cells based on visible columns
+    columns.forEach(column => {
+        const cell = document.createElement('td');
+
+        switch (column) {
+            case 'Preview':
+                const thumbnail = document.createElement('div');
+                thumbnail.className = 'thumbnail';
+                const img = document.createElement('img');
+                img.src = previewPlaceholder(model);
+                img.setAttribute('data-src', model.previewUrl || '/assets/placeholder.png');
+                img.alt = model.filename;
+                img.className = img.src.startsWith('data:') ? 'lazy-image lqip' : 'lazy-image';
+                thumbnail.appendChild(img);
+                cell.appendChild(thumbnail);
+                // Observe the image for lazy loading
+                imageObserver.observe(img);
+                break;
+            case 'Filename':
+                cell.textContent = model.filename.replace(/\.safetensors$/i, '');
+                break;
+            case 'Civitai Name':
+                cell.textContent = model.json?.['civitai name'] || '';
+                break;
+            case 'Base Model':
+                cell.textContent = model.baseModel || 'Unknown';
+                break;
+            case 'Category':
+                cell.textContent = model.category || 'Uncategorized';
+                break;
+            case 'Path':
+                // Simplify path display to show just the folder structure
+                const fullPath = model.path.replace(/\\/g, '/');
+                // Get the directory part of the path (remove filename)
+                const pathDir = fullPath.substring(0, fullPath.lastIndexOf('/'));
+
+                // Get the models directory from settings
+                const modelsDir = formatModelsDirectory(appSettings.getSetting('modelsDirectory')).replace(/\\/g, '/');
+
+                // Create relative path by removing the models directory prefix
+                // (the server reports it directly when models span several library roots)
+                let relativePath = pathDir;
+                if (model.relativeDir !== undefined) {
+                    relativePath = model.relativeDir;
+                } else if (modelsDir && pathDir.startsWith(modelsDir)) {
+                    relativePath = pathDir.substring(modelsDir.length);
+                    // Remove leading slash if present
+                    if (relativePath.startsWith('/')) {
+                        relativePath = relativePath.substring(1);
                     }
-                    break;
-                case 'NSFW':
-                    cell.textContent = model.json?.['nsfw'] === 'true' ? 'Yes' : 'No';
-                    break;
-                case 'Positive Words':
-                    cell.textContent = model.json?.['activation text'] || '';
-                    break;
-                case 'Negative Words':
-                    cell.textContent = model.json?.['negative text'] || '';
-                    break;
-                case "Civitai Words":
-                    cell.textContent = model.json?.['civitai text'] || '';
-                    break;
-                case 'Description':
-                    const desc = model.json?.['description'] || '';
-                    cell.textContent = desc.length > 50 ? `${desc.substring(0, 50)}...` : desc;
-                    break;
-                case 'Folder':
-                    cell.textContent = model.json?.['folder'] || '';
-                    break;
-                case 'Subcategory':
-                    cell.textContent = model.json?.['subcategory'] || '';
-                    break;
-                case 'Creator':
-                    cell.textContent = model.json?.['creator'] || '';
-                    break;
-                case 'Example Prompt':
-                    const prompt = model.json?.['example prompt'] || '';
-                    cell.textContent = prompt.length > 50 ? `${prompt.substring(0, 50)}...` : prompt;
-                    break;
-                case 'Tags':
-                    cell.textContent = model.json?.['tags'] || '';
-                    break;
-                case 'Notes':
-                    const notes = model.json?.['notes'] || '';
-                    cell.textContent = notes.length > 50 ? `${notes.substring(0, 50)}...` : notes;
-                    break;
-                case 'Model Name':
-                    cell.textContent = model.json?.['name'] || '';
-                    break;
-                case 'Model Version':
-                    cell.textContent = model.json?.['model version'] || '';
-                    break;
-                case 'High/Low':
-                    cell.textContent = model.json?.['high low'] || '';
-                    break;
-            }
+                }
 
-            row.appendChild(cell);
-        });
+                cell.textContent = relativePath || 'Root';
+                break;
+            case 'Size':
+                cell.textContent = formatFileSize(model.size);
+                break;
+            case 'Date':
+                cell.textContent = new Date(model.dateModified * 1000).toLocaleDateString();
+                break;
+            case 'URL':
+                cell.className = 'url-cell';
+                // Check for URL in civitaiInfo first, then in model.json
+                const modelUrl = model.civitaiInfo?.modelUrl || model.json?.url || '';
+                if (modelUrl) {
+                    const link = document.createElement('a');
+                    link.href = modelUrl;
+                    link.target = '_blank';
+                    // Add both icon and text for better visibility
+                    const icon = document.createElement('i');
+                    icon.className = 'fas fa-external-link-alt';
+                    icon.title = 'View on Civitai';
+                    link.appendChild(icon);
+                    link.appendChild(document.createTextNode(' Civitai'));
+                    cell.appendChild(link);
+                }
+                break;
+            case 'NSFW':
+                cell.textContent = model.json?.['nsfw'] === 'true' ? 'Yes' : 'No';
+                break;
+            case 'Positive Words':
+                cell.textContent = model.json?.['activation text'] || '';
+                break;
+            case 'Negative Words':
+                cell.textContent = model.json?.['negative text'] || '';
+                break;
+            case "Civitai Words":
+                cell.textContent = model.json?.['civitai text'] || '';
+                break;
+            case 'Description':
+                const desc = model.json?.['description'] || '';
+                cell.textContent = desc.length > 50 ? `${desc.substring(0, 50)}...` : desc;
+                break;
+            case 'Folder':
+                cell.textContent = model.json?.['folder'] || '';
+                break;
+            case 'Subcategory':
+                cell.textContent = model.json?.['subcategory'] || '';
+                break;
+            case 'Creator':
+                cell.textContent = model.json?.['creator'] || '';
+                break;
+            case 'Example Prompt':
+                const prompt = model.json?.['example prompt'] || '';
+                cell.textContent = prompt.length > 50 ? `${prompt.substring(0, 50)}...` : prompt;
+                break;
+            case 'Tags':
+                cell.textContent = model.json?.['tags'] || '';
+                break;
+            case 'Notes':
+                const notes = model.json?.['notes'] || '';
+                cell.textContent = notes.length > 50 ? `${notes.substring(0, 50)}...` : notes;
+                break;
+            case 'Model Name':
+                cell.textContent = model.json?.['name'] || '';
+                break;
+            case 'Model Version':
+                cell.textContent = model.json?.['model version'] || '';
+                break;
+            case 'High/Low':
+                cell.textContent = model.json?.['high low'] || '';
+                break;
+        }
 
-        row.addEventListener('click', () => openModelDetails(model));
-        tbody.appendChild(row);
+        row.appendChild(cell);
     });
 
-    table.appendChild(tbody);
+    return row;
 }
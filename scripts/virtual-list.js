@@ -0,0 +1,209 @@
+// virtual-list.js - Windowed rendering: only the rows near the viewport are in the DOM
+
+// Rows rendered above and below the visible ones
+const OVERSCAN_ROWS = 3;
+// Rows rendered to measure a kind of item (table rows differ in height, so several are averaged)
+const PROBE_ROWS = 4;
+
+// Every list on the page, updated together once per animation frame
+const activeLists = new Set();
+// Measured item height per kind of item, shared by all lists of that kind (gaps differ per list)
+const rowHeights = new Map();
+let frameRequested = false;
+
+function requestUpdate() {
+    if (!frameRequested) {
+        frameRequested = true;
+        requestAnimationFrame(updateLists);
+    }
+}
+
+/**
+ * Update every list: all layout reads first, then all DOM writes, so a page
+ * with many lists (grouped grid) costs one layout per frame
+ */
+function updateLists() {
+    frameRequested = false;
+    const lists = [...activeLists];
+
+    // A kind without a known height is measured from the first list that renders a row of it
+    lists.forEach(list => list.measure());
+    const probing = new Set();
+    const plans = lists.map(list => {
+        const itemHeight = rowHeights.get(list.kind);
+        if (itemHeight || probing.has(list.kind) || list.items.length === 0) {
+            return list.plan(itemHeight);
+        }
+        probing.add(list.kind);
+        return list.probePlan();
+    });
+    lists.forEach((list, i) => list.render(plans[i]));
+
+    if (probing.size > 0) {
+        lists.forEach(list => list.measure());
+        // Lay out again with the measured heights (a hidden container measures nothing)
+        if ([...probing].some(kind => rowHeights.has(kind))) {
+            updateLists();
+        }
+    }
+}
+
+window.addEventListener('scroll', requestUpdate, { passive: true });
+window.addEventListener('resize', () => {
+    // Card and row sizes follow the viewport width (responsive columns, breakpoints)
+    rowHeights.clear();
+    requestUpdate();
+});
+
+/**
+ * Lay out every list now instead of on the next frame; views call this once
+ * after creating their lists, so the page has its full height (and keeps its
+ * scroll position) before it is painted
+ */
+export function updateVirtualLists() {
+    updateLists();
+}
+
+/**
+ * Remove all virtual lists, e.g. before a view renders the model list again
+ * (the next view may size its items differently, so heights are measured again)
+ */
+export function clearVirtualLists() {
+    activeLists.forEach(list => list.destroy());
+    activeLists.clear();
+    rowHeights.clear();
+}
+
+/**
+ * Windowed list of items inside a container that scrolls with the page
+ *
+ * The container is either a CSS grid (one row = as many items as it has
+ * columns) or a tbody (one row per item). Rows outside the viewport are
+ * replaced by two spacers of the same height, and nodes that scroll out
+ * are kept in a pool and refilled for the items that scroll in.
+ */
+export class VirtualList {
+    /**
+     * @param {HTMLElement} container - Grid element or tbody to render into
+     * @param {Array} items - Items in display order
+     * @param {Object} options
+     * @param {string} options.kind - Items of one kind share a measured row height (e.g. 'card')
+     * @param {Function} options.renderItem - (item, index, node) => node; fills the recycled node, or creates one if node is null
+     * @param {Function} options.createSpacer - () => element spanning a full row
+     * @param {Function} [options.setSpacerHeight] - (spacer, height) => void
+     */
+    constructor(container, items, { kind, renderItem, createSpacer, setSpacerHeight }) {
+        this.container = container;
+        this.items = items;
+        this.kind = kind;
+        this.renderItem = renderItem;
+        this.setSpacerHeight = setSpacerHeight || ((spacer, height) => { spacer.style.height = `${height}px`; });
+
+        this.topSpacer = createSpacer();
+        this.bottomSpacer = createSpacer();
+        this.nodes = new Map(); // item index -> node
+        this.pool = [];
+        this.start = 0;
+        this.end = 0;
+        this.layout = { top: 0, columns: 1, gap: 0 };
+
+        container.replaceChildren(this.topSpacer, this.bottomSpacer);
+        activeLists.add(this);
+        requestUpdate();
+    }
+
+    /** Item at a rendered node (for event delegation), or undefined */
+    itemForNode(node) {
+        const index = Number(node?.dataset.virtualIndex);
+        return Number.isInteger(index) ? this.items[index] : undefined;
+    }
+
+    destroy() {
+        activeLists.delete(this);
+        this.nodes.clear();
+        this.pool = [];
+    }
+
+    /** Read phase: container position, columns and (when unknown) the row height */
+    measure() {
+        const style = getComputedStyle(this.container);
+        const columns = style.display === 'grid' ? style.gridTemplateColumns.split(' ').filter(Boolean).length : 1;
+        const gap = parseFloat(style.rowGap) || 0;
+        this.layout = {
+            top: this.container.getBoundingClientRect().top,
+            columns: Math.max(1, columns),
+            gap
+        };
+        if (!rowHeights.has(this.kind) && this.nodes.size > 0) {
+            const nodes = [...this.nodes.values()];
+            // Margins count too (the stacked rows of the mobile table layout)
+            const nodeStyle = getComputedStyle(nodes[0]);
+            const margin = (parseFloat(nodeStyle.marginTop) || 0) + (parseFloat(nodeStyle.marginBottom) || 0);
+            const total = nodes.reduce((sum, node) => sum + node.offsetHeight, 0);
+            if (total > 0) {
+                rowHeights.set(this.kind, total / nodes.length + margin);
+            }
+        }
+    }
+
+    /** Only the first rows, to measure a kind of item the page has not shown yet */
+    probePlan() {
+        return { start: 0, end: Math.min(this.items.length, this.layout.columns * PROBE_ROWS), top: 0, bottom: 0 };
+    }
+
+    /** Items to render and spacer heights for the current scroll position */
+    plan(itemHeight) {
+        const { top, columns, gap } = this.layout;
+        const rowCount = Math.ceil(this.items.length / columns);
+        if (!itemHeight || rowCount === 0) {
+            return { start: 0, end: 0, top: 0, bottom: 0 };
+        }
+        const rowHeight = itemHeight + gap;
+        // Viewport in container coordinates
+        const viewTop = -top;
+        const viewBottom = viewTop + window.innerHeight;
+        const firstRow = Math.max(0, Math.min(rowCount, Math.floor(viewTop / rowHeight) - OVERSCAN_ROWS));
+        const lastRow = Math.max(firstRow, Math.min(rowCount, Math.ceil(viewBottom / rowHeight) + OVERSCAN_ROWS));
+        return {
+            start: firstRow * columns,
+            end: Math.min(this.items.length, lastRow * columns),
+            // A spacer is a grid row of its own, so the gap after it is part of its share
+            top: firstRow > 0 ? firstRow * rowHeight - gap : 0,
+            bottom: lastRow < rowCount ? (rowCount - lastRow) * rowHeight - gap : 0
+        };
+    }
+
+    /** Write phase: recycle nodes that left the window and render the ones that entered */
+    render({ start, end, top, bottom }) {
+        this.setSpacerHeight(this.topSpacer, top);
+        this.topSpacer.style.display = top > 0 ? '' : 'none';
+        this.setSpacerHeight(this.bottomSpacer, bottom);
+        this.bottomSpacer.style.display = bottom > 0 ? '' : 'none';
+        if (start === this.start && end === this.end) {
+            return;
+        }
+
+        this.nodes.forEach((node, index) => {
+            if (index < start || index >= end) {
+                node.remove();
+                this.pool.push(node);
+                this.nodes.delete(index);
+            }
+        });
+
+        const ordered = [];
+        for (let index = start; index < end; index++) {
+            let node = this.nodes.get(index);
+            if (!node) {
+                node = this.renderItem(this.items[index], index, this.pool.pop() || null);
+                node.dataset.virtualIndex = index;
+                this.nodes.set(index, node);
+            }
+            ordered.push(node);
+        }
+        // Nodes already in place are moved, not rebuilt
+        this.container.replaceChildren(this.topSpacer, ...ordered, this.bottomSpacer);
+        this.start = start;
+        this.end = end;
+    }
+}
@@ -1,14 +1,37 @@
 import os
 import json
 import re
-import requests
+import logging
+import argparse
+import json_codec
 from html import unescape
 
+logger = logging.getLogger(__name__)
+
+# Bump when the civitai.info -> JSON mapping changes so existing files are reconverted
+MAPPING_VERSION = 4
+
+# Per-directory record of the mapping version used by the last batch run
+STATE_FILENAME = '.civitai-2-json.state'
+
+# Below this many files the process pool costs more than it saves
+MIN_POOL_BATCH = 32
+
+# Fields kept from an existing JSON file when already populated
+FIELDS_TO_PRESERVE = [
+    'activation text', 'sd version', 'preferred weight',
+    'negative text', 'civitai text',
+    'nsfw', 'url', 'base model', 'example prompt',
+    'category', 'subcategory', 'tags', 'creator',
+    'name', 'model version', 'high low'
+]
+
+HTML_TAG_PATTERN = re.compile('<.*?>')
+
 def strip_html_tags(text):
     # Remove HTML tags from text using regular expressions
-    clean = re.compile('<.*?>')
     # Replace HTML tags with a space to preserve spacing
-    return re.sub(clean, ' ', text)
+    return HTML_TAG_PATTERN.sub(' ', text)
 
 def get_creator_from_api(model_id, use_api=True):
     """
@@ -19,7 +42,8 @@ def get_creator_from_api(model_id, use_api=True):
         return ''
         
     try:
-        # Make API request to get model information
+        # Make API request to get model information (requests is slow to import, so only load it here)
+        import requests
         api_url = f"https://civitai.com/api/v1/models/{model_id}"
         response = requests.get(api_url, timeout=10)
         
@@ -33,13 +57,14 @@ def get_creator_from_api(model_id, use_api=True):
         # If we reach here, either the request failed or creator info wasn't found
         return 'Unknown'
     except Exception as e:
-        print(f"Error fetching creator information: {e}")
+        logger.error("Error fetching creator information: %s", e)
         return 'Unknown'
 
 def parse_civitai_info_file(file_path, use_api=True, existing_creator=''):
-    civitai_info_data = {}
-    with open(file_path, 'r', encoding='utf-8') as file:
-        civitai_info_data = json.load(file)
+    civitai_info_data = json_codec.read_json(file_path)
+    return map_civitai_info(civitai_info_data, file_path, use_api, existing_creator)
+
+def map_civitai_info(civitai_info_data, file_path, use_api=True, existing_creator=''):
     # Initialize all fields with empty values
     mapped_data = {
         'activation text': '',
@@ -137,66 +162,182 @@ def parse_civitai_info_file(file_path, use_api=True, existing_creator=''):
 
     return mapped_data
 
+def render_json(data):
+    # Sidecar format: keys sorted alphabetically, 4-space indent
+    sorted_data = {k: data[k] for k in sorted(data.keys())}
+    return json_codec.dumps_sidecar(sorted_data, indent=4)
+
 def write_json_file(file_path, data):
     json_file_path = file_path[:-len('.civitai.info')] + '.json'  # Create corresponding JSON file path
-    # Sort the data alphabetically by keys
-    sorted_data = {k: data[k] for k in sorted(data.keys())}
     with open(json_file_path, 'w') as file:
-        json.dump(sorted_data, file, indent=4)
+        file.write(render_json(data))
+
+def merge_existing_data(data, existing_data):
+    """
+    Keep user-populated fields from an existing JSON file
+    """
+    for field in FIELDS_TO_PRESERVE:
+        # If field exists in existing data and has a value, keep the existing value
+        # Otherwise, use the new value from civitai.info
+        # Check explicitly for None and empty string to handle 0 and other falsy values correctly
+        if field in existing_data and existing_data[field] is not None and existing_data[field] != '':
+            data[field] = existing_data[field]
+    return data
+
+def convert_info_file(file_path, use_api=True):
+    """
+    Convert one .civitai.info file into its .json sidecar
+
+    The existing JSON is read once (for both the creator and the merge) and
+    the file is only rewritten when the merged output differs from it.
+
+    Returns a dict: {'path', 'status' ('written', 'unchanged' or 'error'),
+    'apiCallMade', 'error'}
+    """
+    json_file_path = file_path[:-len('.civitai.info')] + '.json'
+    result = {'path': file_path, 'status': 'error', 'apiCallMade': False, 'error': ''}
+    try:
+        existing_text = None
+        existing_data = {}
+        if os.path.exists(json_file_path):
+            try:
+                with open(json_file_path, 'r', encoding='utf-8') as json_file:
+                    existing_text = json_file.read()
+                existing_data = json_codec.loads(existing_text)
+                if not isinstance(existing_data, dict):
+                    existing_data = {}
+            except Exception as e:
+                logger.error("Error reading JSON file %s: %s", json_file_path, e)
+                logger.info("Creating a new JSON file instead.")
+                existing_data = {}
+
+        existing_creator = existing_data.get('creator') or ''
+        civitai_info_data = json_codec.read_json(file_path)
+        # API call only happens if use_api is set, the info has a model id and no creator is known yet
+        result['apiCallMade'] = bool(use_api and not existing_creator and 'modelId' in civitai_info_data and 'id' in civitai_info_data)
+        data = map_civitai_info(civitai_info_data, file_path, use_api, existing_creator)
+        merge_existing_data(data, existing_data)
+
+        output = render_json(data)
+        if output == existing_text:
+            result['status'] = 'unchanged'
+            # Bump the mtime so the next incremental run skips this file
+            if os.path.getmtime(json_file_path) < os.path.getmtime(file_path):
+                os.utime(json_file_path)
+        else:
+            with open(json_file_path, 'w') as json_file:
+                json_file.write(output)
+            result['status'] = 'written'
+    except Exception as e:
+        logger.error("Error converting %s: %s", file_path, e)
+        result['error'] = str(e)
+    return result
+
+def find_stale_info_files(directory, force=False):
+    """
+    List .civitai.info files whose .json is missing or older than the info
 
-def process_civitai_info_files(directory, use_api=True):
+    Returns (stale_paths, total_count)
+    """
+    stale = []
+    total = 0
     for root, dirs, files in os.walk(directory):
+        names = set(files)
         for filename in files:
-            if filename.lower().endswith('.civitai.info'):
-                civitai_info_file_path = os.path.join(root, filename)
-                print(f"Processing file: {civitai_info_file_path}")
-                json_file_path = civitai_info_file_path[:-len('.civitai.info')] + '.json'
-                
-                # Check for existing creator information
-                existing_creator = ''
-                if os.path.exists(json_file_path):
-                    try:
-                        with open(json_file_path, 'r', encoding='utf-8') as json_file:
-                            existing_json = json.load(json_file)
-                            if 'creator' in existing_json and existing_json['creator']:
-                                existing_creator = existing_json['creator']
-                                print(f"Using existing creator: {existing_creator}")
-                    except Exception as e:
-                        print(f"Error reading JSON file for creator info: {e}")
-                
-                data = parse_civitai_info_file(civitai_info_file_path, use_api, existing_creator)
-                
-                # If JSON file exists, merge with existing data
-                if os.path.exists(json_file_path):
-                    try:
-                        with open(json_file_path, 'r', encoding='utf-8') as json_file:
-                            existing_data = json.load(json_file)
-                            
-                            # Only populate fields that are empty in existing data
-                            # Fields to preserve if already populated
-                            fields_to_preserve = [
-                                'activation text', 'sd version', 'preferred weight',
-                                'negative text', 'civitai text', 
-                                'nsfw', 'url', 'base model', 'example prompt',
-                                'category', 'subcategory', 'tags', 'creator',
-                                'name', 'model version', 'high low'  # New fields to preserve
-                            ]
-                            for field in fields_to_preserve:
-                                # If field exists in existing data and has a value, keep the existing value
-                                # Otherwise, use the new value from civitai.info
-                                # Check explicitly for None and empty string to handle 0 and other falsy values correctly
-                                if field in existing_data and existing_data[field] is not None and existing_data[field] != '':
-                                    # Existing field has data, preserve it
-                                    data[field] = existing_data[field]
-                                # else: use the new value that was already set in data
-
-                    except Exception as e:
-                        print(f"Error reading JSON file {json_file_path}: {e}")
-                        print("Creating a new JSON file instead.")
-                
-                write_json_file(civitai_info_file_path, data)
+            if not filename.lower().endswith('.civitai.info'):
+                continue
+            total += 1
+            info_path = os.path.join(root, filename)
+            json_name = filename[:-len('.civitai.info')] + '.json'
+            if not force and json_name in names:
+                try:
+                    if os.stat(os.path.join(root, json_name)).st_mtime_ns >= os.stat(info_path).st_mtime_ns:
+                        continue
+                except OSError:
+                    pass
+            stale.append(info_path)
+    return stale, total
+
+def read_state(directory):
+    try:
+        with open(os.path.join(directory, STATE_FILENAME), 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+def write_state(directory, state):
+    try:
+        with open(os.path.join(directory, STATE_FILENAME), 'w', encoding='utf-8') as file:
+            json.dump(state, file, indent=4)
+    except OSError as e:
+        logger.error("Error writing conversion state: %s", e)
+
+def process_civitai_info_files(directory, use_api=True, jobs=None, force=False, progress=None):
+    """
+    Incrementally convert every .civitai.info under directory
+
+    Models whose .json is newer than their .civitai.info are skipped unless
+    the mapping version recorded for the directory changed (or force is set).
+    The remaining files are converted across a process pool.
+
+    Args:
+        directory: Folder to walk
+        use_api: Fetch missing creators from the Civitai API
+        jobs: Worker processes (default: CPU count; 1 converts in-process)
+        force: Reconvert every file regardless of timestamps
+        progress: Optional callback(done, total, result) after each file
+
+    Returns:
+        Summary dict: {total, skipped, written, unchanged, errors, apiCalls}
+    """
+    state = read_state(directory)
+    if state.get('mappingVersion') != MAPPING_VERSION:
+        if state:
+            logger.info("Mapping version changed (%s -> %s), reconverting all files", state.get('mappingVersion'), MAPPING_VERSION)
+        force = True
+
+    stale, total = find_stale_info_files(directory, force)
+    summary = {'total': total, 'skipped': total - len(stale), 'written': 0, 'unchanged': 0, 'errors': 0, 'apiCalls': 0}
+    logger.info("Converting %d of %d .civitai.info files", len(stale), total)
+
+    jobs = jobs or os.cpu_count() or 1
+    if jobs > 1 and len(stale) >= MIN_POOL_BATCH:
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(max_workers=jobs)
+        chunksize = max(1, len(stale) // (jobs * 4))
+        results = executor.map(convert_info_file, stale, [use_api] * len(stale), chunksize=chunksize)
+    else:
+        executor = None
+        results = (convert_info_file(path, use_api) for path in stale)
+
+    try:
+        for done, result in enumerate(results, 1):
+            if result['status'] == 'written':
+                summary['written'] += 1
+                logger.info("Wrote JSON for: %s", result['path'])
+            elif result['status'] == 'unchanged':
+                summary['unchanged'] += 1
+            else:
+                summary['errors'] += 1
+            if result['apiCallMade']:
+                summary['apiCalls'] += 1
+            if progress:
+                progress(done, len(stale), result)
+    finally:
+        if executor:
+            executor.shutdown()
+
+    if summary['errors'] == 0:
+        write_state(directory, {'mappingVersion': MAPPING_VERSION})
+    return summary
 
 def main():
+    parser = argparse.ArgumentParser(description="Convert .civitai.info files in the current folder tree to .json")
+    parser.add_argument('--jobs', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--force', action='store_true', help="Reconvert files even if their JSON is up to date")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
     print("Civitai-2-JSON v4 - Now with creator information from API")
     
     # Prompt user about API calls for creator information
@@ -208,8 +349,9 @@ def main():
         print("API calls for creator information disabled.")
     
     current_directory = os.getcwd()
-    process_civitai_info_files(current_directory, use_api)
-    print("Conversion completed successfully.")
+    summary = process_civitai_info_files(current_directory, use_api, jobs=args.jobs, force=args.force)
+    print(f"Conversion completed: {summary['written']} written, {summary['unchanged']} unchanged, "
+          f"{summary['skipped']} up to date, {summary['errors']} errors.")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
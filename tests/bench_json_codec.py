@@ -0,0 +1,104 @@
+# -*- coding: UTF-8 -*-
+"""
+JSON Codec Benchmark
+Times each installed json_codec backend on a generated library: decoding
+every sidecar from memory with loads and from disk with read_json, a full
+library scan, and encoding the /load-loras listing with dumps
+
+Usage examples:
+    python tests/bench_json_codec.py
+    python tests/bench_json_codec.py --models 3000 --repeat 5
+    python tests/bench_json_codec.py --library /mnt/models/loras
+"""
+
+import os
+import time
+import shutil
+import argparse
+import tempfile
+
+from synthetic_library import write_library
+
+import json_codec
+from model_index import library_roots, scan_library
+
+
+def best_time(function, repeat):
+    """Fastest of repeat runs of function, in milliseconds"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def sidecar_paths(path):
+    """Every .json and .civitai.info file under path"""
+    return [os.path.join(directory, name)
+            for directory, _, names in os.walk(path)
+            for name in names if name.endswith(('.json', '.civitai.info'))]
+
+
+def run(path, repeat):
+    """
+    Benchmark every available backend on the library at path
+
+    Returns:
+        (results, models, sidecars) where results is a list of
+        (backend, loads ms, read_json ms, scan ms, dumps ms)
+    """
+    root = library_roots(path)[0]
+    sidecars = sidecar_paths(path)
+    documents = []
+    for sidecar in sidecars:
+        with open(sidecar, 'rb') as f:
+            documents.append(f.read())
+    listing = [record.to_dict() for record in scan_library(root)]
+    # Warm the filesystem cache so the first backend is not penalised
+    scan_library(root)
+
+    results = []
+    initial = json_codec.BACKEND
+    try:
+        for backend in json_codec.AVAILABLE_BACKENDS:
+            json_codec.use_backend(backend)
+            loads_ms = best_time(lambda: [json_codec.loads(document) for document in documents], repeat)
+            read_ms = best_time(lambda: [json_codec.read_json(sidecar) for sidecar in sidecars], repeat)
+            scan_ms = best_time(lambda: scan_library(root), repeat)
+            encode_ms = best_time(lambda: json_codec.dumps(listing), repeat)
+            results.append((backend, loads_ms, read_ms, scan_ms, encode_ms))
+    finally:
+        json_codec.use_backend(initial)
+    return results, len(listing), len(sidecars)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the json_codec backends on a model library")
+    parser.add_argument('--models', type=int, default=3000, help="Models in the generated library (default 3000)")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per measurement; the best is reported (default 5)")
+    parser.add_argument('--library', help="Benchmark this library instead of a generated one")
+    args = parser.parse_args()
+
+    path = args.library or tempfile.mkdtemp()
+    try:
+        if not args.library:
+            write_library(path, args.models)
+        results, models, sidecars = run(path, args.repeat)
+    finally:
+        if not args.library:
+            shutil.rmtree(path)
+
+    print(f"{models} models, {sidecars} sidecars, best of {args.repeat}")
+    print(f"{'backend':<8}" + ''.join(f"{column:>12}" for column in ('loads', 'read_json', 'scan', 'dumps')))
+    # The stdlib backend is always last
+    baseline = results[-1][1:]
+    for backend, *timings in results:
+        print(f"{backend:<8}" + ''.join(f"{ms:>10.1f}ms" for ms in timings))
+        if backend != 'json':
+            print(f"{'':<8}" + ''.join(f"{base / ms:>11.1f}x" for base, ms in zip(baseline, timings)))
+
+
+if __name__ == '__main__':
+    main()
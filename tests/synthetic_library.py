@@ -0,0 +1,108 @@
+# -*- coding: UTF-8 -*-
+"""
+Synthetic Library Module
+Generates a model library on disk (.safetensors, converted .json sidecars and
+.civitai.info documents) for the checks and benchmarks in this folder
+"""
+
+import os
+import sys
+import random
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'scripts'))
+
+import json_codec
+
+CATEGORIES = ('character', 'style', 'concept', 'clothing', 'background', 'pose', 'vehicle', 'tool')
+BASE_MODELS = ('SD 1.5', 'SDXL 1.0', 'Pony', 'Illustrious', 'Flux.1 D')
+CREATORS = tuple(f"creator{n}" for n in range(60))
+WORDS = ('anime', 'realistic', 'portrait', 'landscape', 'detailed', 'masterpiece', 'best', 'quality',
+         'lighting', 'cinematic', 'girl', 'armor', 'forest', 'city', 'night', 'watercolor', 'sketch',
+         'neon', 'retro', 'fantasy', 'sci-fi', 'smile', 'dress', 'hat', 'sword', 'castle', 'ocean')
+
+
+def _text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def write_library(path, count, seed=0, name_prefix='model'):
+    """
+    Write count models under path, spread over category folders
+
+    Model files are sparse (only their size is real). Sizes, dates, words
+    and creators are drawn from a seeded generator, so the same arguments
+    give the same library.
+
+    Args:
+        path: Library root folder (created if missing)
+        count: Number of models
+        seed: Random seed
+        name_prefix: Start of every model name (e.g. to tell libraries apart)
+
+    Returns:
+        List of model names written
+    """
+    rng = random.Random(seed)
+    names = []
+    for n in range(count):
+        category = CATEGORIES[n % len(CATEGORIES)]
+        directory = os.path.join(path, category)
+        os.makedirs(directory, exist_ok=True)
+        name = f"{name_prefix}_{n:05d}_{rng.choice(WORDS)}"
+        base = os.path.join(directory, name)
+        base_model = rng.choice(BASE_MODELS)
+        creator = rng.choice(CREATORS)
+        trained_words = [_text(rng, 2) for _ in range(rng.randint(1, 4))]
+        prompt = _text(rng, 40)
+
+        with open(base + '.safetensors', 'wb') as f:
+            f.truncate(rng.randint(1, 200) * 1024 * 1024)
+        sidecar = {
+            'activation text': trained_words[0],
+            'base model': base_model,
+            'category': category,
+            'civitai name': name.replace('_', ' '),
+            'civitai text': ', '.join(trained_words),
+            'creator': creator,
+            'description': '',
+            'example prompt': prompt,
+            'folder': category,
+            'high low': '',
+            'model version': 'v1.0',
+            'name': name.replace('_', ' '),
+            'negative text': _text(rng, 20),
+            'notes': '',
+            'nsfw': 'false',
+            'preferred weight': 0,
+            'sd version': 'SD1' if base_model.startswith('SD 1') else 'SD2',
+            'subcategory': rng.choice(WORDS),
+            'tags': ', '.join(rng.sample(WORDS, 5)),
+            'url': f"https://civitai.com/models/{n}"
+        }
+        with open(base + '.json', 'w') as f:
+            f.write(json_codec.dumps_sidecar(sidecar))
+        # Real-sized civitai.info: a description plus a few images with generation data
+        civitai_info = {
+            'id': n,
+            'baseModel': base_model,
+            'trainedWords': trained_words,
+            'description': '<p>' + _text(rng, 150) + '</p>',
+            'url': f"https://civitai.com/models/{n}",
+            'model': {'name': name.replace('_', ' '), 'type': 'LORA', 'nsfw': False},
+            'creator': {'username': creator, 'image': f"https://image.civitai.com/{creator}.jpeg"},
+            'files': [{'name': name + '.safetensors', 'sizeKB': rng.randint(1000, 200000),
+                       'hashes': {'SHA256': '%064x' % rng.getrandbits(256)}}],
+            'images': [
+                {'url': f"https://image.civitai.com/{n}/{image}.jpeg", 'width': 832, 'height': 1216,
+                 'meta': {'prompt': _text(rng, 60), 'negativePrompt': _text(rng, 30), 'steps': 30,
+                          'sampler': 'DPM++ 2M Karras', 'cfgScale': 7, 'seed': rng.getrandbits(32)}}
+                for image in range(8)
+            ]
+        }
+        with open(base + '.civitai.info', 'w') as f:
+            f.write(json_codec.dumps_sidecar(civitai_info))
+        date = 1.6e9 + rng.randint(0, 10 ** 8)
+        os.utime(base + '.safetensors', (date, date))
+        names.append(name)
+    return names
@@ -0,0 +1,59 @@
+# -*- coding: UTF-8 -*-
+"""
+JSON Codec Tests
+Sidecar reads with every installed backend
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import synthetic_library  # noqa: F401 (puts scripts/ on the path)
+
+import json_codec
+
+
+class ReadJsonTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.initial_backend = json_codec.BACKEND
+
+    def tearDown(self):
+        json_codec.use_backend(self.initial_backend)
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, name, data):
+        file_path = os.path.join(self.temp_dir, name)
+        with open(file_path, 'wb') as f:
+            f.write(data)
+        return file_path
+
+    def test_non_utf8_sidecar_uses_the_locale_encoding(self):
+        file_path = self.write('cp1252.json', '{"a": "café"}'.encode('cp1252'))
+        for backend in json_codec.AVAILABLE_BACKENDS:
+            with self.subTest(backend=backend):
+                json_codec.use_backend(backend)
+                with mock.patch('locale.getpreferredencoding', return_value='cp1252'):
+                    self.assertEqual(json_codec.read_json(file_path), {'a': 'café'})
+
+    def test_utf8_sidecar(self):
+        file_path = self.write('utf8.json', '{"a": "café", "n": [1, 2.5, null]}'.encode('utf-8'))
+        for backend in json_codec.AVAILABLE_BACKENDS:
+            with self.subTest(backend=backend):
+                json_codec.use_backend(backend)
+                self.assertEqual(json_codec.read_json(file_path), {'a': 'café', 'n': [1, 2.5, None]})
+
+    def test_invalid_json_still_raises(self):
+        file_path = self.write('broken.json', b'{"a": ')
+        for backend in json_codec.AVAILABLE_BACKENDS:
+            with self.subTest(backend=backend):
+                json_codec.use_backend(backend)
+                with self.assertRaises(ValueError):
+                    json_codec.read_json(file_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+# -*- coding: UTF-8 -*-
+"""
+Model Index Tests
+Memory budget of the scanned model records, civitai.info cache
+"""
+
+import gc
+import shutil
+import tempfile
+import tracemalloc
+import unittest
+
+from synthetic_library import write_library
+
+from model_index import library_roots, scan_library
+
+# Bytes per model allowed for the scanned records, converted .json sidecar
+# included (the ModelRecord docstring gives about 4 KB)
+MODEL_MEMORY_BUDGET = 4096
+MODEL_COUNT = 1000
+
+
+class ModelRecordMemoryTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+        write_library(cls.temp_dir, MODEL_COUNT)
+        cls.root = library_roots(cls.temp_dir)[0]
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+    def test_bytes_per_model_within_budget(self):
+        gc.collect()
+        tracemalloc.start()
+        try:
+            records = scan_library(self.root)
+            gc.collect()
+            allocated = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(len(records), MODEL_COUNT)
+        per_model = allocated / MODEL_COUNT
+        self.assertLess(per_model, MODEL_MEMORY_BUDGET,
+                        f"{per_model:.0f} bytes per model, budget {MODEL_MEMORY_BUDGET}")
+
+    def test_records_are_slotted_and_share_strings(self):
+        records = scan_library(self.root)
+        self.assertFalse(hasattr(records[0], '__dict__'))
+        # Equal values are one shared object
+        shared = {}
+        for record in records:
+            for value in (record.directory, record.root_id, record.category, record.json['base model'], record.json['creator']):
+                self.assertIs(shared.setdefault(value, value), value)
+        # Only a summary of civitai.info is kept on the record
+        self.assertIsInstance(records[0].civitai_summary, tuple)
+
+
+class CivitaiInfoCacheTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+        write_library(cls.temp_dir, 1)
+        cls.record = scan_library(library_roots(cls.temp_dir)[0])[0]
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+    def test_changing_a_result_leaves_the_cache_intact(self):
+        first = self.record.civitai_info()
+        self.assertEqual(first['modelUrl'], first['url'])
+        first['model']['name'] = 'changed'
+        first['images'].clear()
+        del first['url']
+        second = self.record.civitai_info()
+        self.assertNotEqual(second['model']['name'], 'changed')
+        self.assertEqual(len(second['images']), 8)
+        self.assertEqual(second['modelUrl'], second['url'])
+
+
+if __name__ == '__main__':
+    unittest.main()
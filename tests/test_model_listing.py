@@ -0,0 +1,60 @@
+# -*- coding: UTF-8 -*-
+"""
+Model Listing Tests
+Model versions and listing ETags across JSON backends
+"""
+
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from synthetic_library import write_library
+
+import json_codec
+from model_index import library_roots, scan_library
+from model_listing import ShardListing, record_version
+
+
+class RecordVersionTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+        names = write_library(cls.temp_dir, 20)
+        # Non-ASCII metadata, which the backends encode differently
+        sidecar = os.path.join(cls.temp_dir, 'character', names[0] + '.json')
+        with open(sidecar) as f:
+            data = json.load(f)
+        data['notes'] = 'café ✓ 日本語'
+        with open(sidecar, 'w') as f:
+            f.write(json_codec.dumps_sidecar(data))
+        cls.records = scan_library(library_roots(cls.temp_dir)[0])
+        cls.initial_backend = json_codec.BACKEND
+
+    @classmethod
+    def tearDownClass(cls):
+        json_codec.use_backend(cls.initial_backend)
+        shutil.rmtree(cls.temp_dir)
+
+    def test_versions_do_not_depend_on_the_backend(self):
+        listings = {}
+        for backend in json_codec.AVAILABLE_BACKENDS:
+            json_codec.use_backend(backend)
+            listings[backend] = ShardListing(self.records)
+        for backend, listing in listings.items():
+            with self.subTest(backend=backend):
+                self.assertEqual(listing.versions, listings['json'].versions)
+                self.assertEqual(listing.etag, listings['json'].etag)
+
+    def test_version_follows_the_content(self):
+        record = self.records[0]
+        self.assertEqual(record_version(record), record_version(record))
+        changed = type(record)(**{slot: getattr(record, slot) for slot in record.__slots__})
+        changed.json = dict(record.json, notes='changed')
+        self.assertNotEqual(record_version(changed), record_version(record))
+
+
+if __name__ == '__main__':
+    unittest.main()
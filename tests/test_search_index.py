@@ -0,0 +1,116 @@
+# -*- coding: UTF-8 -*-
+"""
+Search Index Tests
+Sorted searches over several library roots, concurrent searches
+"""
+
+import time
+import shutil
+import tempfile
+import unittest
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from synthetic_library import WORDS, write_library
+
+import search_index
+from model_index import library_roots, scan_library
+
+# Record value each non-relevance sort orders by, and whether it is descending
+SORT_VALUES = {
+    'name-asc': (lambda record: record.name.casefold(), False),
+    'name-desc': (lambda record: record.name.casefold(), True),
+    'date-newest': (lambda record: record.date_modified, True),
+    'date-oldest': (lambda record: record.date_modified, False),
+    'size-asc': (lambda record: record.size, False),
+    'size-desc': (lambda record: record.size, True)
+}
+
+
+class SortedSearchAcrossRootsTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+        write_library(cls.temp_dir + '/A', 120, seed=1, name_prefix='alpha')
+        write_library(cls.temp_dir + '/B', 80, seed=2, name_prefix='beta')
+        roots = library_roots([cls.temp_dir + '/A', cls.temp_dir + '/B'])
+        cls.indexes = [search_index.SearchIndex(scan_library(root)) for root in roots]
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+    def test_every_sort_returns_all_roots_in_order(self):
+        for sort, (value, descending) in SORT_VALUES.items():
+            for query in ('', 'anime', 'alpha | beta', '!sketch'):
+                with self.subTest(sort=sort, query=query):
+                    matches = search_index.match(self.indexes, query)
+                    expected = [index.records[ordinal] for index, ordinals in zip(self.indexes, matches) for ordinal in ordinals]
+                    total, records = search_index.search(self.indexes, query, sort, limit=len(expected) + 1)
+                    self.assertEqual(total, len(expected))
+                    self.assertCountEqual([record.id for record in records], [record.id for record in expected])
+                    self.assertEqual([value(record) for record in records],
+                                     sorted((value(record) for record in expected), reverse=descending))
+
+    def test_pages_continue_each_other(self):
+        total, everything = search_index.search(self.indexes, 'anime', 'name-asc', limit=1000)
+        pages = []
+        for offset in range(0, total, 25):
+            pages.extend(search_index.search(self.indexes, 'anime', 'name-asc', offset=offset, limit=25)[1])
+        self.assertEqual([record.id for record in pages], [record.id for record in everything])
+        self.assertEqual({record.root_id for record in pages}, {'A', 'B'})
+
+
+class SlowLookupCache(OrderedDict):
+    """Word cache that lets other threads run between a lookup and what follows it"""
+
+    def get(self, key, default=None):
+        value = super().get(key, default)
+        time.sleep(0.0001)
+        return value
+
+
+class ConcurrentSearchTest(unittest.TestCase):
+
+    THREADS = 8
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+        write_library(cls.temp_dir, 100, seed=3)
+        cls.index = search_index.SearchIndex(scan_library(library_roots(cls.temp_dir)[0]))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+    def test_word_cache_smaller_than_the_words_searched(self):
+        # Every two-letter piece of the generated words, far more than the cache holds
+        words = sorted({word[i:i + 2] for word in WORDS for i in range(len(word) - 1)})
+        expected = {word: search_index.search([self.index], word, 'name-asc', limit=1000)[0] for word in words}
+
+        def search_words(thread):
+            # Each word twice in a row, so cache hits race with other threads' evictions
+            totals = []
+            for _ in range(20):
+                for word in words[thread::self.THREADS]:
+                    for _ in range(2):
+                        totals.append((word, search_index.search([self.index], word, 'name-asc', limit=10)[0]))
+            return totals
+
+        cache_size = search_index.WORD_CACHE_SIZE
+        search_index.WORD_CACHE_SIZE = 4
+        self.index._word_cache = SlowLookupCache()
+        try:
+            with ThreadPoolExecutor(max_workers=self.THREADS) as executor:
+                results = list(executor.map(search_words, range(self.THREADS)))
+        finally:
+            search_index.WORD_CACHE_SIZE = cache_size
+        for totals in results:
+            for word, total in totals:
+                self.assertEqual(total, expected[word], word)
+
+
+if __name__ == '__main__':
+    unittest.main()